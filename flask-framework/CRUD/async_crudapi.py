@@ -0,0 +1,265 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+import aiomysql
+from pymysql.constants import CLIENT
+from quart import Quart, request, jsonify
+from quart_cors import cors
+
+from db_pool import PoolTimeout, duplicate_field
+from user_cache import UserCache
+
+# The routes of crudapi.py on Quart (ASGI) with aiomysql, so a worker keeps
+# serving other requests while one waits on MySQL. Run it with serve.py:
+#
+#   python serve.py --workers 4 --port 5000
+
+app = Quart(__name__)
+app = cors(app, allow_origin='http://localhost:3000')
+
+app.config.update(
+    DB_HOST=os.environ.get("DB_HOST", "localhost"),
+    DB_USER=os.environ.get("DB_USER", "krish"),
+    DB_PASSWORD=os.environ.get("DB_PASSWORD", "Krish@1209"),
+    DB_NAME=os.environ.get("DB_NAME", "main_app"),
+    DB_POOL_SIZE=int(os.environ.get("DB_POOL_SIZE", 10)),
+    DB_POOL_TIMEOUT=float(os.environ.get("DB_POOL_TIMEOUT", 5)),
+    # A pool can be set here directly, e.g. one over SQLite for load tests
+    DB_POOL=None,
+    USER_CACHE_SIZE=int(os.environ.get("USER_CACHE_SIZE", 100000)),
+    USER_CACHE_TTL=float(os.environ.get("USER_CACHE_TTL", 60)),
+    USER_BLOOM_CAPACITY=int(os.environ.get("USER_BLOOM_CAPACITY", 1000000)),
+    USER_BLOOM_REFRESH=float(os.environ.get("USER_BLOOM_REFRESH", 300)),
+    # Needed to cache with several workers, e.g. redis://localhost:6379/0
+    USER_CACHE_REDIS_URL=os.environ.get("USER_CACHE_REDIS_URL"),
+    # Worker processes serving the app, serve.py and gunicorn set WEB_CONCURRENCY
+    WEB_WORKERS=int(os.environ.get("WEB_CONCURRENCY", 1)),
+    # A UserCache can be set here directly
+    USER_CACHE=None
+)
+
+
+@app.before_serving
+async def open_pool():
+    if app.config["DB_POOL"] is None:
+        app.config["DB_POOL"] = await aiomysql.create_pool(
+            host=app.config["DB_HOST"],
+            user=app.config["DB_USER"],
+            password=app.config["DB_PASSWORD"],
+            db=app.config["DB_NAME"],
+            minsize=1,
+            maxsize=app.config["DB_POOL_SIZE"],
+            # Every handler runs a single statement, see crudapi.py
+            autocommit=True,
+            # rowcount of an UPDATE counts matched rows, not only changed ones
+            client_flag=CLIENT.FOUND_ROWS
+        )
+
+
+@app.after_serving
+async def close_pool():
+    pool = app.config["DB_POOL"]
+    if pool is not None:
+        pool.close()
+        await pool.wait_closed()
+
+
+@asynccontextmanager
+async def db_cursor():
+    """Cursor on a pooled connection, the connection goes back to the pool afterwards"""
+    pool = app.config["DB_POOL"]
+    try:
+        conn = await asyncio.wait_for(pool.acquire(), app.config["DB_POOL_TIMEOUT"])
+    except asyncio.TimeoutError:
+        raise PoolTimeout(f"No free connection after {app.config['DB_POOL_TIMEOUT']}s")
+    try:
+        async with conn.cursor() as cursor:
+            yield cursor
+    finally:
+        pool.release(conn)
+
+
+def get_user_cache():
+    """The app's profile/availability cache, its Bloom filter is (re)built in a background task"""
+    cache = app.config["USER_CACHE"]
+    if cache is None:
+        cache = app.config["USER_CACHE"] = UserCache.from_config(app.config)
+        if not cache.caching:
+            app.logger.warning("%d workers and no USER_CACHE_REDIS_URL, user lookups are not cached",
+                               cache.workers)
+    if cache.claim_bloom_rebuild():
+        app.add_background_task(rebuild_bloom, cache)
+    return cache
+
+
+async def rebuild_bloom(cache):
+    """Load every username into a new Bloom filter, Redis calls and hashing off the event loop"""
+    try:
+        if not await asyncio.to_thread(cache.claim_shared_rebuild):
+            return
+        async with db_cursor() as cursor:
+            await cursor.execute("SELECT username FROM user_login")
+            usernames = [username for username, in await cursor.fetchall()]
+        await asyncio.to_thread(cache.build_bloom, usernames, len(usernames))
+    except Exception:
+        app.logger.exception("Could not rebuild the username Bloom filter")
+
+
+@app.errorhandler(PoolTimeout)
+async def pool_exhausted(e):
+    return jsonify({"message": "Server busy, try again"}), 503
+
+
+@app.route('/', methods=['GET'])
+async def index():
+    return "<h1>Hello World!</h1>"
+
+@app.route('/metrics', methods=['GET'])
+async def metrics():
+    return jsonify({"user_cache": get_user_cache().metrics()}), 200
+
+@app.route('/login', methods=['POST'])
+async def login():
+    data = await request.get_json()
+
+    username = data.get('username')
+    password = data.get('password')
+
+    async with db_cursor() as cursor:
+        query = "SELECT user_id, firstname, lastname FROM user_login WHERE username = %s AND password = %s"
+        await cursor.execute(query, (username, password))
+        user = await cursor.fetchone()
+
+    if user:
+        user_id, firstname, lastname = user
+        return jsonify({"message": f"Thank you {firstname} {lastname}"}), 200
+    else:
+        return jsonify({"message": "Invalid username or password"}), 401
+
+@app.route('/signUp', methods=['POST'])
+async def signup():
+    data = await request.get_json()
+
+    firstname = data.get('firstname')
+    lastname = data.get('lastname')
+    username = data.get('username')
+    email = data.get('email')
+    password = data.get('password')
+    confirm_password = data.get('confirm_password')
+    phone_number = data.get('phone_number')
+
+    if password != confirm_password:
+        return jsonify({"message": "Password and confirm password do not match."}), 400
+
+    if len(str(phone_number)) != 10:
+        return jsonify({"message": "Phone number should be 10 digits"}), 400
+
+    if not phone_number.isdigit():
+        return jsonify({"message": "Phone number should contain only numerical digits"}), 400
+
+    # The unique keys on username and email reject duplicates, no lookup first
+    insert_query = "INSERT INTO user_login (firstname, lastname, email, username, password, phone_number) VALUES (%s, %s, %s, %s, %s, %s)"
+    async with db_cursor() as cursor:
+        try:
+            await cursor.execute(insert_query, (firstname, lastname, email, username, password, phone_number))
+        except aiomysql.IntegrityError as e:
+            if duplicate_field(e) == 'email':
+                return jsonify({"message": "Email already registered"}), 400
+            return jsonify({"message": "Username already taken"}), 400
+    await get_user_cache().user_added_async(username)
+
+    return jsonify({"message": "User created successfully"}), 201
+
+@app.route('/deleteUser', methods=['DELETE'])
+async def delete_user():
+    data = await request.get_json()
+
+    username = data.get('username')
+
+    async with db_cursor() as cursor:
+        await cursor.execute("DELETE FROM user_login WHERE username = %s", (username,))
+        deleted = cursor.rowcount
+
+    if deleted == 0:
+        return jsonify({"message": "User not found"}), 404
+    await get_user_cache().invalidate_async(username)
+
+    return jsonify({"message": "User deleted successfully"}), 200
+
+@app.route('/viewProfile', methods=['GET'])
+async def view_profile():
+    data = await request.get_json()
+    username = data.get('username')
+
+    async def load_profile():
+        async with db_cursor() as cursor:
+            query = "SELECT firstname, lastname, email, phone_number FROM user_login WHERE username = %s"
+            await cursor.execute(query, (username,))
+            user = await cursor.fetchone()
+        if not user:
+            return None
+        firstname, lastname, email, phone_number = user
+        return {
+            "firstname": firstname,
+            "lastname": lastname,
+            "email": email,
+            "phone_number": phone_number
+        }
+
+    profile_data = await get_user_cache().profile_async(username, load_profile)
+
+    if profile_data:
+        return jsonify(profile_data), 200
+    else:
+        return jsonify({"message": "User not found"}), 404
+
+@app.route('/updateUser', methods=['PUT'])
+async def update_user():
+    data = await request.get_json()
+    username = data.get('username')
+    firstname = data.get('firstname')
+    lastname = data.get('lastname')
+    email = data.get('email')
+    phone_number = data.get('phone_number')
+
+    if not all([firstname, lastname, email, phone_number]):
+        return jsonify({"message": "Missing required fields"}), 400
+
+    if len(str(phone_number)) != 10:
+        return jsonify({"message": "Phone number should be 10 digits"}), 400
+
+    if not phone_number.isdigit():
+        return jsonify({"message": "Phone number should contain only numerical digits"}), 400
+
+    update_query = "UPDATE user_login SET firstname = %s, lastname = %s, email = %s, phone_number = %s WHERE username = %s"
+    async with db_cursor() as cursor:
+        try:
+            await cursor.execute(update_query, (firstname, lastname, email, phone_number, username))
+        except aiomysql.IntegrityError:
+            return jsonify({"message": "Email already registered"}), 409
+        updated = cursor.rowcount
+
+    if updated == 0:
+        return jsonify({"message": "User not found"}), 404
+    await get_user_cache().invalidate_async(username)
+
+    return jsonify({"message": "User data updated successfully"}), 200
+
+@app.route('/checkUsernameAvailability', methods=['POST'])
+async def check_username_availability():
+    data = await request.get_json()
+    username = data.get('username')
+
+    if not username:
+        return jsonify({"message": "Username is required"}), 400
+
+    async def load_taken():
+        async with db_cursor() as cursor:
+            await cursor.execute("SELECT 1 FROM user_login WHERE username = %s", (username,))
+            return await cursor.fetchone() is not None
+
+    if await get_user_cache().is_taken_async(username, load_taken):
+        return jsonify({"message": "Username is not available"}), 409
+    else:
+        return jsonify({"message": "Username is available"}), 200
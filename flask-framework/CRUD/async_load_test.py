@@ -0,0 +1,248 @@
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+import aiomysql
+import aiosqlite
+
+from load_test import create_database, percentile, sqlite_pool
+
+# HTTP load test of /login and /viewProfile on a SQLite stand-in for MySQL.
+# "asgi" starts async_crudapi.py through serve.py (uvicorn, --workers
+# processes), "wsgi" runs crudapi.py on Werkzeug's threaded server for
+# comparison. As in load_test.py, --latency sleeps on every query to stand in
+# for the MySQL round trip; the async app awaits it instead of blocking a thread.
+#
+#   python async_load_test.py --concurrency 1 16 64 --workers 1 2 --latency 2
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ENDPOINTS = ("/login", "/viewProfile")
+
+
+class AsyncSQLiteCursor:
+    """aiomysql style cursor over aiosqlite with %s placeholders"""
+
+    def __init__(self, conn, latency):
+        self._conn = conn
+        self._latency = latency
+        self._cursor = None
+
+    async def __aenter__(self):
+        self._cursor = await self._conn.cursor()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._cursor.close()
+
+    async def execute(self, query, params=()):
+        if self._latency:
+            await asyncio.sleep(self._latency)
+        try:
+            await self._cursor.execute(query.replace('%s', '?'), params)
+        except sqlite3.IntegrityError as e:
+            raise aiomysql.IntegrityError(1062, str(e))
+
+    async def fetchone(self):
+        return await self._cursor.fetchone()
+
+    async def fetchall(self):
+        return await self._cursor.fetchall()
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+
+class AsyncSQLitePool:
+    """Stand-in for an aiomysql pool: acquire(), release(), close(), wait_closed()"""
+
+    def __init__(self, path, size=10, latency=0.0):
+        self.path = path
+        self.size = size
+        self.latency = latency
+        self._idle = None
+        self._opened = 0
+        self._all = []
+
+    async def acquire(self):
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+        if self._idle.empty() and self._opened < self.size:
+            # Take the slot before awaiting so concurrent acquires cannot overshoot size
+            self._opened += 1
+            # Autocommit, like the aiomysql pool of async_crudapi.py
+            conn = await aiosqlite.connect(self.path, isolation_level=None, timeout=30)
+            self._all.append(conn)
+            return _Connection(conn, self.latency)
+        return await self._idle.get()
+
+    def release(self, conn):
+        self._idle.put_nowait(conn)
+
+    def close(self):
+        pass
+
+    async def wait_closed(self):
+        for conn in self._all:
+            await conn.close()
+
+
+class _Connection:
+    def __init__(self, conn, latency):
+        self._conn = conn
+        self._latency = latency
+
+    def cursor(self):
+        return AsyncSQLiteCursor(self._conn, self._latency)
+
+
+def standin_app():
+    """async_crudapi's app on the SQLite file named by CRUD_LOAD_DB, for serve.py --factory"""
+    from async_crudapi import app
+
+    app.config["DB_POOL"] = AsyncSQLitePool(os.environ["CRUD_LOAD_DB"], app.config["DB_POOL_SIZE"],
+                                            float(os.environ.get("CRUD_LOAD_LATENCY", 0)))
+    return app
+
+
+def serve_wsgi(path, port, pool_size, latency):
+    from werkzeug.serving import run_simple
+
+    from crudapi import app
+
+    app.config["DB_POOL"] = sqlite_pool(path, pool_size, latency)
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    run_simple("127.0.0.1", port, app, threaded=True)
+
+
+def start_server(kind, path, port, workers, pool_size, latency):
+    """Start a server in the background, return a callable that stops it"""
+    if kind == "asgi":
+        env = dict(os.environ, CRUD_LOAD_DB=path, CRUD_LOAD_LATENCY=str(latency), DB_POOL_SIZE=str(pool_size))
+        process = subprocess.Popen(
+            [sys.executable, os.path.join(HERE, "serve.py"), "--app", "async_load_test:standin_app", "--factory",
+             "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)],
+            cwd=HERE, env=env)
+        stop = lambda: (process.terminate(), process.wait())
+    else:
+        process = multiprocessing.Process(target=serve_wsgi, args=(path, port, pool_size, latency), daemon=True)
+        process.start()
+        stop = lambda: (process.terminate(), process.join())
+
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1).close()
+            return stop
+        except (urllib.error.URLError, ConnectionError):
+            if time.monotonic() > deadline:
+                stop()
+                raise RuntimeError(f"{kind} server did not start on port {port}")
+            time.sleep(0.1)
+
+
+class HTTPClient:
+    """Minimal HTTP/1.1 client on one keep-alive connection
+
+    httpx and aiohttp cost more CPU per request than the app under test, which
+    on a small machine makes the client the bottleneck.
+    """
+
+    def __init__(self, port):
+        self.port = port
+        self._reader = self._writer = None
+
+    async def request(self, method, path, body):
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection("127.0.0.1", self.port)
+        data = json.dumps(body).encode()
+        self._writer.write(f"{method} {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n"
+                           f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+        head = (await self._reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        headers = dict(line.lower().split(": ", 1) for line in head[1:] if line)
+        await self._reader.readexactly(int(headers.get("content-length", 0)))
+        # Werkzeug answers HTTP/1.0 and closes the connection
+        if head[0].startswith("HTTP/1.0") or headers.get("connection") == "close":
+            await self.close()
+        return int(head[0].split()[1])
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+
+
+async def run(port, concurrency, requests, users, seed=0):
+    """Send requests from concurrency clients, return (seconds, {endpoint: latencies}, status counts)"""
+    latencies = {endpoint: [] for endpoint in ENDPOINTS}
+    statuses = {}
+
+    async def worker(worker_id):
+        rng = random.Random(seed + worker_id)
+        client = HTTPClient(port)
+        for _ in range(requests // concurrency):
+            i = rng.randrange(users)
+            start = time.perf_counter()
+            if rng.random() < 0.5:
+                endpoint = "/login"
+                status = await client.request("POST", endpoint, {"username": f"user{i}", "password": f"pass{i}"})
+            else:
+                endpoint = "/viewProfile"
+                status = await client.request("GET", endpoint, {"username": f"user{i}"})
+            latencies[endpoint].append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+        await client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(worker_id) for worker_id in range(concurrency)))
+    return time.perf_counter() - start, latencies, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP load test of the async and sync CRUD API on a SQLite stand-in")
+    parser.add_argument("--server", nargs="+", choices=["asgi", "wsgi"], default=["asgi", "wsgi"])
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1], help="uvicorn worker processes (asgi only)")
+    parser.add_argument("--pool-size", type=int, default=10, help="DB connections per worker")
+    parser.add_argument("--latency", type=float, default=2.0, help="simulated ms per query")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="crud_async_load_")
+    path = os.path.join(directory, "main_app.sqlite")
+    create_database(path, args.users)
+
+    print(f"{args.users} users, {args.requests} requests per run, {args.latency} ms per query, "
+          f"{args.pool_size} connections per worker")
+    print(f"{'server':>6} {'workers':>7} {'clients':>7} {'endpoint':>12} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}  statuses")
+    for kind in args.server:
+        for workers in (args.workers if kind == "asgi" else [1]):
+            stop = start_server(kind, path, args.port, workers, args.pool_size, args.latency / 1000)
+            try:
+                for concurrency in args.concurrency:
+                    elapsed, latencies, statuses = asyncio.run(
+                        run(args.port, concurrency, args.requests, args.users))
+                    every = [sample for samples in latencies.values() for sample in samples]
+                    for endpoint, samples in list(latencies.items()) + [("all", every)]:
+                        print(f"{kind:>6} {workers:7} {concurrency:7} {endpoint:>12} {len(samples) / elapsed:8.0f} "
+                              f"{percentile(samples, 50) * 1000:8.2f} {percentile(samples, 99) * 1000:8.2f}"
+                              + (f"  {statuses}" if endpoint == "all" else ""))
+            finally:
+                stop()
+
+
+if __name__ == "__main__":
+    main()
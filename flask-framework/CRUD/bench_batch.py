@@ -0,0 +1,93 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from crudapi import app
+from load_test import create_database, sqlite_pool
+
+# Import/export throughput of the batch endpoints against one /signUp request
+# per user, on the SQLite stand-in of load_test.py (--latency ms per query for
+# the MySQL round trip). The export reads the whole table and reports the peak
+# memory traced while streaming it.
+#
+#   python bench_batch.py --rows 20000 --chunk-size 1000 --latency 1
+
+
+def user(n):
+    return {"firstname": f"First{n}", "lastname": f"Last{n}", "username": f"import{n}",
+            "email": f"import{n}@example.com", "password": f"pass{n}", "confirm_password": f"pass{n}",
+            "phone_number": f"{8000000000 + n}"}
+
+
+def timed(label, rows, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:34} {rows:8} rows {elapsed:8.2f}s {rows / elapsed:10.0f} rows/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batch import and streaming export of the CRUD API")
+    parser.add_argument("--users", type=int, default=100000, help="rows in the table before the import")
+    parser.add_argument("--rows", type=int, default=20000, help="users imported per batch run")
+    parser.add_argument("--single-rows", type=int, default=1000, help="users sent one /signUp at a time")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=1.0, help="simulated ms per query")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="crud_batch_")
+    path = os.path.join(directory, "main_app.sqlite")
+    create_database(path, args.users)
+    app.config["DB_POOL"] = sqlite_pool(path, 2, args.latency / 1000)
+    app.config["BATCH_CHUNK_SIZE"] = args.chunk_size
+    app.config["BATCH_MAX_ROWS"] = max(args.rows, app.config["BATCH_MAX_ROWS"])
+    client = app.test_client()
+    print(f"{args.users} users in the table, {args.latency} ms per query, chunks of {args.chunk_size}")
+
+    def single():
+        for n in range(args.single_rows):
+            assert client.post('/signUp', json=user(n)).status_code == 201
+
+    def batch_json():
+        rows = [user(n) for n in range(args.single_rows, args.single_rows + args.rows)]
+        assert client.post('/signUpBatch', json=rows).get_json()["succeeded"] == args.rows
+
+    def batch_ndjson():
+        first = args.single_rows + args.rows
+        body = "\n".join(json.dumps(user(n)) for n in range(first, first + args.rows))
+        response = client.post('/signUpBatch', data=body, content_type='application/x-ndjson')
+        assert response.get_json()["succeeded"] == args.rows
+
+    def batch_update():
+        rows = [dict(user(n), firstname="Renamed") for n in range(args.single_rows, args.single_rows + args.rows)]
+        assert client.put('/updateUserBatch', json=rows).get_json()["succeeded"] == args.rows
+
+    def batch_delete():
+        rows = [{"username": f"import{n}"} for n in range(args.single_rows, args.single_rows + args.rows)]
+        assert client.delete('/deleteUserBatch', json=rows).get_json()["succeeded"] == args.rows
+
+    timed("/signUp, one request per user", args.single_rows, single)
+    timed("/signUpBatch, JSON array", args.rows, batch_json)
+    timed("/signUpBatch, NDJSON", args.rows, batch_ndjson)
+    timed("/updateUserBatch", args.rows, batch_update)
+    timed("/deleteUserBatch", args.rows, batch_delete)
+
+    total = args.users + args.single_rows + args.rows
+    tracemalloc.start()
+    start = time.perf_counter()
+    response = client.get('/exportUsers', buffered=False)
+    exported = sum(chunk.count(b"\n") for chunk in response.response)
+    response.close()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert exported == total
+    print(f"{'/exportUsers':34} {exported:8} rows {elapsed:8.2f}s {exported / elapsed:10.0f} rows/s"
+          f"   peak {peak / 2 ** 20:.1f} MiB traced")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from load_test import SQLiteConnection, create_database, percentile
+
+# Benchmark of the user_login queries behind the API at 1M rows, on the same
+# SQLite stand-in as load_test.py. Every operation runs with and without the
+# unique indexes of migrations/001_user_login_unique_indexes.sql, and the
+# writes run both as before (SELECT * existence check, then the write) and as
+# the single statements crudapi.py uses now.
+#
+#   python bench_user_login.py --rows 1000000 --ops 200
+
+SELECT_USER = "SELECT * FROM user_login WHERE username = %s"
+INSERT_USER = ("INSERT INTO user_login (firstname, lastname, email, username, password, phone_number) "
+               "VALUES (%s, %s, %s, %s, %s, %s)")
+UPDATE_USER = "UPDATE user_login SET firstname = %s, lastname = %s, email = %s, phone_number = %s WHERE username = %s"
+DELETE_USER = "DELETE FROM user_login WHERE username = %s"
+
+
+def login(cursor, i, _):
+    cursor.execute("SELECT user_id, firstname, lastname FROM user_login WHERE username = %s AND password = %s",
+                   (f"user{i}", f"pass{i}"))
+    cursor.fetchone()
+
+
+def view_profile(cursor, i, _):
+    cursor.execute("SELECT firstname, lastname, email, phone_number FROM user_login WHERE username = %s",
+                   (f"user{i}",))
+    cursor.fetchone()
+
+
+def signup_check_then_insert(cursor, _, n):
+    cursor.execute(SELECT_USER, (f"new{n}",))
+    if cursor.fetchone() is None:
+        cursor.execute(INSERT_USER, ("New", "User", f"new{n}@example.com", f"new{n}", "pass", "9999999999"))
+
+
+def signup_insert(cursor, _, n):
+    cursor.execute(INSERT_USER, ("New", "User", f"new{n}@example.com", f"new{n}", "pass", "9999999999"))
+
+
+def update_check_then_update(cursor, i, _):
+    cursor.execute(SELECT_USER, (f"user{i}",))
+    if cursor.fetchone() is not None:
+        cursor.execute(UPDATE_USER, (f"First{i}", f"Last{i}", f"user{i}@example.com", "9999999999", f"user{i}"))
+
+
+def update_single(cursor, i, _):
+    cursor.execute(UPDATE_USER, (f"First{i}", f"Last{i}", f"user{i}@example.com", "9999999999", f"user{i}"))
+
+
+def delete_check_then_delete(cursor, _, n):
+    cursor.execute(SELECT_USER, (f"new{n}",))
+    if cursor.fetchone() is not None:
+        cursor.execute(DELETE_USER, (f"new{n}",))
+
+
+def delete_single(cursor, _, n):
+    cursor.execute(DELETE_USER, (f"new{n}",))
+
+
+# Each signup case inserts new0..newN and the delete case after it removes them again
+CASES = [
+    ("login", login),
+    ("viewProfile", view_profile),
+    ("signUp check+insert", signup_check_then_insert),
+    ("deleteUser check+delete", delete_check_then_delete),
+    ("signUp insert", signup_insert),
+    ("deleteUser delete", delete_single),
+    ("updateUser check+update", update_check_then_update),
+    ("updateUser update", update_single),
+]
+
+
+def run_case(conn, func, rows, ops, seed=0):
+    """Per-operation latencies of ops calls of func, each committed like a request"""
+    rng = random.Random(seed)
+    cursor = conn.cursor()
+    latencies = []
+    for n in range(ops):
+        i = rng.randrange(rows)
+        start = time.perf_counter()
+        func(cursor, i, n)
+        conn.commit()
+        latencies.append(time.perf_counter() - start)
+    cursor.close()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark user_login queries with and without the unique indexes")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--ops", type=int, default=200, help="operations per case")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="crud_bench_")
+    results = {}
+    for indexes in (False, True):
+        path = os.path.join(directory, f"user_login_{'indexed' if indexes else 'plain'}.sqlite")
+        start = time.perf_counter()
+        create_database(path, args.rows, indexes=indexes)
+        print(f"{args.rows} rows {'with' if indexes else 'without'} unique indexes built in "
+              f"{time.perf_counter() - start:.1f}s")
+        conn = SQLiteConnection(path)
+        for name, func in CASES:
+            results[name, indexes] = run_case(conn, func, args.rows, args.ops)
+        conn.close()
+        os.remove(path)
+
+    print(f"\n{'operation':26} {'no index ms':>12} {'index ms':>10} {'p99 ms':>8} {'speedup':>9}")
+    for name, _ in CASES:
+        plain, indexed = results[name, False], results[name, True]
+        before, after = percentile(plain, 50) * 1000, percentile(indexed, 50) * 1000
+        print(f"{name:26} {before:12.3f} {after:10.3f} {percentile(indexed, 99) * 1000:8.3f} "
+              f"{before / after:8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
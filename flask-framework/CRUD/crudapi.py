@@ -1,22 +1,141 @@
-from flask import Flask, request, jsonify
+import os
+import threading
+
+from flask import Flask, Response, request, jsonify, g
 from flask_cors import CORS
 import mysql.connector
+from mysql.connector.constants import ClientFlag
+
+from db_pool import ConnectionPool, PoolTimeout, duplicate_field
+from user_batch import (EXPORT_FIELDS, SIGNUP_FIELDS, UPDATE_FIELDS, BatchTooLarge, chunked, export_line,
+                        parse_rows, validate_rows)
+from user_cache import UserCache, username_key
 
 app = Flask(__name__)
 CORS(app, origins=['http://localhost:3000'])
 
-db = mysql.connector.connect(
-    host="localhost",
-    user="krish",
-    password="Krish@1209",
-    database="main_app"
+app.config.update(
+    DB_HOST=os.environ.get("DB_HOST", "localhost"),
+    DB_USER=os.environ.get("DB_USER", "krish"),
+    DB_PASSWORD=os.environ.get("DB_PASSWORD", "Krish@1209"),
+    DB_NAME=os.environ.get("DB_NAME", "main_app"),
+    DB_POOL_SIZE=int(os.environ.get("DB_POOL_SIZE", 10)),
+    DB_POOL_TIMEOUT=float(os.environ.get("DB_POOL_TIMEOUT", 5)),
+    # A pool can be set here directly, e.g. one over SQLite for load tests
+    DB_POOL=None,
+    USER_CACHE_SIZE=int(os.environ.get("USER_CACHE_SIZE", 100000)),
+    USER_CACHE_TTL=float(os.environ.get("USER_CACHE_TTL", 60)),
+    USER_BLOOM_CAPACITY=int(os.environ.get("USER_BLOOM_CAPACITY", 1000000)),
+    USER_BLOOM_REFRESH=float(os.environ.get("USER_BLOOM_REFRESH", 300)),
+    # Needed to cache with several workers, e.g. redis://localhost:6379/0
+    USER_CACHE_REDIS_URL=os.environ.get("USER_CACHE_REDIS_URL"),
+    # Worker processes serving the app, serve.py and gunicorn set WEB_CONCURRENCY
+    WEB_WORKERS=int(os.environ.get("WEB_CONCURRENCY", 1)),
+    # A UserCache can be set here directly
+    USER_CACHE=None,
+    BATCH_MAX_ROWS=int(os.environ.get("BATCH_MAX_ROWS", 100000)),
+    # Rows per executemany and transaction in the batch endpoints, and per fetch in the export
+    BATCH_CHUNK_SIZE=int(os.environ.get("BATCH_CHUNK_SIZE", 1000))
 )
 
 
+def get_pool():
+    """The app's connection pool, created on first use"""
+    if app.config["DB_POOL"] is None:
+        app.config["DB_POOL"] = ConnectionPool(
+            lambda: mysql.connector.connect(
+                host=app.config["DB_HOST"],
+                user=app.config["DB_USER"],
+                password=app.config["DB_PASSWORD"],
+                database=app.config["DB_NAME"],
+                # rowcount of an UPDATE counts matched rows, not only changed ones
+                client_flags=[ClientFlag.FOUND_ROWS]
+            ),
+            size=app.config["DB_POOL_SIZE"],
+            timeout=app.config["DB_POOL_TIMEOUT"]
+        )
+    return app.config["DB_POOL"]
+
+
+def get_db():
+    """Connection checked out for the current request, returned in teardown"""
+    if 'db' not in g:
+        g.db = get_pool().get()
+        g.cursors = []
+    return g.db
+
+
+def get_cursor():
+    """New cursor on the request's connection, closed in teardown"""
+    cursor = get_db().cursor()
+    g.cursors.append(cursor)
+    return cursor
+
+
+@app.teardown_appcontext
+def return_db(exception):
+    for cursor in g.pop('cursors', []):
+        try:
+            cursor.close()
+        except Exception:
+            pass
+    db = g.pop('db', None)
+    if db is not None:
+        # A connection that failed mid-request is closed instead of reused
+        get_pool().put(db, broken=isinstance(exception, (mysql.connector.Error, OSError)))
+
+
+def get_user_cache():
+    """The app's profile/availability cache, its Bloom filter is (re)built in the background"""
+    cache = app.config["USER_CACHE"]
+    if cache is None:
+        cache = app.config["USER_CACHE"] = UserCache.from_config(app.config)
+        if not cache.caching:
+            app.logger.warning("%d workers and no USER_CACHE_REDIS_URL, user lookups are not cached",
+                               cache.workers)
+    if cache.claim_bloom_rebuild():
+        threading.Thread(target=rebuild_bloom, args=(cache,), name="bloom-rebuild", daemon=True).start()
+    return cache
+
+
+def rebuild_bloom(cache):
+    """Load every username into a new Bloom filter, on a connection of its own"""
+    pool = get_pool()
+    try:
+        if not cache.claim_shared_rebuild():
+            return
+        conn = pool.get()
+    except Exception:
+        app.logger.exception("Could not rebuild the username Bloom filter")
+        return
+    broken = False
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM user_login")
+        rows = cursor.fetchone()[0]
+        cursor.execute("SELECT username FROM user_login")
+        cache.build_bloom((username for username, in cursor), rows)
+        cursor.close()
+    except Exception:
+        broken = True
+        app.logger.exception("Could not rebuild the username Bloom filter")
+    finally:
+        pool.put(conn, broken=broken)
+
+
+@app.errorhandler(PoolTimeout)
+def pool_exhausted(e):
+    return jsonify({"message": "Server busy, try again"}), 503
+
+
 @app.route('/', methods=['GET'])
 def index():
     return "<h1>Hello World!</h1>"
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return jsonify({"user_cache": get_user_cache().metrics(), "db_pool": get_pool().stats}), 200
+
 @app.route('/login', methods=['POST'])
 def login():
     data = request.get_json()
@@ -24,7 +143,7 @@ def login():
     username=data.get('username')
     password=data.get('password')
 
-    cursor = db.cursor()
+    cursor = get_cursor()
 
     query = "SELECT user_id, firstname, lastname FROM user_login WHERE username = %s AND password = %s"
     cursor.execute(query, (username, password))
@@ -57,17 +176,17 @@ def signup():
     if not phone_number.isdigit():
         return jsonify({"message": "Phone number should contain only numerical digits"}), 400
     
-    cursor = db.cursor()
-    query = "SELECT * FROM user_login WHERE username = %s"
-    cursor.execute(query, (username,))
-    user = cursor.fetchone()
-
-    if user:
-        return jsonify({"message": "Username already taken"}), 400
-    
+    # The unique keys on username and email reject duplicates, no lookup first
+    cursor = get_cursor()
     insert_query = "INSERT INTO user_login (firstname, lastname, email, username, password, phone_number) VALUES (%s, %s, %s, %s, %s, %s)"
-    cursor.execute(insert_query, (firstname, lastname, email, username, password, phone_number))
-    db.commit()
+    try:
+        cursor.execute(insert_query, (firstname, lastname, email, username, password, phone_number))
+    except mysql.connector.IntegrityError as e:
+        if duplicate_field(e) == 'email':
+            return jsonify({"message": "Email already registered"}), 400
+        return jsonify({"message": "Username already taken"}), 400
+    get_db().commit()
+    get_user_cache().user_added(username)
 
     return jsonify({"message": "User created successfully"}), 201
 
@@ -77,19 +196,15 @@ def delete_user():
 
     username = data.get('username')
 
-    cursor = db.cursor()
-    # Check if the username exists
-    query = "SELECT * FROM user_login WHERE username = %s"
-    cursor.execute(query, (username,))
-    user = cursor.fetchone()
-
-    if not user:
-        return jsonify({"message": "User not found"}), 404
-
-    # Delete the user
+    # Delete the user, no row deleted means it did not exist
+    cursor = get_cursor()
     delete_query = "DELETE FROM user_login WHERE username = %s"
     cursor.execute(delete_query, (username,))
-    db.commit()
+
+    if cursor.rowcount == 0:
+        return jsonify({"message": "User not found"}), 404
+    get_db().commit()
+    get_user_cache().invalidate(username)
 
     return jsonify({"message": "User deleted successfully"}), 200
 
@@ -100,19 +215,24 @@ def view_profile():
 
     app.logger.info("Received request for username: %s", username)
 
-    cursor = db.cursor()
-    query = "SELECT firstname, lastname, email, phone_number FROM user_login WHERE username = %s"
-    cursor.execute(query, (username,))
-    user = cursor.fetchone()
-
-    if user:
+    def load_profile():
+        cursor = get_cursor()
+        query = "SELECT firstname, lastname, email, phone_number FROM user_login WHERE username = %s"
+        cursor.execute(query, (username,))
+        user = cursor.fetchone()
+        if not user:
+            return None
         firstname, lastname, email, phone_number = user
-        profile_data = {
+        return {
             "firstname": firstname,
             "lastname": lastname,
             "email": email,
             "phone_number": phone_number
         }
+
+    profile_data = get_user_cache().profile(username, load_profile)
+
+    if profile_data:
         return jsonify(profile_data), 200
     else:
         return jsonify({"message": "User not found"}), 404
@@ -137,19 +257,18 @@ def update_user():
     if not phone_number.isdigit():
         return jsonify({"message": "Phone number should contain only numerical digits"}), 400
 
-    # Check if the user exists
-    cursor = db.cursor()
-    query = "SELECT * FROM user_login WHERE username = %s"
-    cursor.execute(query, (username,))
-    user = cursor.fetchone()
+    # Update user data in the database, no matched row means the user does not exist
+    cursor = get_cursor()
+    update_query = "UPDATE user_login SET firstname = %s, lastname = %s, email = %s, phone_number = %s WHERE username = %s"
+    try:
+        cursor.execute(update_query, (firstname, lastname, email, phone_number, username))
+    except mysql.connector.IntegrityError:
+        return jsonify({"message": "Email already registered"}), 409
 
-    if not user:
+    if cursor.rowcount == 0:
         return jsonify({"message": "User not found"}), 404
-
-    # Update user data in the database
-    update_query = "UPDATE user_login SET firstname = %s, lastname = %s, email = %s, phone_number = %s WHERE username = %s"
-    cursor.execute(update_query, (firstname, lastname, email, phone_number, username))
-    db.commit()
+    get_db().commit()
+    get_user_cache().invalidate(username)
 
     return jsonify({"message": "User data updated successfully"}), 200
 
@@ -161,18 +280,208 @@ def check_username_availability():
     if not username:
         return jsonify({"message": "Username is required"}), 400
 
-    cursor = db.cursor()
-    query = "SELECT * FROM user_login WHERE username = %s"
-    cursor.execute(query, (username,))
-    user = cursor.fetchone()
+    def load_taken():
+        cursor = get_cursor()
+        cursor.execute("SELECT 1 FROM user_login WHERE username = %s", (username,))
+        return cursor.fetchone() is not None
 
-    if user:
+    if get_user_cache().is_taken(username, load_taken):
         return jsonify({"message": "Username is not available"}), 409
     else:
         return jsonify({"message": "Username is available"}), 200
 
 
+# Batch endpoints: a JSON array of users, or NDJSON with Content-Type
+# application/x-ndjson. Invalid rows are rejected up front (user_batch.py), the
+# rest are written BATCH_CHUNK_SIZE rows per statement and transaction. The
+# response has a result per row, in request order.
+
+INSERT_COLUMNS = ("firstname", "lastname", "email", "username", "password", "phone_number")
+INSERT_QUERY = "INSERT INTO user_login (firstname, lastname, email, username, password, phone_number) VALUES (%s, %s, %s, %s, %s, %s)"
+UPDATE_QUERY = "UPDATE user_login SET firstname = %s, lastname = %s, email = %s, phone_number = %s WHERE username = %s"
+
+
+def read_batch(fields, check_password=False):
+    """(rows, per-row results with validation failures filled in), or raise ValueError"""
+    rows = parse_rows(request.stream, request.content_type or '', app.config["BATCH_MAX_ROWS"])
+    errors = validate_rows(rows, fields, check_password)
+    return rows, [(400, error) if error else None for error in errors]
+
+
+def existing_usernames(cursor, usernames):
+    """Keys (see username_key) of the given usernames that are in the table"""
+    marks = ", ".join(["%s"] * len(usernames))
+    cursor.execute(f"SELECT username FROM user_login WHERE username IN ({marks})", usernames)
+    return {username_key(username) for username, in cursor.fetchall()}
+
+
+def batch_response(rows, results, ok_status):
+    items = [{"index": i, "username": row.get('username') if isinstance(row, dict) else None,
+              "status": status, "message": message}
+             for i, (row, (status, message)) in enumerate(zip(rows, results))]
+    succeeded = sum(item["status"] == ok_status for item in items)
+    return jsonify({"succeeded": succeeded, "failed": len(items) - succeeded, "results": items}), 200
+
+
+@app.errorhandler(BatchTooLarge)
+def batch_too_large(e):
+    return jsonify({"message": str(e)}), 413
+
+
+@app.route('/signUpBatch', methods=['POST'])
+def signup_batch():
+    try:
+        rows, results = read_batch(SIGNUP_FIELDS, check_password=True)
+    except ValueError as e:
+        return jsonify({"message": f"Invalid batch: {e}"}), 400
+
+    db = get_db()
+    cursor = get_cursor()
+    for chunk in chunked([i for i, result in enumerate(results) if result is None], app.config["BATCH_CHUNK_SIZE"]):
+        # Rows the unique keys would reject, found with one query instead of a failed insert
+        marks = ", ".join(["%s"] * len(chunk))
+        cursor.execute(f"SELECT username, email FROM user_login WHERE username IN ({marks}) OR email IN ({marks})",
+                       [rows[i]['username'] for i in chunk] + [rows[i]['email'] for i in chunk])
+        taken = cursor.fetchall()
+        taken_usernames = {username_key(username) for username, _ in taken}
+        taken_emails = {email.lower() for _, email in taken}
+        todo = []
+        for i in chunk:
+            if username_key(rows[i]['username']) in taken_usernames:
+                results[i] = (400, "Username already taken")
+            elif rows[i]['email'].lower() in taken_emails:
+                results[i] = (400, "Email already registered")
+            else:
+                todo.append(i)
+
+        params = [tuple(rows[i][column] for column in INSERT_COLUMNS) for i in todo]
+        try:
+            cursor.executemany(INSERT_QUERY, params)
+            for i in todo:
+                results[i] = (201, "User created successfully")
+        except mysql.connector.IntegrityError:
+            # Someone signed up in between, find the rows one by one
+            db.rollback()
+            for i, row_params in zip(todo, params):
+                try:
+                    cursor.execute(INSERT_QUERY, row_params)
+                    results[i] = (201, "User created successfully")
+                except mysql.connector.IntegrityError as e:
+                    results[i] = (400, "Email already registered" if duplicate_field(e) == 'email'
+                                  else "Username already taken")
+        db.commit()
+        for i in todo:
+            if results[i][0] == 201:
+                get_user_cache().user_added(rows[i]['username'])
+
+    return batch_response(rows, results, 201)
+
+@app.route('/updateUserBatch', methods=['PUT'])
+def update_user_batch():
+    try:
+        rows, results = read_batch(UPDATE_FIELDS)
+    except ValueError as e:
+        return jsonify({"message": f"Invalid batch: {e}"}), 400
+
+    db = get_db()
+    cursor = get_cursor()
+    for chunk in chunked([i for i, result in enumerate(results) if result is None], app.config["BATCH_CHUNK_SIZE"]):
+        found = existing_usernames(cursor, [rows[i]['username'] for i in chunk])
+        todo = []
+        for i in chunk:
+            if username_key(rows[i]['username']) in found:
+                todo.append(i)
+            else:
+                results[i] = (404, "User not found")
+
+        params = [(rows[i]['firstname'], rows[i]['lastname'], rows[i]['email'], rows[i]['phone_number'],
+                   rows[i]['username']) for i in todo]
+        try:
+            cursor.executemany(UPDATE_QUERY, params)
+            for i in todo:
+                results[i] = (200, "User data updated successfully")
+        except mysql.connector.IntegrityError:
+            # An email already in use, find the rows one by one
+            db.rollback()
+            for i, row_params in zip(todo, params):
+                try:
+                    cursor.execute(UPDATE_QUERY, row_params)
+                except mysql.connector.IntegrityError:
+                    results[i] = (409, "Email already registered")
+                    continue
+                if cursor.rowcount == 0:
+                    results[i] = (404, "User not found")
+                else:
+                    results[i] = (200, "User data updated successfully")
+        db.commit()
+        for i in todo:
+            get_user_cache().invalidate(rows[i]['username'])
+
+    return batch_response(rows, results, 200)
+
+@app.route('/deleteUserBatch', methods=['DELETE'])
+def delete_user_batch():
+    try:
+        rows, results = read_batch(("username",))
+    except ValueError as e:
+        return jsonify({"message": f"Invalid batch: {e}"}), 400
+
+    db = get_db()
+    cursor = get_cursor()
+    for chunk in chunked([i for i, result in enumerate(results) if result is None], app.config["BATCH_CHUNK_SIZE"]):
+        usernames = [rows[i]['username'] for i in chunk]
+        found = existing_usernames(cursor, usernames)
+        # One statement for the whole chunk
+        marks = ", ".join(["%s"] * len(usernames))
+        cursor.execute(f"DELETE FROM user_login WHERE username IN ({marks})", usernames)
+        db.commit()
+        for i in chunk:
+            if username_key(rows[i]['username']) in found:
+                results[i] = (200, "User deleted successfully")
+                get_user_cache().invalidate(rows[i]['username'])
+            else:
+                results[i] = (404, "User not found")
+
+    return batch_response(rows, results, 200)
+
+@app.route('/exportUsers', methods=['GET'])
+def export_users():
+    # Unbuffered cursor: rows come from the server as they are fetched, a chunk
+    # at a time, so the table is never held in memory. Passwords are not exported.
+    # The response outlives the request's connection, so it checks out its own
+    # and returns it once the last chunk is sent or the client goes away.
+    pool = get_pool()
+    conn = pool.get()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT {', '.join(EXPORT_FIELDS)} FROM user_login ORDER BY user_id")
+    except Exception:
+        pool.put(conn, broken=True)
+        raise
+    chunk_size = app.config["BATCH_CHUNK_SIZE"]
+
+    def generate():
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield ''.join(export_line(row) for row in rows)
+
+    def release():
+        try:
+            cursor.close()
+        except Exception:
+            pass
+        # A stream cut short leaves unread rows, put() then fails the rollback and drops the connection
+        pool.put(conn)
+
+    response = Response(generate(), mimetype='application/x-ndjson')
+    response.call_on_close(release)
+    return response
+
+
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    # Development server only, serve.py runs the API in production
+    app.run(debug=os.environ.get("FLASK_DEBUG", "1") == "1")
 
@@ -0,0 +1,138 @@
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the checkout timeout"""
+
+
+# Unique keys of user_login (migrations/001_user_login_unique_indexes.sql)
+DUPLICATE_KEYS = {"uq_user_login_username": "username", "uq_user_login_email": "email"}
+
+
+def duplicate_field(error):
+    """Which unique column ('username' or 'email') a duplicate key error (1062) is about
+
+    Goes by the key name at the end of the message, "Duplicate entry 'x' for key
+    'user_login.uq_user_login_email'" (MySQL 8 prefixes the table), not by the
+    entry, which is the user's input. Same for mysql.connector and pymysql.
+    """
+    message = str(error.args[1] if len(error.args) > 1 else error)
+    key = message.rpartition(" for key ")[2].strip().strip("'").rpartition(".")[2]
+    return DUPLICATE_KEYS.get(key, "username")
+
+
+class ConnectionPool:
+    """Fixed size pool of DB-API connections
+
+    connect is a zero argument callable returning a new connection, so the same
+    pool serves mysql.connector in production and sqlite3 in tests. Connections
+    are opened on demand up to size; get() waits up to timeout seconds for one
+    to be returned, or for a discarded one's slot to open a new. A connection idle for more than check_after seconds is
+    pinged before it is handed out and replaced when the ping fails, so a
+    dropped connection costs one reconnect instead of failing requests.
+    """
+
+    def __init__(self, connect, size=5, timeout=5.0, check_after=30.0):
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.check_after = check_after
+        # (connection, returned_at), the most recently returned is reused first
+        self._idle = []
+        # Guards _idle and _opened; a returned connection or a freed slot wakes one waiter
+        self._available = threading.Condition()
+        self._opened = 0
+        self.stats = {"checkouts": 0, "waits": 0, "reconnects": 0, "in_use": 0, "max_in_use": 0}
+
+    def _checkout(self, deadline):
+        """(idle connection, returned_at), or (None, None) when a slot was reserved to open one"""
+        waited = False
+        with self._available:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._opened < self.size:
+                    self._opened += 1
+                    return None, None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f"No free connection after {self.timeout}s (pool size {self.size})")
+                if not waited:
+                    waited = True
+                    self.stats["waits"] += 1
+                self._available.wait(remaining)
+
+    def _open(self):
+        """Open a connection in a slot reserved by _checkout"""
+        try:
+            return self.connect()
+        except Exception:
+            self._release_slot()
+            raise
+
+    def _release_slot(self):
+        with self._available:
+            self._opened -= 1
+            self._available.notify()
+
+    @staticmethod
+    def _is_alive(conn):
+        try:
+            if hasattr(conn, 'is_connected'):
+                # mysql.connector pings the server here
+                return conn.is_connected()
+            conn.execute("SELECT 1")
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._release_slot()
+
+    def get(self):
+        """Check out a healthy connection"""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            conn, returned_at = self._checkout(deadline)
+            if conn is None:
+                conn = self._open()
+                break
+            if time.monotonic() - returned_at <= self.check_after or self._is_alive(conn):
+                break
+            # The freed slot goes to whoever asks next, usually this loop
+            self._discard(conn)
+            with self._available:
+                self.stats["reconnects"] += 1
+
+        with self._available:
+            self.stats["checkouts"] += 1
+            self.stats["in_use"] += 1
+            self.stats["max_in_use"] = max(self.stats["max_in_use"], self.stats["in_use"])
+        return conn
+
+    def put(self, conn, broken=False):
+        """Return a connection, rolling back anything left uncommitted"""
+        with self._available:
+            self.stats["in_use"] -= 1
+        if not broken:
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+        if broken:
+            self._discard(conn)
+        else:
+            with self._available:
+                self._idle.append((conn, time.monotonic()))
+                self._available.notify()
+
+    def close(self):
+        with self._available:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._discard(conn)
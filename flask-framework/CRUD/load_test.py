@@ -0,0 +1,182 @@
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import mysql.connector
+
+from crudapi import app
+from db_pool import ConnectionPool
+
+# Load test for the CRUD API against a SQLite stand-in for MySQL. Requests go
+# through the real Flask app (test client, no sockets) with the connection pool
+# swapped for one over a SQLite file. --latency adds a sleep to every query to
+# stand in for the network round trip to a MySQL server, which is what makes
+# more pooled connections pay off.
+#
+#   python load_test.py --users 10000 --threads 1 2 4 8 16 --latency 2
+
+
+def mysql_duplicate(error):
+    """MySQL's duplicate key error for a sqlite3 one like 'UNIQUE constraint failed: user_login.email'"""
+    column = str(error).rpartition(".")[2]
+    return mysql.connector.IntegrityError(
+        msg=f"Duplicate entry for key 'user_login.uq_user_login_{column}'", errno=1062, sqlstate="23000")
+
+
+class SQLiteCursor:
+    """DB-API cursor that accepts MySQL style %s placeholders and raises MySQL's IntegrityError"""
+
+    def __init__(self, cursor, latency):
+        self._cursor = cursor
+        self._latency = latency
+
+    def execute(self, query, params=()):
+        if self._latency:
+            time.sleep(self._latency)
+        try:
+            return self._cursor.execute(query.replace('%s', '?'), params)
+        except sqlite3.IntegrityError as e:
+            raise mysql_duplicate(e)
+
+    def executemany(self, query, rows):
+        if self._latency:
+            time.sleep(self._latency)
+        try:
+            return self._cursor.executemany(query.replace('%s', '?'), rows)
+        except sqlite3.IntegrityError as e:
+            raise mysql_duplicate(e)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+
+class SQLiteConnection:
+    """sqlite3 connection handing out SQLiteCursor objects"""
+
+    def __init__(self, path, latency=0.0):
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._latency = latency
+
+    def cursor(self, *args, **kwargs):
+        return SQLiteCursor(self._conn.cursor(), self._latency)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+SCHEMA = """
+CREATE TABLE user_login (
+  user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+  firstname varchar(255) NOT NULL,
+  lastname varchar(255) NOT NULL,
+  username varchar(255) NOT NULL,
+  password varchar(255) NOT NULL,
+  email varchar(255) NOT NULL,
+  phone_number varchar(10) NOT NULL,
+  created_at timestamp DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+# Same unique keys as db.sql (migrations/001_user_login_unique_indexes.sql)
+INDEXES = [
+    "CREATE UNIQUE INDEX uq_user_login_username ON user_login (username)",
+    "CREATE UNIQUE INDEX uq_user_login_email ON user_login (email)",
+]
+
+
+def create_database(path, users, indexes=True):
+    """SQLite file with the user_login table and users rows user0..userN"""
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(SCHEMA)
+    for statement in INDEXES if indexes else []:
+        conn.execute(statement)
+    conn.executemany(
+        "INSERT INTO user_login (firstname, lastname, username, password, email, phone_number) VALUES (?, ?, ?, ?, ?, ?)",
+        ((f"First{i}", f"Last{i}", f"user{i}", f"pass{i}", f"user{i}@example.com", f"{9000000000 + i}")
+         for i in range(users))
+    )
+    conn.commit()
+    conn.close()
+
+
+def sqlite_pool(path, size, latency=0.0):
+    return ConnectionPool(lambda: SQLiteConnection(path, latency), size=size, timeout=30)
+
+
+def percentile(samples, point):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(round(point / 100 * (len(samples) - 1))))]
+
+
+def run(threads, requests, users, seed=0):
+    """Send requests spread over threads, return (seconds, latencies, status counts)"""
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+
+    def worker(worker_id):
+        rng = random.Random(seed + worker_id)
+        client = app.test_client()
+        local = []
+        for _ in range(requests // threads):
+            i = rng.randrange(users)
+            kind = rng.random()
+            start = time.perf_counter()
+            if kind < 0.4:
+                response = client.post('/login', json={"username": f"user{i}", "password": f"pass{i}"})
+            elif kind < 0.8:
+                response = client.get('/viewProfile', json={"username": f"user{i}"})
+            else:
+                # Half of the checks are for names nobody has, as typed into the signup form
+                name = f"user{i}" if kind < 0.9 else f"newuser{i}"
+                response = client.post('/checkUsernameAvailability', json={"username": name})
+            local.append(time.perf_counter() - start)
+            with lock:
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        with lock:
+            latencies.extend(local)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(worker, range(threads)))
+    return time.perf_counter() - start, latencies, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the CRUD API on a SQLite stand-in")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--pool-size", type=int, help="connections in the pool, defaults to the thread count")
+    parser.add_argument("--latency", type=float, default=2.0, help="simulated ms per query")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="crud_load_")
+    path = os.path.join(directory, "main_app.sqlite")
+    create_database(path, args.users)
+
+    print(f"{args.users} users, {args.requests} requests per run, {args.latency} ms per query")
+    print(f"{'threads':>7} {'pool':>5} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'waits':>6} {'no db':>6}  statuses")
+    for threads in args.threads:
+        pool = sqlite_pool(path, args.pool_size or threads, args.latency / 1000)
+        app.config["DB_POOL"] = pool
+        # Every run starts with a cold user cache
+        app.config["USER_CACHE"] = None
+        elapsed, latencies, statuses = run(threads, args.requests, args.users)
+        served_without_db = app.config["USER_CACHE"].metrics()["served_without_db"] or 0
+        print(f"{threads:7} {pool.size:5} {len(latencies) / elapsed:9.0f} {percentile(latencies, 50) * 1000:8.2f} "
+              f"{percentile(latencies, 99) * 1000:8.2f} {pool.stats['waits']:6} {served_without_db:6.0%}  {statuses}")
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+-- Unique indexes on user_login.username and user_login.email
+--
+-- Every endpoint looks users up by username, without an index each of those
+-- is a full table scan. The unique keys also let signUp and updateUser write
+-- in a single statement and rely on the duplicate key error (1062) instead of
+-- a SELECT before every write.
+--
+-- The ALTER fails while duplicates exist, list them first with:
+--
+--   SELECT username, COUNT(*) FROM user_login GROUP BY username HAVING COUNT(*) > 1;
+--   SELECT email, COUNT(*) FROM user_login GROUP BY email HAVING COUNT(*) > 1;
+
+ALTER TABLE `user_login`
+  ADD UNIQUE KEY `uq_user_login_username` (`username`),
+  ADD UNIQUE KEY `uq_user_login_email` (`email`),
+  ALGORITHM=INPLACE, LOCK=NONE;
+
+-- Rollback:
+--   ALTER TABLE `user_login` DROP INDEX `uq_user_login_username`, DROP INDEX `uq_user_login_email`;
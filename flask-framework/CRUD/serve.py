@@ -0,0 +1,36 @@
+import argparse
+import os
+
+import uvicorn
+
+# Production entry point for the CRUD API: the async app (async_crudapi.py)
+# under uvicorn with several worker processes. crudapi.py's app.run() is the
+# Werkzeug development server and only meant for local debugging.
+#
+#   python serve.py --workers 4 --port 5000
+#   WEB_CONCURRENCY=8 DB_POOL_SIZE=20 python serve.py
+#
+# With more than one worker the user cache needs Redis, see user_cache.py:
+#
+#   USER_CACHE_REDIS_URL=redis://localhost:6379/0 python serve.py --workers 4
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the CRUD API with uvicorn")
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 5000)))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1)),
+                        help="worker processes, each with its own DB pool of DB_POOL_SIZE connections")
+    parser.add_argument("--app", default="async_crudapi:app", help="ASGI app as module:attribute")
+    parser.add_argument("--factory", action="store_true", help="--app is a function returning the app")
+    parser.add_argument("--log-level", default="warning")
+    args = parser.parse_args()
+
+    # The workers inherit it, so their user caches know they are not alone
+    os.environ["WEB_CONCURRENCY"] = str(args.workers)
+    uvicorn.run(args.app, host=args.host, port=args.port, workers=args.workers, factory=args.factory,
+                log_level=args.log_level, access_log=False)
+
+
+if __name__ == "__main__":
+    main()
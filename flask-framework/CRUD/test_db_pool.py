@@ -0,0 +1,79 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from db_pool import ConnectionPool, PoolTimeout, duplicate_field
+
+
+def sqlite_pool(size=1, timeout=2.0, check_after=30.0):
+    return ConnectionPool(lambda: sqlite3.connect(":memory:", check_same_thread=False), size=size,
+                          timeout=timeout, check_after=check_after)
+
+
+def test_waiter_opens_a_connection_when_a_broken_one_is_discarded():
+    pool = sqlite_pool(size=1, timeout=5.0)
+    conn = pool.get()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.get()))
+    waiter.start()
+    time.sleep(0.2)
+    start = time.monotonic()
+    pool.put(conn, broken=True)
+    waiter.join(timeout=5)
+    assert got and got[0] is not conn
+    assert time.monotonic() - start < 1
+    assert pool.stats["waits"] == 1
+
+
+def test_returned_connection_is_reused():
+    pool = sqlite_pool(size=2)
+    conn = pool.get()
+    pool.put(conn)
+    assert pool.get() is conn
+    assert pool._opened == 1
+
+
+def test_times_out_when_every_connection_stays_checked_out():
+    pool = sqlite_pool(size=1, timeout=0.2)
+    pool.get()
+    with pytest.raises(PoolTimeout):
+        pool.get()
+
+
+def test_dead_idle_connection_is_replaced():
+    pool = sqlite_pool(size=1, check_after=0.0)
+    conn = pool.get()
+    pool.put(conn)
+    conn.close()
+    fresh = pool.get()
+    assert fresh is not conn
+    assert fresh.execute("SELECT 1").fetchone() == (1,)
+    assert pool.stats["reconnects"] == 1
+
+
+def test_failed_connect_frees_its_slot():
+    attempts = []
+
+    def connect():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise sqlite3.OperationalError("refused")
+        return sqlite3.connect(":memory:", check_same_thread=False)
+
+    pool = ConnectionPool(connect, size=1, timeout=0.5)
+    with pytest.raises(sqlite3.OperationalError):
+        pool.get()
+    assert pool.get() is not None
+
+
+@pytest.mark.parametrize("args, field", [
+    ((1062, "Duplicate entry 'emailking' for key 'user_login.uq_user_login_username'"), "username"),
+    ((1062, "Duplicate entry 'a@b.c' for key 'uq_user_login_email'"), "email"),
+    # mysql.connector: (errno, "errno (sqlstate): message", sqlstate)
+    ((1062, "1062 (23000): Duplicate entry 'x for key email' for key 'user_login.uq_user_login_username'", "23000"),
+     "username"),
+])
+def test_duplicate_field_goes_by_the_key_name(args, field):
+    assert duplicate_field(sqlite3.IntegrityError(*args)) == field
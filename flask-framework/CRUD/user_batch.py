@@ -0,0 +1,100 @@
+import io
+import json
+from collections import Counter
+
+from user_cache import username_key
+
+# Parsing and validation for the batch endpoints of crudapi.py. A batch is a
+# JSON array of user objects, or NDJSON (one object per line) when sent as
+# application/x-ndjson. Validation runs one rule at a time over whole columns
+# rather than row by row, and gives every row either None or the message the
+# single-row endpoint would have answered with.
+
+SIGNUP_FIELDS = ("firstname", "lastname", "username", "email", "password", "phone_number")
+UPDATE_FIELDS = ("username", "firstname", "lastname", "email", "phone_number")
+EXPORT_FIELDS = ("user_id", "firstname", "lastname", "username", "email", "phone_number", "created_at")
+
+
+class BatchTooLarge(ValueError):
+    """More rows than the app's BATCH_MAX_ROWS"""
+
+
+def parse_rows(stream, content_type, max_rows):
+    """Rows of a JSON array or NDJSON body; a line that is not JSON becomes a str row and fails validation"""
+    if content_type.startswith("application/x-ndjson"):
+        if isinstance(stream, io.RawIOBase):
+            # Line iteration on a raw stream reads a few bytes at a time
+            stream = io.BufferedReader(stream, 1 << 16)
+        rows = []
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            if len(rows) == max_rows:
+                raise BatchTooLarge(f"At most {max_rows} rows per request")
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                rows.append(line.decode(errors="replace") if isinstance(line, bytes) else line)
+        return rows
+
+    rows = json.load(stream)
+    if isinstance(rows, dict):
+        rows = rows.get("users")
+    if not isinstance(rows, list):
+        raise ValueError("Expected a JSON array of users")
+    if len(rows) > max_rows:
+        raise BatchTooLarge(f"At most {max_rows} rows per request")
+    return rows
+
+
+def validate_rows(rows, fields, check_password=False):
+    """Per-row error message or None; rows with an error must not be written"""
+    errors = [None] * len(rows)
+
+    def fail(mask, message):
+        for i, bad in enumerate(mask):
+            if bad and errors[i] is None:
+                errors[i] = message
+
+    fail([not isinstance(row, dict) for row in rows], "Row should be a JSON object")
+    column = lambda field: [row.get(field) if isinstance(row, dict) else None for row in rows]
+    columns = {field: column(field) for field in fields}
+
+    for field in fields:
+        fail([value is None or value == '' for value in columns[field]], f"Missing {field}")
+        fail([value is not None and not isinstance(value, str) for value in columns[field]],
+             f"{field} should be a string")
+
+    if check_password:
+        confirm = column("confirm_password")
+        fail([c is not None and c != p for p, c in zip(columns["password"], confirm)],
+             "Password and confirm password do not match.")
+
+    if "phone_number" in columns:
+        phones = [value if isinstance(value, str) else '' for value in columns["phone_number"]]
+        fail([len(phone) != 10 for phone in phones], "Phone number should be 10 digits")
+        fail([not phone.isdigit() for phone in phones], "Phone number should contain only numerical digits")
+
+    # The unique keys compare without case, so must the duplicate check
+    usernames = [username_key(value) if isinstance(value, str) else None for value in columns["username"]]
+    repeated = {key for key, count in Counter(usernames).items() if key and count > 1}
+    fail([key in repeated for key in usernames], "Username appears more than once in the batch")
+    if "email" in columns:
+        emails = [value.lower() if isinstance(value, str) else None for value in columns["email"]]
+        repeated = {key for key, count in Counter(emails).items() if key and count > 1}
+        fail([key in repeated for key in emails], "Email appears more than once in the batch")
+
+    return errors
+
+
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def export_line(row):
+    """One NDJSON line of a user_login row in EXPORT_FIELDS order"""
+    record = {field: value.isoformat(sep=' ') if hasattr(value, 'isoformat') else value
+              for field, value in zip(EXPORT_FIELDS, row)}
+    return json.dumps(record) + "\n"
@@ -0,0 +1,518 @@
+import asyncio
+import hashlib
+import json
+import math
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+# Read-through cache for the user lookups behind /viewProfile and
+# /checkUsernameAvailability, shared by crudapi.py and async_crudapi.py.
+#
+# Profiles and "is this username taken" answers are cached per username,
+# including negative answers, in an in-process LRU with a TTL or in Redis
+# (RedisBackend). signUp, updateUser and deleteUser invalidate the username
+# they wrote, in the backend, so with Redis every worker sees it. A lookup that
+# read the database before such a write does not store what it read: within a
+# process a generation counter catches it, across workers RedisBackend bumps a
+# version per key on delete and only sets a value if the version is unchanged.
+#
+# On top of that a Bloom filter holds every taken username. A username that is
+# not in the filter is certainly free, which answers most availability checks
+# (the form calls it on every keystroke, with names nobody has) without a
+# cache entry or a query. The filter cannot forget deleted names, these only
+# cost a lookup. It is rebuilt from the table every USER_BLOOM_REFRESH seconds.
+#
+# Both only hold when every write goes through this cache. With several worker
+# processes (WEB_CONCURRENCY) an in-process LRU or filter would miss the other
+# workers' writes, so then the cache needs Redis (USER_CACHE_REDIS_URL) for the
+# entries and the filter; without it every lookup goes to the database.
+
+MISSING = object()
+
+
+def username_key(username):
+    """Username folded like MySQL's utf8mb4_0900_ai_ci compares it (case and accent insensitive)
+
+    Names the table treats as equal must share a key, or the Bloom filter would
+    call 'User1' free while 'user1' exists.
+    """
+    if username.isascii():
+        return username.lower()
+    decomposed = unicodedata.normalize('NFKD', username.casefold())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+class LRUCache:
+    """In-process LRU cache whose entries expire ttl seconds after they were set"""
+
+    # Other processes neither see nor invalidate these entries
+    shared = False
+    # Calls are in-memory, fine to make on an event loop
+    blocking = False
+
+    def __init__(self, max_size=10000, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        """Cached value, or MISSING"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def get_versioned(self, key):
+        """(cached value or MISSING, version to pass to set_versioned)"""
+        return self.get(key), None
+
+    def set_versioned(self, key, value, version):
+        # Only this process writes here, UserCache's generation covers it
+        self.set(key, value)
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# KEYS: value, version; ARGV: JSON value, version read with the miss, TTL
+SET_IF_VERSION = """
+if (redis.call('GET', KEYS[2]) or '') ~= ARGV[2] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+return 1
+"""
+
+
+class RedisBackend:
+    """Cache backend over a redis-py client, shared by every worker process
+
+    Values are stored as JSON under prefix + key with a TTL. Pass the client in,
+    e.g. redis.Redis.from_url(url), so redis stays an optional dependency.
+
+    delete() also bumps prefix + "version:" + key, which set_versioned() checks
+    in the same script as it sets, so a worker cannot store a value it read
+    before another worker's write. The version lives ttl seconds; a load
+    slower than that could still store a stale value, for at most ttl seconds.
+    """
+
+    shared = True
+    # Every call is a network round trip, async callers run them in a thread
+    blocking = True
+
+    def __init__(self, client, ttl=60, prefix="crud:user:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self._set_if_version = client.register_script(SET_IF_VERSION)
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return MISSING if value is None else json.loads(value)
+
+    def get_versioned(self, key):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.get(self.prefix + key)
+        pipe.get(self.prefix + "version:" + key)
+        value, version = pipe.execute()
+        return MISSING if value is None else json.loads(value), version or ""
+
+    def set_versioned(self, key, value, version):
+        self._set_if_version(keys=[self.prefix + key, self.prefix + "version:" + key],
+                             args=[json.dumps(value), version, self.ttl])
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, json.dumps(value), ex=self.ttl)
+
+    def delete(self, key):
+        pipe = self.client.pipeline()
+        pipe.incr(self.prefix + "version:" + key)
+        pipe.expire(self.prefix + "version:" + key, self.ttl)
+        pipe.delete(self.prefix + key)
+        pipe.execute()
+
+    def __len__(self):
+        return 0
+
+
+def bloom_size(capacity, error_rate):
+    """(bits, hash functions) of a Bloom filter for capacity items at error_rate"""
+    size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+    return size, max(1, round(size / capacity * math.log(2)))
+
+
+def bloom_positions(item, size, hashes):
+    # Double hashing: k positions from the two halves of one digest
+    digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], 'little')
+    h2 = int.from_bytes(digest[8:], 'little') | 1
+    return [(h1 + i * h2) % size for i in range(hashes)]
+
+
+class BloomFilter:
+    """Set membership with false positives at about error_rate and no false negatives"""
+
+    # Only this process' add() calls reach it
+    shared = False
+    blocking = False
+
+    def __init__(self, capacity=1_000_000, error_rate=0.01):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size, self.hashes = bloom_size(capacity, error_rate)
+        # Bit i is 0x80 >> (i & 7) of byte i >> 3, the order of Redis' SETBIT
+        self._bits = bytearray((self.size + 7) // 8)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def add(self, item):
+        positions = bloom_positions(item, self.size, self.hashes)
+        with self._lock:
+            for position in positions:
+                self._bits[position >> 3] |= 0x80 >> (position & 7)
+            self.count += 1
+
+    def update(self, items):
+        """Add many items at once, for a filter no other thread uses yet"""
+        bits, size, hashes = self._bits, self.size, range(self.hashes)
+        blake2b = hashlib.blake2b
+        for item in items:
+            digest = blake2b(item.encode(), digest_size=16).digest()
+            h1 = int.from_bytes(digest[:8], 'little')
+            h2 = int.from_bytes(digest[8:], 'little') | 1
+            for i in hashes:
+                position = (h1 + i * h2) % size
+                bits[position >> 3] |= 0x80 >> (position & 7)
+            self.count += 1
+
+    def __contains__(self, item):
+        bits = self._bits
+        return all(bits[position >> 3] & (0x80 >> (position & 7))
+                   for position in bloom_positions(item, self.size, self.hashes))
+
+
+class RedisBloomFilter:
+    """Bloom filter whose bits are a Redis string, so every worker adds to and reads the same one
+
+    Sized by capacity alone since all workers must agree on it. Until a first
+    build has been merged in the key does not exist and every name counts as
+    possibly taken. Rebuilds OR into the bits, so deleted names stay until the
+    key is deleted.
+    """
+
+    shared = True
+    blocking = True
+    count = None
+
+    def __init__(self, client, capacity=1_000_000, error_rate=0.01, key="crud:user:bloom"):
+        self.client = client
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size, self.hashes = bloom_size(capacity, error_rate)
+        self.key = key
+
+    def add(self, item):
+        pipe = self.client.pipeline(transaction=False)
+        for position in bloom_positions(item, self.size, self.hashes):
+            pipe.setbit(self.key, position, 1)
+        pipe.execute()
+
+    def __contains__(self, item):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.exists(self.key)
+        for position in bloom_positions(item, self.size, self.hashes):
+            pipe.getbit(self.key, position)
+        built, *bits = pipe.execute()
+        return not built or all(bits)
+
+    def claim_rebuild(self, interval, retry=10):
+        """True for the one worker that should rebuild in this interval, or retry seconds before a first build"""
+        if not self.client.exists(self.key):
+            interval = retry
+        return bool(self.client.set(f"{self.key}:rebuild", 1, nx=True, ex=max(1, int(interval))))
+
+    def merge(self, bloom):
+        """OR the bits of a BloomFilter of the same size into the shared ones"""
+        staging = f"{self.key}:staging"
+        self.client.set(staging, bytes(bloom._bits), ex=60)
+        self.client.bitop("OR", self.key, self.key, staging)
+        self.client.delete(staging)
+
+
+class UserCache:
+    """Read-through cache of profiles and username availability, see the module comment
+
+    workers is the number of processes writing through caches like this one.
+    Above 1, entries are only cached in a shared backend and Bloom negatives
+    only trusted from a shared filter (shared_bloom, e.g. a RedisBloomFilter).
+    """
+
+    def __init__(self, backend=None, bloom_capacity=1_000_000, bloom_error_rate=0.01, bloom_refresh=300,
+                 workers=1, shared_bloom=None):
+        self.backend = backend if backend is not None else LRUCache()
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+        self.bloom_refresh = bloom_refresh
+        self.workers = workers
+        self.caching = workers == 1 or getattr(self.backend, "shared", False)
+        self.bloom = shared_bloom
+        self._bloom_attempted_at = -math.inf
+        # Usernames added while a rebuild is running, None when none is
+        self._pending = None
+        # Bumped by every invalidation, a load that overlapped one is not stored
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "uncached": 0, "bloom_negatives": 0, "invalidations": 0,
+                      "bloom_rebuilds": 0}
+
+    @classmethod
+    def from_config(cls, config):
+        """UserCache for an app's USER_* and WEB_WORKERS settings, in Redis when USER_CACHE_REDIS_URL is set"""
+        url = config.get("USER_CACHE_REDIS_URL")
+        if not url:
+            return cls(LRUCache(config["USER_CACHE_SIZE"], config["USER_CACHE_TTL"]),
+                       bloom_capacity=config["USER_BLOOM_CAPACITY"],
+                       bloom_refresh=config["USER_BLOOM_REFRESH"],
+                       workers=config["WEB_WORKERS"])
+        import redis
+
+        client = redis.Redis.from_url(url)
+        return cls(RedisBackend(client, ttl=config["USER_CACHE_TTL"]),
+                   bloom_capacity=config["USER_BLOOM_CAPACITY"],
+                   bloom_refresh=config["USER_BLOOM_REFRESH"],
+                   workers=config["WEB_WORKERS"],
+                   shared_bloom=RedisBloomFilter(client, config["USER_BLOOM_CAPACITY"]))
+
+    @property
+    def bloom_authoritative(self):
+        """Whether the filter sees every signup, so that a name missing from it is free"""
+        return self.workers == 1 or getattr(self.bloom, "shared", False)
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    @staticmethod
+    async def _call(target, method, *args):
+        """target.method(*args) from a coroutine, in a thread when target does network I/O"""
+        func = getattr(target, method)
+        if getattr(target, "blocking", False):
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+
+    def claim_bloom_rebuild(self):
+        """True for the one caller in this process that should rebuild the Bloom filter now
+
+        That is every bloom_refresh seconds, or 10 seconds after a failed first
+        build; a shared filter is checked every 10 seconds and the rebuild then
+        calls claim_shared_rebuild first. Never when the filter could not be
+        trusted anyway. The caller then passes all usernames to build_bloom.
+        No I/O, so it can run on an event loop.
+        """
+        if not self.bloom_authoritative:
+            return False
+        with self._lock:
+            shared = getattr(self.bloom, "shared", False)
+            wait = self.bloom_refresh if self.bloom is not None and not shared else 10
+            if time.monotonic() - self._bloom_attempted_at < wait:
+                return False
+            self._bloom_attempted_at = time.monotonic()
+            self._pending = set()
+        return True
+
+    def claim_shared_rebuild(self):
+        """False when another worker rebuilds the shared filter in this interval; blocking, call it off the loop"""
+        if not getattr(self.bloom, "shared", False) or self.bloom.claim_rebuild(self.bloom_refresh):
+            return True
+        with self._lock:
+            self._pending = None
+        return False
+
+    def build_bloom(self, usernames, rows=0):
+        """Replace the Bloom filter with one holding usernames (rows is a size hint)"""
+        if getattr(self.bloom, "shared", False):
+            # Signups during the build were added to the shared bits directly
+            bloom = BloomFilter(self.bloom.capacity, self.bloom.error_rate)
+            bloom.update(username_key(username) for username in usernames)
+            self.bloom.merge(bloom)
+            with self._lock:
+                self._pending = None
+                self.stats["bloom_rebuilds"] += 1
+            return self.bloom
+        bloom = BloomFilter(max(self.bloom_capacity, 2 * rows), self.bloom_error_rate)
+        bloom.update(username_key(username) for username in usernames)
+        with self._lock:
+            # Signups since the usernames were read
+            for key in self._pending or ():
+                bloom.add(key)
+            self.bloom, self._pending = bloom, None
+            self.stats["bloom_rebuilds"] += 1
+        return bloom
+
+    def _looked_up(self, value):
+        """(value, generation to pass to _store) after counting the lookup"""
+        with self._lock:
+            self.stats["hits" if value is not MISSING else "misses"] += 1
+            return value, self._generation
+
+    def _current(self, generation):
+        with self._lock:
+            return generation == self._generation
+
+    def _store(self, key, value, generation, version):
+        # Skip it when the username was written while the value was loaded, in
+        # this process (generation) or another one (the backend's version). The
+        # set runs outside the lock, an invalidation during it is undone below
+        if self._current(generation):
+            self.backend.set_versioned(key, value, version)
+            if not self._current(generation):
+                self.backend.delete(key)
+
+    async def _store_async(self, key, value, generation, version):
+        if self._current(generation):
+            await self._call(self.backend, "set_versioned", key, value, version)
+            if not self._current(generation):
+                await self._call(self.backend, "delete", key)
+
+    def _read_through(self, key, load):
+        if not self.caching:
+            self._count("uncached")
+            return load()
+        value, version = self.backend.get_versioned(key)
+        value, generation = self._looked_up(value)
+        if value is MISSING:
+            value = load()
+            self._store(key, value, generation, version)
+        return value
+
+    async def _read_through_async(self, key, load):
+        if not self.caching:
+            self._count("uncached")
+            return await load()
+        value, version = await self._call(self.backend, "get_versioned", key)
+        value, generation = self._looked_up(value)
+        if value is MISSING:
+            value = await load()
+            await self._store_async(key, value, generation, version)
+        return value
+
+    def _bloom_trusted(self):
+        return self.bloom is not None and self.bloom_authoritative
+
+    def _certainly_free(self, username):
+        if self._bloom_trusted() and username_key(username) not in self.bloom:
+            self._count("bloom_negatives")
+            return True
+        return False
+
+    async def _certainly_free_async(self, username):
+        if self._bloom_trusted() and not await self._call(self.bloom, "__contains__", username_key(username)):
+            self._count("bloom_negatives")
+            return True
+        return False
+
+    def profile(self, username, load):
+        """Profile dict of username or None, load() runs the query on a miss"""
+        return self._read_through(f"profile:{username_key(username)}", load)
+
+    def is_taken(self, username, load):
+        """Whether username exists; answered by the Bloom filter when it can, else read through"""
+        if self._certainly_free(username):
+            return False
+        return self._read_through(f"taken:{username_key(username)}", load)
+
+    async def profile_async(self, username, load):
+        """profile() with a coroutine function as load"""
+        return await self._read_through_async(f"profile:{username_key(username)}", load)
+
+    async def is_taken_async(self, username, load):
+        """is_taken() with a coroutine function as load"""
+        if await self._certainly_free_async(username):
+            return False
+        return await self._read_through_async(f"taken:{username_key(username)}", load)
+
+    def _added(self, key):
+        """Record a signup; returns the filter key still has to be added to, outside the lock"""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.add(key)
+            bloom = self.bloom
+            if bloom is None or bloom.blocking:
+                return bloom
+            bloom.add(key)
+            return None
+
+    def user_added(self, username):
+        key = username_key(username)
+        bloom = self._added(key)
+        if bloom is not None:
+            bloom.add(key)
+        self.invalidate(username)
+
+    async def user_added_async(self, username):
+        """user_added() for coroutines"""
+        key = username_key(username)
+        bloom = self._added(key)
+        if bloom is not None:
+            await self._call(bloom, "add", key)
+        await self.invalidate_async(username)
+
+    def _invalidated(self, username):
+        """Bump the generation, returns the backend keys of username to delete"""
+        with self._lock:
+            self._generation += 1
+            self.stats["invalidations"] += 1
+        key = username_key(username)
+        return f"profile:{key}", f"taken:{key}"
+
+    def invalidate(self, username):
+        for key in self._invalidated(username):
+            self.backend.delete(key)
+
+    async def invalidate_async(self, username):
+        """invalidate() for coroutines"""
+        for key in self._invalidated(username):
+            await self._call(self.backend, "delete", key)
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"]
+        answered = lookups + stats["uncached"] + stats["bloom_negatives"]
+        return dict(
+            stats,
+            size=len(self.backend),
+            evictions=getattr(self.backend, "evictions", None),
+            caching=self.caching,
+            bloom_authoritative=self.bloom_authoritative,
+            hit_rate=round(stats["hits"] / lookups, 4) if lookups else None,
+            # Share of lookups that did not reach the database
+            served_without_db=round((stats["hits"] + stats["bloom_negatives"]) / answered, 4) if answered else None,
+            bloom_entries=getattr(self.bloom, "count", None)
+        )
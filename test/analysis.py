@@ -1,32 +1,99 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait
 import json
 import os
-from tabulate import tabulate
+import traceback
+from price_store import PriceStore, YFinanceProvider
+from peer_fetch import PeerFetcher
+from fundamentals_cache import FundamentalsCache
+from chart_renderer import CHART_COLUMNS, ChartRenderer, ChartTemplate, render_chart
+from report_writer import JSONReportWriter, make_writer
+from symbol_master import default_master
+from pipeline_metrics import Metrics, profiled
+
+# Counters every report carries, 0 when unused, so a run's reports share columns
+REPORT_COUNTERS = ('price_cache_hits', 'price_cache_misses', 'bytes_fetched', 'fundamentals_cache_hits',
+                   'fundamentals_cache_misses', 'rows_processed', 'peer_index_hits', 'peer_cache_hits',
+                   'peer_cache_misses')
 
 class NSEStockAnalyzer:
-    def __init__(self, symbol):
+    def __init__(self, symbol, provider=None, store=None, hist=None, peers=None, fundamentals=None,
+                 master=None, peer_index=None):
         # Format symbol for NSE
         if not symbol.endswith('.NS'):
             self.symbol = f"{symbol.upper()}.NS"
         else:
             self.symbol = symbol.upper()
             
-        self.stock = yf.Ticker(self.symbol)
+        # A PriceStore serves cached bars and only fetches the missing tail
+        if store is not None:
+            provider = store.provider
+        self.provider = provider or YFinanceProvider()
+        # Peer prices come from a shared fetcher so batches reuse each other's downloads,
+        # one created here is closed by close()
+        self._owns_peers = peers is None
+        self.peers = peers or PeerFetcher(self.provider, store=store)
+        # Fundamentals are only requested the first time self.info is read
+        self.fundamentals = fundamentals or FundamentalsCache(self.provider)
+        self._info = None
+        # Company names and sectors come from the shared symbol master
+        self.master = master or default_master()
+        # A PeerIndex built offline replaces the sector lookup and peer downloads
+        self.peer_index = peer_index
         self.today = datetime.now().date()
-        
-        # Get historical data for 3 years
-        self.hist = self.stock.history(period="3y")
+        # Stage timers and counters, reported under report["metrics"]
+        self.metrics = Metrics(counters=REPORT_COUNTERS)
+        
+        # Get historical data for 3 years, batch runs hand in bars they already downloaded
+        with self.metrics.stage('fetch'):
+            if hist is not None:
+                self.hist = hist
+            elif store is not None:
+                misses = store.misses
+                self.hist = store.get_history(self.symbol)
+                fetched = store.misses > misses
+                self.metrics.incr('price_cache_misses' if fetched else 'price_cache_hits')
+                if fetched:
+                    self.metrics.incr('bytes_fetched', _frame_bytes(self.hist))
+            else:
+                self.hist = self.provider.history(self.symbol, period="3y")
+                self.metrics.incr('bytes_fetched', _frame_bytes(self.hist))
         
         # Check if data is available
         if len(self.hist) == 0:
+            self.close()
             raise ValueError(f"No data available for symbol {self.symbol}")
-            
-        self.info = self.stock.info
-        self.name = self.info.get('shortName', self.symbol.replace('.NS', ''))
+    
+    def close(self):
+        """Stop the peer fetcher's threads if this analyzer created it"""
+        if self._owns_peers:
+            self.peers.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    @property
+    def info(self):
+        if self._info is None:
+            with self.metrics.stage('info'):
+                hits, misses = self.fundamentals.hits, self.fundamentals.misses
+                self._info = self.fundamentals.get(self.symbol)
+                self.metrics.incr('fundamentals_cache_hits', self.fundamentals.hits - hits)
+                self.metrics.incr('fundamentals_cache_misses', self.fundamentals.misses - misses)
+        return self._info
+    
+    @property
+    def name(self):
+        name = self.info.get('shortName')
+        if not name:
+            entry = self.master.lookup(self.symbol)
+            name = entry['company_name'] if entry else self.symbol.replace('.NS', '')
+        return name
         
     def get_historical_performance(self):
         """Calculate historical performance for different time periods"""
@@ -82,9 +149,29 @@ class NSEStockAnalyzer:
         
         return fundamentals
     
-    def calculate_technical_indicators(self):
-        """Calculate technical indicators"""
-        df = self.hist.copy()
+    @property
+    def hist(self):
+        return self._hist
+
+    @hist.setter
+    def hist(self, value):
+        # New price history makes the memoized indicator frame stale
+        self._hist = value
+        self._indicators = None
+
+    @property
+    def indicators(self):
+        """Indicator frame, computed on first use and shared by every method"""
+        if self._indicators is None:
+            with self.metrics.stage('indicators'):
+                self._indicators = self._compute_indicators(self._hist)
+            self.metrics.incr('rows_processed', len(self._hist))
+        return self._indicators
+
+    @staticmethod
+    def _compute_indicators(hist):
+        """Build the indicator columns on a copy of the price history"""
+        df = hist.copy()
         
         # Moving Averages
         df['SMA_50'] = df['Close'].rolling(window=50).mean()
@@ -114,6 +201,12 @@ class NSEStockAnalyzer:
         df['Volume_10d_Avg'] = df['Volume'].rolling(window=10).mean()
         df['Volume_Ratio'] = df['Volume'] / df['Volume_10d_Avg']
         
+        return df
+    
+    def calculate_technical_indicators(self):
+        """Calculate technical indicators"""
+        df = self.indicators
+        
         # Get latest values
         latest = df.iloc[-1]
         
@@ -143,8 +236,10 @@ class NSEStockAnalyzer:
         else:
             return "Lower Half"
     
-    def get_key_observations(self, df):
+    def get_key_observations(self, df=None):
         """Generate key observations based on technical analysis"""
+        if df is None:
+            df = self.indicators
         latest = df.iloc[-1]
         observations = []
         
@@ -187,8 +282,10 @@ class NSEStockAnalyzer:
         
         return observations
     
-    def get_enhanced_key_observations(self, df):
+    def get_enhanced_key_observations(self, df=None):
         """Generate enhanced key observations with more detailed analysis"""
+        if df is None:
+            df = self.indicators
         latest = df.iloc[-1]
         current_price = latest['Close']
         
@@ -245,8 +342,12 @@ class NSEStockAnalyzer:
         else:
             return "Strong bearish momentum in the last 3 months"
     
-    def get_buy_sell_suggestions(self, df, fundamentals):
+    def get_buy_sell_suggestions(self, df=None, fundamentals=None):
         """Generate detailed buy/sell suggestions with price targets"""
+        if df is None:
+            df = self.indicators
+        if fundamentals is None:
+            fundamentals = self.get_fundamentals()
         latest = df.iloc[-1]
         current_price = latest['Close']
         
@@ -345,8 +446,10 @@ class NSEStockAnalyzer:
         
         return buy_sell_suggestions
     
-    def get_recommendations(self, df, observations):
+    def get_recommendations(self, df=None, observations=None):
         """Generate recommendations based on analysis"""
+        if df is None:
+            df = self.indicators
         latest = df.iloc[-1]
         
         # Simple recommendation logic
@@ -419,67 +522,63 @@ class NSEStockAnalyzer:
     
     def get_similar_companies(self):
         """Find similar companies based on sector"""
-        sector = self.info.get('sector', '')
+        # Most correlated stocks of the same sector, read from the prebuilt index
+        if self.peer_index is not None and self.symbol in self.peer_index:
+            peers = self.peer_index.peers(self.symbol, k=3)
+            if peers:
+                self.metrics.incr('peer_index_hits')
+                # The same records as the download path below, without the index's correlation
+                return [{"symbol": peer["symbol"], "performance_1y": peer["performance_1y"]} for peer in peers]
+        
+        sector = self.info.get('sector', '') or self.master.sector(self.symbol) or ''
         if not sector:
             return []
         
-        # NSE top companies by sector (simplified)
-        nse_sector_mapping = {
-            'Technology': ['TCS.NS', 'INFY.NS', 'WIPRO.NS', 'HCLTECH.NS', 'TECHM.NS'],
-            'Financial Services': ['HDFCBANK.NS', 'ICICIBANK.NS', 'SBIN.NS', 'AXISBANK.NS', 'KOTAKBANK.NS'],
-            'Energy': ['RELIANCE.NS', 'ONGC.NS', 'NTPC.NS', 'POWERGRID.NS', 'BPCL.NS'],
-            'Consumer Goods': ['HINDUNILVR.NS', 'ITC.NS', 'NESTLEIND.NS', 'BRITANNIA.NS', 'DABUR.NS'],
-            'Automobile': ['MARUTI.NS', 'TATAMOTORS.NS', 'M&M.NS', 'HEROMOTOCO.NS', 'BAJAJ-AUTO.NS'],
-            'Pharmaceutical': ['SUNPHARMA.NS', 'DRREDDY.NS', 'CIPLA.NS', 'DIVISLAB.NS', 'BIOCON.NS'],
-            'Metals': ['TATASTEEL.NS', 'HINDALCO.NS', 'JSWSTEEL.NS', 'VEDL.NS', 'COALINDIA.NS'],
-            'Cement': ['ULTRACEMCO.NS', 'SHREECEM.NS', 'ACC.NS', 'AMBUJACEM.NS', 'RAMCOCEM.NS'],
-            'Telecom': ['BHARTIARTL.NS', 'IDEA.NS'],
-            'Infrastructure': ['LT.NS', 'ADANIPORTS.NS', 'DLF.NS', 'GODREJPROP.NS', 'OBEROIRLTY.NS']
-        }
-        
-        similar_tickers = []
-        
-        # Try to find similar companies
-        for sector_name, tickers in nse_sector_mapping.items():
-            if sector.lower() in sector_name.lower() or sector_name.lower() in sector.lower():
-                similar_tickers = [t for t in tickers if t != self.symbol][:3]
-                break
+        # Try to find similar companies in the symbol master's sector mapping,
+        # a sector it does not know has no peers rather than another sector's
+        members = self.master.sector_members(sector)
+        similar_tickers = [f"{s}.NS" for s in members if f"{s}.NS" != self.symbol][:3]
         
-        # If no match found, use a default sector
-        if not similar_tickers and len(nse_sector_mapping) > 0:
-            # Just pick the first sector as default
-            default_sector = list(nse_sector_mapping.keys())[0]
-            similar_tickers = nse_sector_mapping[default_sector][:3]
-        
-        # Get performance data for similar companies
+        # Get performance data for similar companies, fetched concurrently
         similar_companies = []
-        for ticker in similar_tickers:
-            try:
-                stock = yf.Ticker(ticker)
-                hist = stock.history(period="1y")
-                if len(hist) > 0:
-                    start_price = hist['Close'].iloc[0]
-                    end_price = hist['Close'].iloc[-1]
-                    perf = ((end_price - start_price) / start_price) * 100
-                    similar_companies.append({
-                        "symbol": ticker.replace('.NS', ''),
-                        "performance_1y": f"{perf:.2f}%"
-                    })
-            except:
-                continue
+        hits, misses = self.peers.hits, self.peers.misses
+        peer_history = self.peers.get_many(similar_tickers, period="1y")
+        self.metrics.incr('peer_cache_hits', self.peers.hits - hits)
+        self.metrics.incr('peer_cache_misses', self.peers.misses - misses)
+        for ticker, hist in peer_history.items():
+            if len(hist) > 0:
+                start_price = hist['Close'].iloc[0]
+                end_price = hist['Close'].iloc[-1]
+                perf = ((end_price - start_price) / start_price) * 100
+                similar_companies.append({
+                    "symbol": ticker.replace('.NS', ''),
+                    "performance_1y": f"{perf:.2f}%"
+                })
         
         return similar_companies
     
     def generate_report(self):
-        """Generate a complete stock analysis report"""
-        historical_performance = self.get_historical_performance()
-        fundamentals = self.get_fundamentals()
-        technical, df = self.calculate_technical_indicators()
-        key_observations = self.get_key_observations(df)
-        enhanced_key_observations = self.get_enhanced_key_observations(df)
-        buy_sell_suggestions = self.get_buy_sell_suggestions(df, fundamentals)
-        recommendations = self.get_recommendations(df, key_observations)
-        similar_companies = self.get_similar_companies()
+        """Generate a complete stock analysis report
+        
+        Time spent in every stage goes into report["metrics"]; 'info' and
+        'indicators' run inside the first stage that needs them and are also
+        timed on their own.
+        """
+        stage = self.metrics.stage
+        with stage('performance'):
+            historical_performance = self.get_historical_performance()
+        with stage('fundamentals'):
+            fundamentals = self.get_fundamentals()
+        with stage('technical'):
+            technical, df = self.calculate_technical_indicators()
+        with stage('observations'):
+            key_observations = self.get_key_observations(df)
+            enhanced_key_observations = self.get_enhanced_key_observations(df)
+        with stage('suggestions'):
+            buy_sell_suggestions = self.get_buy_sell_suggestions(df, fundamentals)
+            recommendations = self.get_recommendations(df, key_observations)
+        with stage('peers'):
+            similar_companies = self.get_similar_companies()
         
         report = {
             "symbol": self.symbol.replace('.NS', ''),
@@ -492,168 +591,285 @@ class NSEStockAnalyzer:
             "enhanced_key_observations": enhanced_key_observations,
             "buy_sell_suggestions": buy_sell_suggestions,
             "recommendations": recommendations,
-            "similar_companies": similar_companies
+            "similar_companies": similar_companies,
+            "metrics": self.metrics.as_dict()
         }
         
         return report
     
-    def plot_technical_chart(self, save_path=None):
+    def plot_technical_chart(self, save_path=None, max_points=None):
         """Plot technical chart with indicators"""
-        _, df = self.calculate_technical_indicators()
-        
-        # Create figure with subplots
-        fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(12, 10), gridspec_kw={'height_ratios': [3, 1, 1]})
-        
-        # Price and Moving Averages
-        ax1.plot(df.index, df['Close'], label='Close Price')
-        ax1.plot(df.index, df['SMA_50'], label='50-day SMA', alpha=0.7)
-        ax1.plot(df.index, df['SMA_200'], label='200-day SMA', alpha=0.7)
-        ax1.fill_between(df.index, df['BB_Upper'], df['BB_Lower'], alpha=0.1, color='gray')
-        ax1.set_title(f'{self.symbol} - Technical Analysis')
-        ax1.set_ylabel('Price (₹)')
-        ax1.legend()
-        ax1.grid(True, alpha=0.3)
-        
-        # MACD
-        ax2.plot(df.index, df['MACD'], label='MACD')
-        ax2.plot(df.index, df['Signal_Line'], label='Signal Line')
-        ax2.bar(df.index, df['MACD'] - df['Signal_Line'], alpha=0.3, color='green', width=1)
-        ax2.set_ylabel('MACD')
-        ax2.legend()
-        ax2.grid(True, alpha=0.3)
-        
-        # RSI
-        ax3.plot(df.index, df['RSI'], color='purple')
-        ax3.axhline(y=70, color='r', linestyle='-', alpha=0.3)
-        ax3.axhline(y=30, color='g', linestyle='-', alpha=0.3)
-        ax3.fill_between(df.index, df['RSI'], 70, where=(df['RSI'] >= 70), color='r', alpha=0.3)
-        ax3.fill_between(df.index, df['RSI'], 30, where=(df['RSI'] <= 30), color='g', alpha=0.3)
-        ax3.set_ylabel('RSI')
-        ax3.set_xlabel('Date')
-        ax3.set_ylim(0, 100)
-        ax3.grid(True, alpha=0.3)
-        
-        plt.tight_layout()
-        
         if save_path:
-            plt.savefig(save_path)
-            return save_path
-        else:
-            plt.show()
-            return None
+            # Headless, reuses this process's template figure
+            return render_chart(self.symbol, self.indicators, save_path, max_points=max_points)
+        
+        # Interactive use only, batch runs always pass a path
+        import matplotlib.pyplot as plt
+        template = ChartTemplate(figure=plt.figure(figsize=(12, 10)))
+        template.draw(self.symbol, self.indicators, max_points=max_points)
+        plt.show()
+        return None
+
+def print_report_summary(report, chart_path=None):
+    """Print the human readable summary of a report"""
+    print(f"\n{'='*50}")
+    print(f"NSE STOCK ANALYSIS REPORT: {report['name']} ({report['symbol']})")
+    print(f"{'='*50}")
+    print(f"Current Price: ₹{report['last_price']}")
+    
+    print("\nHistorical Performance:")
+    for period, perf in report['historical_performance'].items():
+        print(f"  {period}: {perf}")
+    
+    print("\nFundamentals:")
+    for key, value in report['fundamentals'].items():
+        print(f"  {key.replace('_', ' ').title()}: {value}")
+    
+    print("\nTechnical Indicators:")
+    print("  Moving Averages:")
+    for ma, value in report['technical_analysis']['moving_averages'].items():
+        print(f"    {ma.upper()}: {value}")
+    print("  Other Indicators:")
+    for ind, value in report['technical_analysis']['indicators'].items():
+        print(f"    {ind.upper()}: {value}")
+    
+    print("\nKey Observations:")
+    for obs in report['key_observations']:
+        print(f"  • {obs}")
+    
+    print("\nEnhanced Key Observations:")
+    for key, value in report['enhanced_key_observations'].items():
+        print(f"  • {key.replace('_', ' ').title()}: {value}")
+    
+    print("\nBuy/Sell Suggestions:")
+    print("  Short Term (6M-1Y):")
+    st = report['buy_sell_suggestions']['short_term']
+    print(f"    Action: {st['action']}")
+    print(f"    Buy Zone: ₹{st['buy_zone']}")
+    print(f"    Targets: ₹{st['target'][0]}, ₹{st['target'][1]}")
+    print(f"    Stop Loss: ₹{st['stop_loss']}")
+    
+    print("  Long Term (3Y):")
+    lt = report['buy_sell_suggestions']['long_term']
+    print(f"    Action: {lt['action']}")
+    print(f"    Target: ₹{lt['target']}")
+    print(f"    Dividend: {lt['dividend_stability']}")
+    
+    print("\nRecommendations:")
+    for term, rec in report['recommendations'].items():
+        print(f"  {term.replace('_', ' ').title()}: {rec}")
+    
+    if report['similar_companies']:
+        print("\nSimilar Companies:")
+        for comp in report['similar_companies']:
+            print(f"  {comp['symbol']} (1Y Performance: {comp['performance_1y']})")
+    
+    if chart_path:
+        print(f"\nTechnical chart saved as: {chart_path}")
+    print(f"{'='*50}")
+
+def analyze_nse_stock(symbol, verbose=True, writer=None, chart=True):
+    """Main function to analyze an NSE stock and generate report
 
-def analyze_nse_stock(symbol):
-    """Main function to analyze an NSE stock and generate report"""
+    The report goes to writer (an indented JSON file per symbol by default) and
+    the console summary is only printed when verbose is set. The writer is
+    closed on return, also when the analysis fails.
+    """
+    if writer is None:
+        writer = JSONReportWriter()
     try:
-        analyzer = NSEStockAnalyzer(symbol)
-        report = analyzer.generate_report()
-        
-        # Save chart
-        chart_path = f"{symbol}_technical_chart.png"
-        analyzer.plot_technical_chart(save_path=chart_path)
-        
-        # Print report summary
-        print(f"\n{'='*50}")
-        print(f"NSE STOCK ANALYSIS REPORT: {report['name']} ({report['symbol']})")
-        print(f"{'='*50}")
-        print(f"Current Price: ₹{report['last_price']}")
-        
-        print("\nHistorical Performance:")
-        for period, perf in report['historical_performance'].items():
-            print(f"  {period}: {perf}")
-        
-        print("\nFundamentals:")
-        for key, value in report['fundamentals'].items():
-            print(f"  {key.replace('_', ' ').title()}: {value}")
-        
-        print("\nTechnical Indicators:")
-        print("  Moving Averages:")
-        for ma, value in report['technical_analysis']['moving_averages'].items():
-            print(f"    {ma.upper()}: {value}")
-        print("  Other Indicators:")
-        for ind, value in report['technical_analysis']['indicators'].items():
-            print(f"    {ind.upper()}: {value}")
-        
-        print("\nKey Observations:")
-        for obs in report['key_observations']:
-            print(f"  • {obs}")
-        
-        print("\nEnhanced Key Observations:")
-        for key, value in report['enhanced_key_observations'].items():
-            print(f"  • {key.replace('_', ' ').title()}: {value}")
-        
-        print("\nBuy/Sell Suggestions:")
-        print("  Short Term (6M-1Y):")
-        st = report['buy_sell_suggestions']['short_term']
-        print(f"    Action: {st['action']}")
-        print(f"    Buy Zone: ₹{st['buy_zone']}")
-        print(f"    Targets: ₹{st['target'][0]}, ₹{st['target'][1]}")
-        print(f"    Stop Loss: ₹{st['stop_loss']}")
-        
-        print("  Long Term (3Y):")
-        lt = report['buy_sell_suggestions']['long_term']
-        print(f"    Action: {lt['action']}")
-        print(f"    Target: ₹{lt['target']}")
-        print(f"    Dividend: {lt['dividend_stability']}")
-        
-        print("\nRecommendations:")
-        for term, rec in report['recommendations'].items():
-            print(f"  {term.replace('_', ' ').title()}: {rec}")
-        
-        if report['similar_companies']:
-            print("\nSimilar Companies:")
-            for comp in report['similar_companies']:
-                print(f"  {comp['symbol']} (1Y Performance: {comp['performance_1y']})")
+        with writer, NSEStockAnalyzer(symbol) as analyzer:
+            report = analyzer.generate_report()
         
-        print(f"\nTechnical chart saved as: {chart_path}")
-        print(f"{'='*50}")
+            # Save chart
+            chart_path = None
+            if chart:
+                chart_path = f"{symbol}_technical_chart.png"
+                with analyzer.metrics.stage('chart'):
+                    analyzer.plot_technical_chart(save_path=chart_path)
+                report["metrics"] = analyzer.metrics.as_dict()
         
-        # Save report as JSON
-        json_path = f"{symbol}_analysis_report.json"
-        with open(json_path, 'w') as f:
-            json.dump(report, f, indent=2)
-        print(f"Full report saved as: {json_path}")
+            if verbose:
+                print_report_summary(report, chart_path)
         
-        return report
+            # Save report
+            report_path = writer.write(report)
+            if verbose:
+                print(f"Full report saved as: {report_path}")
+        
+            return report
         
     except Exception as e:
         print(f"Error analyzing {symbol}: {str(e)}")
         return None
 
+def _nse_symbol(symbol):
+    """Return the Yahoo Finance ticker for an NSE symbol"""
+    symbol = symbol.upper()
+    return symbol if symbol.endswith('.NS') else f"{symbol}.NS"
+
+def _frame_bytes(df):
+    """In-memory size of downloaded bars, counted as bytes fetched"""
+    return int(df.memory_usage(deep=True).sum())
+
+_worker = {}
+
+def _init_worker(provider, store_root, fundamentals_root, histories, master=None, peer_index=None):
+    """Set up the provider, store and caches shared by every task in a worker process"""
+    store = PriceStore(store_root, provider) if store_root else None
+    peers = PeerFetcher(provider, store=store)
+    fundamentals = FundamentalsCache(provider, root=fundamentals_root)
+    # Bars downloaded for the batch also serve as peer data
+    for ticker, hist in histories.items():
+        peers.seed(ticker, hist, period="3y")
+    _worker.update(provider=provider, store=store, peers=peers, fundamentals=fundamentals,
+                   histories=histories, master=master, peer_index=peer_index)
+
+def _analyze_worker(symbol, charts, profile_dir=None):
+    """Build one report inside a worker process, plus the frame to chart if asked"""
+    profile_path = os.path.join(profile_dir, f"{symbol.replace('.NS', '')}.prof") if profile_dir else None
+    with profiled(profile_path):
+        return _analyze(symbol, charts)
+
+def _analyze(symbol, charts):
+    analyzer = NSEStockAnalyzer(symbol, provider=_worker['provider'], store=_worker['store'],
+                                hist=_worker['histories'].get(symbol), peers=_worker['peers'],
+                                fundamentals=_worker['fundamentals'], master=_worker['master'],
+                                peer_index=_worker['peer_index'])
+    report = analyzer.generate_report()
+    # Charts are drawn by a separate pool, only ship the columns they need
+    chart_frame = analyzer.indicators[CHART_COLUMNS] if charts else None
+    return report, chart_frame
+
+def analyze_many(symbols, workers=None, output_dir="reports", provider=None, store=None, charts=False,
+                 fundamentals_root=None, chart_workers=None, chart_max_points=None, output_format="json",
+                 run_name=None, master=None, peer_index=None, metrics=None, profile_dir=None):
+    """Analyze many NSE stocks in parallel and return a per-symbol status summary
+
+    Price history is downloaded up front in bulk requests, the reports are built
+    in a process pool and each one is written to output_dir as soon as it is done.
+    Pass fundamentals_root to keep fundamentals on disk between runs. Charts are
+    skipped unless charts=True, then they are rendered headless by their own pool
+    of chart_workers, downsampled to chart_max_points when given. output_format
+    'ndjson' or 'parquet' streams the whole run into a single run_name file
+    instead of one indented JSON file per symbol. Every worker reads the same
+    symbol master (the process wide default unless one is passed). With a
+    PeerIndex the similar companies come from it instead of peer downloads.
+
+    Pass a Metrics as metrics to collect the whole run's stage timings and
+    counters (every report also carries its own under "metrics"), and a
+    profile_dir to dump a cProfile file per symbol plus run.prof for this
+    process.
+    """
+    metrics = metrics if metrics is not None else Metrics()
+    with profiled(os.path.join(profile_dir, "run.prof") if profile_dir else None):
+        provider = provider or (store.provider if store is not None else YFinanceProvider())
+        tickers = list(dict.fromkeys(_nse_symbol(s) for s in symbols))
+        os.makedirs(output_dir, exist_ok=True)
+
+        # Group the downloads, workers then only read the prepared bars
+        with metrics.stage('download'):
+            if store is not None:
+                store.refresh_many(tickers)
+                histories = {}
+            else:
+                histories = provider.history_many(tickers, period="3y")
+                metrics.incr('bytes_fetched', sum(_frame_bytes(df) for df in histories.values()))
+
+        run_name = run_name or f"analysis_{datetime.now():%Y%m%d_%H%M%S}"
+        writer = make_writer(output_format, output_dir, run_name)
+        summary = {}
+        chart_futures = {}
+        renderer = ChartRenderer(workers=chart_workers, max_points=chart_max_points) if charts else None
+        store_root = store.root if store is not None else None
+        master = master or default_master()
+        # Refresh (or fail) once here, the workers' pickled copies only read the local copy or the sample
+        master.frame
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(provider, store_root, fundamentals_root, histories, master,
+                                           peer_index)) as executor:
+            futures = {}
+            for ticker in tickers:
+                symbol = ticker.replace('.NS', '')
+                if store is None and ticker not in histories:
+                    summary[symbol] = {"status": "error", "error": f"No data available for symbol {ticker}"}
+                    continue
+                future = executor.submit(_analyze_worker, ticker, charts, profile_dir)
+                futures[future] = symbol
+
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    report, chart_frame = future.result()
+                except Exception as e:
+                    summary[symbol] = {
+                        "status": "error",
+                        "error": str(e),
+                        "traceback": traceback.format_exc()
+                    }
+                    metrics.incr('reports_failed')
+                    continue
+
+                metrics.merge(report["metrics"])
+                with metrics.stage('write'):
+                    summary[symbol] = {"status": "ok", "path": writer.write(report)}
+                metrics.incr('reports_written')
+
+                if renderer is not None:
+                    chart_path = os.path.join(output_dir, f"{symbol}_technical_chart.png")
+                    chart_futures[renderer.submit(symbol, chart_frame, chart_path)] = symbol
+
+        with metrics.stage('write'):
+            writer.close()
+
+        if renderer is not None:
+            with metrics.stage('chart_wait'):
+                wait(chart_futures)
+            for future in as_completed(chart_futures):
+                symbol = chart_futures[future]
+                try:
+                    summary[symbol]["chart"] = future.result()
+                except Exception as e:
+                    summary[symbol]["chart_error"] = str(e)
+            renderer.close()
+
+        return summary
+
 # Example usage
-print("Enhanced NSE Stock Analysis Tool")
-print("-------------------------------")
-print("This script analyzes NSE (National Stock Exchange of India) stocks using free data from Yahoo Finance.")
-print("It provides technical analysis, fundamental data, and detailed buy/sell recommendations.")
-print("\nRunning a sample analysis for RELIANCE...")
+if __name__ == "__main__":
+    print("Enhanced NSE Stock Analysis Tool")
+    print("-------------------------------")
+    print("This script analyzes NSE (National Stock Exchange of India) stocks using free data from Yahoo Finance.")
+    print("It provides technical analysis, fundamental data, and detailed buy/sell recommendations.")
+    print("\nRunning a sample analysis for RELIANCE...")
 
-# Run a sample analysis for a popular NSE stock
-try:
-    sample_report = analyze_nse_stock('RELIANCE')
+    # Run a sample analysis for a popular NSE stock
+    try:
+        sample_report = analyze_nse_stock('RELIANCE')
     
-    # Show sample JSON structure for the new sections
-    print("\nSample Enhanced Key Observations and Buy/Sell Suggestions:")
-    enhanced_sample = {
-        "enhanced_key_observations": sample_report["enhanced_key_observations"],
-        "buy_sell_suggestions": sample_report["buy_sell_suggestions"]
-    }
-    print(json.dumps(enhanced_sample, indent=2))
+        # Show sample JSON structure for the new sections
+        print("\nSample Enhanced Key Observations and Buy/Sell Suggestions:")
+        enhanced_sample = {
+            "enhanced_key_observations": sample_report["enhanced_key_observations"],
+            "buy_sell_suggestions": sample_report["buy_sell_suggestions"]
+        }
+        print(json.dumps(enhanced_sample, indent=2))
     
-    print("\nHow to use this script:")
-    print("1. Call analyze_nse_stock('SYMBOL') with any NSE stock symbol")
-    print("   (No need to add .NS suffix, the script handles it automatically)")
-    print("2. The function returns a report dictionary and saves:")
-    print("   - A technical chart as PNG")
-    print("   - A full report as JSON")
-    print("\nExample usage in Python:")
-    print("report = analyze_nse_stock('TCS')")
-    print("report = analyze_nse_stock('INFY')")
-    print("report = analyze_nse_stock('HDFCBANK')")
+        print("\nHow to use this script:")
+        print("1. Call analyze_nse_stock('SYMBOL') with any NSE stock symbol")
+        print("   (No need to add .NS suffix, the script handles it automatically)")
+        print("2. The function returns a report dictionary and saves:")
+        print("   - A technical chart as PNG")
+        print("   - A full report as JSON")
+        print("\nExample usage in Python:")
+        print("report = analyze_nse_stock('TCS')")
+        print("report = analyze_nse_stock('INFY')")
+        print("report = analyze_nse_stock('HDFCBANK')")
     
-except Exception as e:
-    print(f"Error in sample analysis: {str(e)}")
-    print("\nTrying another popular NSE stock...")
-    try:
-        sample_report = analyze_nse_stock('TCS')
     except Exception as e:
-        print(f"Error in second sample analysis: {str(e)}")
\ No newline at end of file
+        print(f"Error in sample analysis: {str(e)}")
+        print("\nTrying another popular NSE stock...")
+        try:
+            sample_report = analyze_nse_stock('TCS')
+        except Exception as e:
+            print(f"Error in second sample analysis: {str(e)}")
@@ -0,0 +1,227 @@
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from indicator_kernels import compute_indicators
+
+# Backtest of the signal rules in NSEStockAnalyzer.get_buy_sell_suggestions and
+# get_recommendations. The rules are evaluated for every bar at once as boolean
+# arrays instead of only for df.iloc[-1], then every entry is simulated against
+# the same target and stop-loss multipliers the report suggests.
+
+def signal_counts(ind, rules='suggestions'):
+    """Return (bullish, bearish) signal counts for every bar
+
+    ind is the dictionary from indicator_kernels.compute_indicators. A missing
+    indicator compares as False, the same as in the per-row if-chains.
+    """
+    close = ind['Close']
+    with np.errstate(invalid='ignore'):
+        above_50 = close > ind['SMA_50']
+        above_200 = close > ind['SMA_200']
+        oversold = ind['RSI'] < 30
+        overbought = ind['RSI'] > 70
+        macd_bullish = ind['MACD'] > ind['Signal_Line']
+
+    bullish = above_50.astype(int) + above_200 + oversold + macd_bullish
+    bearish = (~above_50).astype(int) + ~above_200 + overbought + ~macd_bullish
+
+    if rules == 'recommendations':
+        # 30-bar average above the 30 bars before it
+        csum = np.cumsum(np.nan_to_num(close), axis=0)
+        recent = np.full(close.shape, np.nan)
+        previous = np.full(close.shape, np.nan)
+        if len(close) >= 60:
+            recent[59:] = (csum[59:] - csum[29:-30]) / 30
+            previous[59:] = (csum[29:-30] - np.concatenate([np.zeros_like(csum[:1]), csum[:-60]])) / 30
+        with np.errstate(invalid='ignore'):
+            uptrend = recent > previous
+        bullish = bullish + uptrend
+        bearish = bearish + ~uptrend
+    elif rules != 'suggestions':
+        raise ValueError(f"Unknown rule set: {rules}")
+
+    return bullish, bearish
+
+
+def actions(bullish, bearish, rules='suggestions'):
+    """Map signal counts to the short term action of every bar, in the analyzer's words"""
+    if rules == 'recommendations':
+        # get_recommendations' short_term_6m
+        conditions = [bullish >= 4, bullish >= 3, bearish >= 4]
+        choices = ["Buy", "Hold with potential to accumulate on dips", "Sell"]
+    else:
+        conditions = [bullish >= 3, bullish == 2, bearish >= 3]
+        choices = ["Buy", "Buy on dips", "Sell"]
+    return np.select(conditions, choices, default="Hold")
+
+
+def _first_hit(hits):
+    """Index of the first True in each row, or -1 when there is none"""
+    first = hits.argmax(axis=1)
+    first[~hits.any(axis=1)] = -1
+    return first
+
+
+def simulate(close, high, low, entries, target=1.10, target2=1.20, stop=0.92, horizon=126,
+             overlap=False):
+    """Simulate a long trade from the close of every entry bar
+
+    A trade exits at target, at stop, or at the close after horizon bars. When
+    the target and the stop are touched on the same bar the stop is assumed to
+    come first. With overlap=False a new trade only opens after the previous
+    one exited. Returns a dictionary of per-trade arrays.
+    """
+    close = np.asarray(close, dtype=float)
+    n = len(close)
+    entry_idx = np.flatnonzero(np.asarray(entries) & ~np.isnan(close))
+    # Only bars with a full horizon ahead of them can be evaluated
+    entry_idx = entry_idx[entry_idx + horizon < n]
+    if len(entry_idx) == 0:
+        return {name: np.array([]) for name in ('entry', 'exit', 'return', 'target_hit',
+                                                 'target2_hit', 'stop_hit')}
+
+    # Row i of each window holds the horizon bars after entry i
+    high_windows = sliding_window_view(np.asarray(high, dtype=float)[1:], horizon)[entry_idx]
+    low_windows = sliding_window_view(np.asarray(low, dtype=float)[1:], horizon)[entry_idx]
+    entry_price = close[entry_idx][:, None]
+
+    first_target = _first_hit(high_windows >= entry_price * target)
+    first_target2 = _first_hit(high_windows >= entry_price * target2)
+    first_stop = _first_hit(low_windows <= entry_price * stop)
+
+    never = horizon + 1
+    t1 = np.where(first_target < 0, never, first_target)
+    t2 = np.where(first_target2 < 0, never, first_target2)
+    s = np.where(first_stop < 0, never, first_stop)
+
+    stop_hit = s <= np.minimum(t1, horizon - 1)
+    target_hit = ~stop_hit & (t1 < never)
+    target2_hit = (t2 < s) & (t2 < never)
+
+    offset = np.where(stop_hit, s, np.where(target_hit, t1, horizon - 1))
+    exit_idx = entry_idx + 1 + offset
+    exit_price = np.where(stop_hit, entry_price[:, 0] * stop,
+                          np.where(target_hit, entry_price[:, 0] * target, close[exit_idx]))
+
+    trades = {
+        'entry': entry_idx,
+        'exit': exit_idx,
+        'return': exit_price / entry_price[:, 0] - 1,
+        'target_hit': target_hit,
+        'target2_hit': target2_hit,
+        'stop_hit': stop_hit
+    }
+
+    if not overlap:
+        # Walk the precomputed exits, O(number of entries)
+        keep = []
+        free_from = -1
+        for i, (entry, exit_) in enumerate(zip(entry_idx, exit_idx)):
+            if entry > free_from:
+                keep.append(i)
+                free_from = exit_
+        trades = {name: values[keep] for name, values in trades.items()}
+
+    return trades
+
+
+def summarize(trades):
+    """Hit rates and returns for a set of simulated trades"""
+    count = len(trades['return'])
+    if count == 0:
+        return {"trades": 0}
+    returns = trades['return']
+    return {
+        "trades": count,
+        "target_hit_rate": round(float(trades['target_hit'].mean()), 4),
+        "target2_hit_rate": round(float(trades['target2_hit'].mean()), 4),
+        "stop_hit_rate": round(float(trades['stop_hit'].mean()), 4),
+        "win_rate": round(float((returns > 0).mean()), 4),
+        "avg_return": round(float(returns.mean()), 4),
+        "compounded_return": round(float(np.prod(1 + returns) - 1), 4)
+    }
+
+
+def _entries(ind, rules, entry_actions):
+    """Boolean entry mask per bar (and per symbol column) for the given actions"""
+    bullish, bearish = signal_counts(ind, rules)
+    return np.isin(actions(bullish, bearish, rules), entry_actions)
+
+
+def _run_grid(close, high, low, entries_for, column, grid):
+    results = []
+    for params in grid:
+        params = dict(params)
+        entries = entries_for(tuple(params.pop('entry_actions', ("Buy",))))[:, column]
+        trades = simulate(close, high, low, entries, **params)
+        results.append(summarize(trades))
+    return results
+
+
+def backtest_symbol(hist, rules='suggestions', entry_actions=("Buy",), target=1.10, target2=1.20,
+                    stop=0.92, horizon=126, overlap=False):
+    """Backtest the signal rules over one symbol's full history"""
+    ind = compute_indicators(hist['Close'].to_numpy()[:, None], hist['Volume'].to_numpy()[:, None])
+    entries = _entries(ind, rules, entry_actions)[:, 0]
+    trades = simulate(hist['Close'].to_numpy(), hist['High'].to_numpy(), hist['Low'].to_numpy(),
+                      entries, target=target, target2=target2, stop=stop, horizon=horizon,
+                      overlap=overlap)
+    return summarize(trades)
+
+
+def _backtest_chunk(histories, grid, rules):
+    """Backtest a chunk of symbols, computing indicators for the chunk in one pass"""
+    # Symbols trading on the same calendar share one (dates, symbols) matrix
+    groups = {}
+    for symbol, hist in histories.items():
+        if len(hist) > 0:
+            groups.setdefault((len(hist), hist.index[0], hist.index[-1]), []).append(symbol)
+
+    results = {}
+    for symbols in groups.values():
+        close = np.column_stack([histories[s]['Close'].to_numpy(dtype=float) for s in symbols])
+        volume = np.column_stack([histories[s]['Volume'].to_numpy(dtype=float) for s in symbols])
+        ind = compute_indicators(close, volume)
+
+        # Signals do not depend on targets or stops, evaluate them once per entry rule
+        masks = {}
+
+        def entries_for(entry_actions):
+            if entry_actions not in masks:
+                masks[entry_actions] = _entries(ind, rules, entry_actions)
+            return masks[entry_actions]
+
+        for j, symbol in enumerate(symbols):
+            hist = histories[symbol]
+            stats = _run_grid(close[:, j], hist['High'].to_numpy(dtype=float),
+                              hist['Low'].to_numpy(dtype=float), entries_for, j, grid)
+            results[symbol] = [dict(params, **row) for params, row in zip(grid, stats)]
+    return results
+
+
+def parameter_grid(**values):
+    """Expand parameter_grid(target=[1.1, 1.2], stop=[0.92]) into a list of dicts"""
+    names = list(values)
+    return [dict(zip(names, combo)) for combo in itertools.product(*values.values())]
+
+
+def backtest_many(histories, grid=None, rules='suggestions', workers=None, chunk_size=100):
+    """Backtest every symbol over every parameter set in a process pool
+
+    Symbols are sent to the workers in chunks so indicators are computed for a
+    whole chunk at once. Returns {symbol: [stats per parameter set]}.
+    """
+    grid = grid or [{}]
+    symbols = list(histories)
+    chunks = [{s: histories[s] for s in symbols[i:i + chunk_size]}
+              for i in range(0, len(symbols), chunk_size)]
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk_results in executor.map(_backtest_chunk, chunks, [grid] * len(chunks),
+                                          [rules] * len(chunks)):
+            results.update(chunk_results)
+    return {symbol: results[symbol] for symbol in symbols if symbol in results}
@@ -0,0 +1,68 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Startup benchmark for the analysis tools. Each module is imported in a fresh
+# interpreter a few times and the best time is compared against its budget.
+# The import must also stay free of side effects: no network, no demo output
+# and none of the heavy optional dependencies, which are only loaded on use.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+BUDGETS = {
+    "analysis": 1.0,
+    "search": 0.1,
+}
+
+LAZY_MODULES = ["matplotlib", "yfinance", "bs4", "requests"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+loaded = [name for name in {lazy!r} if name in sys.modules]
+print(json.dumps({{"seconds": elapsed, "loaded": loaded}}))
+"""
+
+
+def measure(module, repeat=5):
+    """Return (best import time, heavy modules loaded, anything printed on import)"""
+    best = None
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, lazy=LAZY_MODULES)],
+            cwd=HERE, capture_output=True, text=True, check=True
+        )
+        *printed, last_line = result.stdout.strip().splitlines()
+        probe = json.loads(last_line)
+        if best is None or probe["seconds"] < best[0]:
+            best = (probe["seconds"], probe["loaded"], printed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check import time of the analysis tools")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget, for slow machines")
+    args = parser.parse_args()
+
+    failures = 0
+    for module, budget in BUDGETS.items():
+        seconds, loaded, printed = measure(module, args.repeat)
+        budget *= args.scale
+        ok = seconds <= budget and not loaded and not printed
+        failures += not ok
+        print(f"{module:10} {seconds * 1000:8.1f} ms  (budget {budget * 1000:.0f} ms)  {'OK' if ok else 'FAIL'}")
+        if loaded:
+            print(f"  heavy modules imported eagerly: {', '.join(loaded)}")
+        if printed:
+            print(f"  import printed {len(printed)} line(s), demo code is running at import")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
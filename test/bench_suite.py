@@ -0,0 +1,283 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+# Offline benchmark suite for the analysis and search modules. Everything runs
+# on synthetic data: FakeProvider bars, the bundled sample symbol master and a
+# generated symbol list of any size, so results only depend on the code and the
+# machine. Every run is saved as JSON named after the git commit; pass
+# --compare with an earlier file to see what got faster or slower.
+#
+#   python bench_suite.py                       run everything
+#   python bench_suite.py -k search --quick     only the search cases, smaller sizes
+#   python bench_suite.py --compare bench_results/<old>.json
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CASES = []
+
+
+def case(name, params=(None,), quick_params=None):
+    """Register a benchmark; the function gets a param and returns (callable, setup or None, unit)"""
+    def register(func):
+        CASES.append((name, func, tuple(params), tuple(quick_params or params)))
+        return func
+    return register
+
+
+def measure(run, setup=None, repeat=5, min_time=0.2):
+    """Median and best seconds per call of run() over repeat samples of about min_time each
+
+    With a setup, every call is run(setup()) on a fresh state and only run is timed,
+    so no call benefits from what an earlier one cached on the state.
+    """
+    def sample(number):
+        if not setup:
+            start = time.perf_counter()
+            for _ in range(number):
+                run()
+            return time.perf_counter() - start
+        elapsed = 0.0
+        for _ in range(number):
+            state = setup()
+            start = time.perf_counter()
+            run(state)
+            elapsed += time.perf_counter() - start
+        return elapsed
+
+    # Calibrate how many calls make one sample
+    number = 1
+    while True:
+        elapsed = sample(number)
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    samples = [sample(number) / number for _ in range(repeat)]
+    return {"median": statistics.median(samples), "min": min(samples), "calls_per_sample": number}
+
+
+def _master():
+    from symbol_master import SAMPLE_CSV, SymbolMaster
+
+    return SymbolMaster(root=tempfile.mkdtemp(prefix="bench_master_"), source=SAMPLE_CSV)
+
+
+def _bars(n, symbol="BENCH.NS"):
+    from price_store import FakeProvider
+
+    # 100k business days span almost four centuries, end late enough to stay in pandas' range
+    return FakeProvider(bars=n, end="2200-12-31")._frame(symbol)
+
+
+def synthetic_stocks(n, seed=0):
+    """n {"company_name", "symbol", "exchange"} entries built from real name words"""
+    from search import StockSymbolFinder
+
+    words = sorted({word.strip('.,') for stock in StockSymbolFinder().nse_stocks
+                    for word in stock["company_name"].split() if len(word.strip('.,')) > 2})
+    rng = random.Random(seed)
+    stocks, symbols = [], set()
+    while len(stocks) < n:
+        name = ' '.join(rng.sample(words, rng.randint(2, 4))) + " Ltd."
+        symbol = ''.join(word[:rng.randint(2, 4)] for word in name.split()[:3]).upper()
+        if symbol in symbols:
+            symbol = f"{symbol}{len(stocks)}"
+        symbols.add(symbol)
+        stocks.append({"company_name": name, "symbol": symbol, "exchange": "NSE"})
+    return stocks
+
+
+def _queries(stocks, seed=1):
+    """Mix of autocomplete prefixes, whole symbols, inner words and typos"""
+    rng = random.Random(seed)
+    queries = []
+    for stock in rng.sample(stocks, min(len(stocks), 50)):
+        name = stock["company_name"].lower()
+        word = rng.choice(name.split()[:-1])
+        typo = word[:1] + word[2:3] + word[1:2] + word[3:] if len(word) > 3 else word + "x"
+        queries += [name[:rng.randint(1, 6)], stock["symbol"].lower(), word, typo]
+    return queries
+
+
+@case("indicators.pandas", params=(1_000, 10_000, 100_000), quick_params=(1_000, 10_000))
+def bench_indicators_pandas(bars):
+    from analysis import NSEStockAnalyzer
+
+    hist = _bars(bars)
+    return (lambda: NSEStockAnalyzer._compute_indicators(hist)), None, "call"
+
+
+@case("indicators.kernels", params=(1_000, 10_000, 100_000), quick_params=(1_000, 10_000))
+def bench_indicators_kernels(bars):
+    from indicator_kernels import compute_indicators
+
+    hist = _bars(bars)
+    close = hist[['Close']].to_numpy()
+    volume = hist[['Volume']].to_numpy()
+    return (lambda: compute_indicators(close, volume)), None, "call"
+
+
+@case("generate_report")
+def bench_generate_report(_):
+    from analysis import NSEStockAnalyzer
+    from fundamentals_cache import FundamentalsCache
+    from peer_fetch import PeerFetcher
+    from price_store import FakeProvider
+
+    provider = FakeProvider(end="2024-12-31", info={'sector': 'Technology', 'trailingPE': 25.0,
+                                                    'trailingEps': 40.0, 'dividendYield': 0.01,
+                                                    'marketCap': 1e11})
+    master = _master()
+    hist = provider.history("INFY.NS")
+    # Warm shared caches, as in a batch run: this measures the report itself
+    peers = PeerFetcher(provider)
+    fundamentals = FundamentalsCache(provider)
+
+    def setup():
+        return NSEStockAnalyzer("INFY", provider=provider, hist=hist, peers=peers,
+                                fundamentals=fundamentals, master=master)
+
+    return (lambda analyzer: analyzer.generate_report()), setup, "call"
+
+
+@case("analyze_many", params=(10, 50), quick_params=(10,))
+def bench_analyze_many(symbols):
+    from analysis import analyze_many
+    from price_store import FakeProvider
+
+    provider = FakeProvider(end="2024-12-31", info={'sector': 'Technology'})
+    master = _master()
+    tickers = master.frame["symbol"].tolist()[:symbols]
+    output_dir = tempfile.mkdtemp(prefix="bench_reports_")
+
+    def run():
+        analyze_many(tickers, workers=os.cpu_count(), output_dir=output_dir, provider=provider,
+                     master=master, output_format="ndjson", run_name="bench")
+        os.remove(os.path.join(output_dir, "bench.ndjson"))
+
+    return run, None, "batch"
+
+
+@case("search.build", params=(60, 2_000, 50_000), quick_params=(60, 2_000))
+def bench_search_build(entries):
+    from symbol_index import SymbolIndex
+
+    stocks = synthetic_stocks(entries)
+    return (lambda: SymbolIndex(stocks)), None, "call"
+
+
+@case("search.search_symbol", params=(60, 2_000, 50_000), quick_params=(60, 2_000))
+def bench_search_symbol(entries):
+    from search import StockSymbolFinder
+    from symbol_index import SymbolIndex
+
+    finder = StockSymbolFinder(master=_master())
+    if entries != len(finder.nse_stocks):
+        finder.nse_stocks = synthetic_stocks(entries)
+        finder.index = SymbolIndex(finder.nse_stocks)
+    queries = _queries(finder.nse_stocks)
+
+    def run():
+        for query in queries:
+            finder.search_symbol(query)
+
+    # Reported per query
+    return run, None, f"{len(queries)} queries"
+
+
+def git_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_cases(pattern=None, quick=False, repeat=5):
+    results = {}
+    for name, func, params, quick_params in CASES:
+        if pattern and pattern not in name:
+            continue
+        for param in (quick_params if quick else params):
+            key = name if param is None else f"{name}[{param}]"
+            run, setup, unit = func(param)
+            timing = measure(run, setup, repeat=repeat)
+            if unit.endswith("queries"):
+                per = int(unit.split()[0])
+                timing = {k: v / per if k != "calls_per_sample" else v for k, v in timing.items()}
+                unit = "query"
+            results[key] = dict(timing, unit=unit)
+            print(f"{key:38} {timing['median'] * 1000:12.4f} ms/{unit}   (best {timing['min'] * 1000:.4f})")
+    return results
+
+
+def compare(current, previous, threshold=0.10):
+    """Print the change of every case also present in previous, return the number of regressions"""
+    regressions = 0
+    print(f"\n{'case':38} {'before ms':>12} {'after ms':>12} {'change':>9}")
+    for key, timing in current.items():
+        if key not in previous:
+            continue
+        before, after = previous[key]["median"], timing["median"]
+        change = after / before - 1
+        flag = ''
+        if change > threshold:
+            flag = '  slower'
+            regressions += 1
+        elif change < -threshold:
+            flag = '  faster'
+        print(f"{key:38} {before * 1000:12.4f} {after * 1000:12.4f} {change:+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for analysis and search")
+    parser.add_argument("-k", dest="pattern", help="only run cases whose name contains this")
+    parser.add_argument("--quick", action="store_true", help="skip the largest sizes")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output-dir", default=os.path.join(HERE, "bench_results"))
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="exit with 1 when a case got more than 10%% slower than --compare")
+    args = parser.parse_args()
+
+    sys.path.insert(0, HERE)
+    np.random.seed(0)
+    results = run_cases(args.pattern, args.quick, args.repeat)
+
+    commit = git_commit()
+    record = {
+        "commit": commit,
+        "date": datetime.now().isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+    os.makedirs(args.output_dir, exist_ok=True)
+    path = os.path.join(args.output_dir, f"{datetime.now():%Y%m%d_%H%M%S}_{commit}.json")
+    with open(path, 'w') as f:
+        json.dump(record, f, indent=2)
+    print(f"\nResults saved to {path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f)["results"])
+        if args.fail_on_regression and regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+# Headless rendering of the 3-panel technical chart. Figures are drawn with the
+# Agg canvas directly (no pyplot, no GUI backend, nothing ever blocks on show()),
+# and one template figure per process is reused: the lines are updated in place
+# and only the filled areas and MACD bars are rebuilt for each symbol.
+
+CHART_COLUMNS = ['Close', 'SMA_50', 'SMA_200', 'BB_Upper', 'BB_Lower', 'MACD', 'Signal_Line', 'RSI']
+
+
+def downsample(df, max_points):
+    """Keep every n-th row so at most max_points are drawn, always keeping the last bar"""
+    if not max_points or len(df) <= max_points:
+        return df
+    step = math.ceil(len(df) / max_points)
+    keep = list(range(len(df) - 1, -1, -step))[::-1]
+    return df.iloc[keep]
+
+
+class ChartTemplate:
+    """Reusable figure with the price, MACD and RSI panels of plot_technical_chart"""
+
+    def __init__(self, figsize=(12, 10), dpi=100, figure=None):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        # A pyplot figure can be passed in for interactive use
+        if figure is None:
+            figure = Figure(figsize=figsize, dpi=dpi)
+            FigureCanvasAgg(figure)
+        self.figure = figure
+        grid = self.figure.add_gridspec(3, 1, height_ratios=[3, 1, 1])
+        self.ax_price = self.figure.add_subplot(grid[0])
+        self.ax_macd = self.figure.add_subplot(grid[1], sharex=self.ax_price)
+        self.ax_rsi = self.figure.add_subplot(grid[2], sharex=self.ax_price)
+
+        # Price and Moving Averages
+        self.close_line, = self.ax_price.plot([], [], label='Close Price')
+        self.sma_50_line, = self.ax_price.plot([], [], label='50-day SMA', alpha=0.7)
+        self.sma_200_line, = self.ax_price.plot([], [], label='200-day SMA', alpha=0.7)
+        self.ax_price.set_ylabel('Price (₹)')
+        self.ax_price.legend()
+        self.ax_price.grid(True, alpha=0.3)
+
+        # MACD
+        self.macd_line, = self.ax_macd.plot([], [], label='MACD')
+        self.signal_line, = self.ax_macd.plot([], [], label='Signal Line')
+        self.ax_macd.set_ylabel('MACD')
+        self.ax_macd.legend()
+        self.ax_macd.grid(True, alpha=0.3)
+
+        # RSI
+        self.rsi_line, = self.ax_rsi.plot([], [], color='purple')
+        self.ax_rsi.axhline(y=70, color='r', linestyle='-', alpha=0.3)
+        self.ax_rsi.axhline(y=30, color='g', linestyle='-', alpha=0.3)
+        self.ax_rsi.set_ylabel('RSI')
+        self.ax_rsi.set_xlabel('Date')
+        self.ax_rsi.set_ylim(0, 100)
+        self.ax_rsi.grid(True, alpha=0.3)
+        self.ax_rsi.xaxis_date()
+
+        self.ax_price.set_title('Technical Analysis')
+        self.figure.tight_layout()
+        self._artists = []
+
+    def draw(self, symbol, df, max_points=None):
+        """Draw df (an indicator frame) for symbol"""
+        import matplotlib.dates as mdates
+
+        df = downsample(df, max_points)
+        x = mdates.date2num(df.index.to_pydatetime())
+
+        # Drop the per-symbol artists of the previous chart
+        for artist in self._artists:
+            artist.remove()
+
+        self.close_line.set_data(x, df['Close'])
+        self.sma_50_line.set_data(x, df['SMA_50'])
+        self.sma_200_line.set_data(x, df['SMA_200'])
+        self.macd_line.set_data(x, df['MACD'])
+        self.signal_line.set_data(x, df['Signal_Line'])
+        self.rsi_line.set_data(x, df['RSI'])
+
+        rsi = df['RSI'].to_numpy()
+        width = (x[-1] - x[0]) / max(len(x) - 1, 1)
+        self._artists = [
+            self.ax_price.fill_between(x, df['BB_Upper'], df['BB_Lower'], alpha=0.1, color='gray'),
+            self.ax_macd.bar(x, df['MACD'] - df['Signal_Line'], alpha=0.3, color='green', width=width),
+            self.ax_rsi.fill_between(x, rsi, 70, where=(rsi >= 70), color='r', alpha=0.3),
+            self.ax_rsi.fill_between(x, rsi, 30, where=(rsi <= 30), color='g', alpha=0.3)
+        ]
+
+        self.ax_price.set_title(f'{symbol} - Technical Analysis')
+        for ax in (self.ax_price, self.ax_macd):
+            ax.relim()
+            ax.autoscale_view()
+        self.ax_rsi.set_ylim(0, 100)
+
+    def render(self, symbol, df, save_path, max_points=None):
+        """Draw df for symbol and save it to save_path"""
+        self.draw(symbol, df, max_points=max_points)
+        self.figure.savefig(save_path)
+        return save_path
+
+
+_template = None
+
+
+def render_chart(symbol, df, save_path, max_points=None):
+    """Render in the current process with this process's template figure"""
+    global _template
+    if _template is None:
+        _template = ChartTemplate()
+    return _template.render(symbol, df, save_path, max_points=max_points)
+
+
+class ChartRenderer:
+    """Process pool that renders charts separately from report generation
+
+    Use as a context manager. submit() returns a future resolving to the saved
+    path, so report workers never wait on matplotlib.
+    """
+
+    def __init__(self, workers=None, max_points=None):
+        self.max_points = max_points
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+
+    def submit(self, symbol, df, save_path):
+        # Only ship the columns the chart draws to the worker
+        return self.executor.submit(render_chart, symbol, df[CHART_COLUMNS], save_path, self.max_points)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
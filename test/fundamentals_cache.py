@@ -0,0 +1,77 @@
+import json
+import os
+import threading
+import time
+
+
+class FundamentalsCache:
+    """TTL cache for the provider's info (fundamentals) dictionary
+
+    Fundamentals change at most daily, so entries live for ttl seconds (a day by
+    default). With a root directory every symbol is also persisted as its own
+    JSON file, which lets separate runs and worker processes share the cache
+    without rewriting one big file.
+    """
+
+    def __init__(self, provider, root=None, ttl=24 * 60 * 60):
+        self.provider = provider
+        self.root = root
+        self.ttl = ttl
+        self._memory = {}
+        self._lock = threading.Lock()
+        # Reads answered from memory or disk versus reads that went to the provider
+        self.hits = 0
+        self.misses = 0
+        if root:
+            os.makedirs(root, exist_ok=True)
+
+    def _path(self, symbol):
+        return os.path.join(self.root, f"{symbol}.json")
+
+    def _read_disk(self, symbol):
+        if not self.root or not os.path.exists(self._path(symbol)):
+            return None
+        try:
+            with open(self._path(symbol)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            # A corrupt entry is simply fetched again
+            return None
+
+    def _write_disk(self, symbol, entry):
+        if not self.root:
+            return
+        # Write to a temp file of this thread first so readers never see a half written entry
+        tmp_path = f"{self._path(symbol)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f, default=str)
+        os.replace(tmp_path, self._path(symbol))
+
+    def _is_valid(self, entry):
+        return entry is not None and time.time() - entry["fetched_at"] < self.ttl
+
+    def get(self, symbol):
+        """Return the fundamentals for symbol, fetching them only when the cached copy expired"""
+        with self._lock:
+            entry = self._memory.get(symbol)
+        if not self._is_valid(entry):
+            entry = self._read_disk(symbol)
+        fetched = not self._is_valid(entry)
+        if fetched:
+            entry = {"fetched_at": time.time(), "info": self.provider.info(symbol)}
+            self._write_disk(symbol, entry)
+
+        with self._lock:
+            self._memory[symbol] = entry
+            if fetched:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry["info"]
+
+    def invalidate(self, symbol):
+        """Drop a symbol so the next read goes to the provider"""
+        with self._lock:
+            self._memory.pop(symbol, None)
+        if self.root and os.path.exists(self._path(symbol)):
+            os.remove(self._path(symbol))
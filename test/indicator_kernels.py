@@ -0,0 +1,191 @@
+import numpy as np
+import pandas as pd
+
+# Vectorized versions of the indicators in NSEStockAnalyzer._compute_indicators.
+# Every kernel takes a 2-D array shaped (dates, symbols) and computes all symbols
+# at once, so a screener can score the whole universe without building one
+# DataFrame per ticker. Missing values, leading (symbols listed later than
+# others) or in between (suspended sessions), are handled the same way pandas
+# handles them.
+
+
+def price_matrix(histories, column='Close'):
+    """Align {symbol: OHLCV DataFrame} into (dates, symbols, 2-D array)"""
+    symbols = list(histories)
+    frame = pd.concat({symbol: histories[symbol][column] for symbol in symbols}, axis=1).sort_index()
+    return frame.index, symbols, frame.to_numpy(dtype=float)
+
+
+def rolling_mean(x, window):
+    """Rolling mean over axis 0 using cumulative sums, NaN until window values are seen"""
+    x = np.asarray(x, dtype=float)
+    missing = np.isnan(x)
+    has_missing = missing.any()
+    csum = np.cumsum(np.where(missing, 0.0, x) if has_missing else x, axis=0)
+
+    out = np.empty_like(csum)
+    out[:window] = csum[:window]
+    np.subtract(csum[window:], csum[:-window], out=out[window:])
+    out /= window
+    out[:window - 1] = np.nan
+
+    if has_missing:
+        # A window containing a missing value has no mean, as in pandas
+        ccount = np.cumsum(missing, axis=0)
+        gaps = ccount.copy()
+        gaps[window:] -= ccount[:-window]
+        out[gaps > 0] = np.nan
+    return out
+
+
+def rolling_std(x, window):
+    """Rolling sample standard deviation (ddof=1) over axis 0"""
+    x = np.asarray(x, dtype=float)
+    # Centre each column first, sums of squares lose precision on large prices
+    x = x - np.nanmean(x, axis=0)
+    mean = rolling_mean(x, window)
+    mean_sq = rolling_mean(x * x, window)
+    var = (mean_sq - mean * mean) * window / (window - 1)
+    return np.sqrt(np.clip(var, 0.0, None))
+
+
+def ewm_mean(x, alpha):
+    """Recursive exponential filter, same as pandas ewm(alpha=alpha, adjust=False).mean()
+
+    Like pandas' default ignore_na=False, a missing value carries the average
+    forward but still ages it, so the next value is weighted by its distance
+    to the last one seen.
+    """
+    x = np.asarray(x, dtype=float)
+    out = np.full_like(x, np.nan)
+    prev = np.full(x.shape[1:], np.nan)
+    decay = 1.0 - alpha
+    missing = np.isnan(x)
+    gaps = (missing & np.logical_or.accumulate(~missing, axis=0)).any()
+
+    # One step per date, each step updates every symbol at once
+    if not gaps:
+        for t in range(x.shape[0]):
+            row = x[t]
+            # Start from the first value
+            prev = np.where(np.isnan(prev), row, decay * prev + alpha * row)
+            out[t] = prev
+        return out
+
+    # Weight of prev relative to alpha for the next value, 1 right after a value
+    old_weight = np.ones(x.shape[1:])
+    for t in range(x.shape[0]):
+        row = x[t]
+        observed = ~missing[t]
+        started = ~np.isnan(prev)
+        old_weight = np.where(started, old_weight * decay, old_weight)
+        # pandas weighs the new value 1 - old_weight instead of alpha when com == 1
+        new_weight = 1.0 - old_weight if alpha == 0.5 else alpha
+        updated = (old_weight * prev + new_weight * row) / (old_weight + new_weight)
+        # A missing value carries the average forward
+        prev = np.where(started, np.where(observed, updated, prev), row)
+        old_weight = np.where(observed, 1.0, old_weight)
+        out[t] = prev
+    return out
+
+
+def ema(x, span):
+    """Exponential moving average, same as pandas ewm(span=span, adjust=False).mean()"""
+    return ewm_mean(x, 2.0 / (span + 1.0))
+
+
+def rsi(close, window=14, method='simple'):
+    """Relative Strength Index, 'simple' uses rolling means and 'wilder' Wilder smoothing"""
+    close = np.asarray(close, dtype=float)
+    delta = np.full_like(close, np.nan)
+    delta[1:] = close[1:] - close[:-1]
+
+    # Same as delta.where(delta > 0, 0), the NaN of the first bar becomes 0
+    # while dates before a symbol's first bar stay missing
+    listed = ~np.isnan(close)
+    gain = np.where(listed, np.where(delta > 0, delta, 0.0), np.nan)
+    loss = np.where(listed, np.where(delta < 0, -delta, 0.0), np.nan)
+    if method == 'simple':
+        avg_gain = rolling_mean(gain, window)
+        avg_loss = rolling_mean(loss, window)
+    elif method == 'wilder':
+        avg_gain = ewm_mean(gain, 1.0 / window)
+        avg_loss = ewm_mean(loss, 1.0 / window)
+    else:
+        raise ValueError(f"Unknown RSI method: {method}")
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """Return (ema_fast, ema_slow, macd, signal_line)"""
+    ema_fast = ema(close, fast)
+    ema_slow = ema(close, slow)
+    line = ema_fast - ema_slow
+    return ema_fast, ema_slow, line, ema(line, signal)
+
+
+def bollinger_bands(close, window=20, width=2):
+    """Return (middle, upper, lower) bands"""
+    middle = rolling_mean(close, window)
+    std = rolling_std(close, window)
+    return middle, middle + width * std, middle - width * std
+
+
+def compute_indicators(close, volume, rsi_method='simple'):
+    """Compute every indicator column NSEStockAnalyzer uses, for all symbols in one pass
+
+    Returns a dictionary keyed by the same column names as the analyzer's
+    indicator frame, each value a (dates, symbols) array.
+    """
+    close = np.asarray(close, dtype=float)
+    volume = np.asarray(volume, dtype=float)
+
+    ema_12, ema_26, macd_line, signal_line = macd(close)
+    bb_middle, bb_upper, bb_lower = bollinger_bands(close)
+    volume_avg = rolling_mean(volume, 10)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        volume_ratio = volume / volume_avg
+
+    return {
+        'Close': close,
+        'Volume': volume,
+        'SMA_50': rolling_mean(close, 50),
+        'SMA_200': rolling_mean(close, 200),
+        'EMA_20': ema(close, 20),
+        'RSI': rsi(close, method=rsi_method),
+        'EMA_12': ema_12,
+        'EMA_26': ema_26,
+        'MACD': macd_line,
+        'Signal_Line': signal_line,
+        'BB_Middle': bb_middle,
+        'BB_Upper': bb_upper,
+        'BB_Lower': bb_lower,
+        'Volume_10d_Avg': volume_avg,
+        'Volume_Ratio': volume_ratio
+    }
+
+
+def compute_indicators_by_symbol(close, volume, rsi_method='simple'):
+    """compute_indicators over each symbol's own trading days
+
+    On a calendar shared by many symbols, a session one of them missed is a NaN
+    that blanks its rolling windows for the next 50 or 200 rows. Instead every
+    column's observed rows are moved to the bottom, computed as if the symbol
+    had no gaps (like the analyzer on that symbol's bars alone) and put back in
+    place; the missed sessions stay NaN.
+    """
+    close = np.asarray(close, dtype=float)
+    volume = np.asarray(volume, dtype=float)
+    # Per column: missing rows first, then the observed ones in date order
+    order = np.argsort(~np.isnan(close), axis=0, kind='stable')
+    compact = compute_indicators(np.take_along_axis(close, order, axis=0),
+                                 np.take_along_axis(volume, order, axis=0), rsi_method)
+    indicators = {}
+    for name, values in compact.items():
+        indicators[name] = np.empty_like(values)
+        np.put_along_axis(indicators[name], order, values, axis=0)
+    return indicators
@@ -0,0 +1,101 @@
+import argparse
+import json
+import random
+import time
+from http.client import HTTPConnection
+from urllib.parse import quote, urlsplit
+
+from search_service import LatencyRecorder, SearchService, create_app
+
+# Load test for search_service. Replays autocomplete traffic: users type company
+# names one keystroke at a time, so every name produces all of its prefixes.
+# By default the Flask app runs in this process (app.test_client, one core, no
+# sockets); pass --url to drive a running server over keep-alive HTTP instead.
+
+
+def keystroke_queries(stocks, count, seed=0):
+    """count queries made of the growing prefixes of random company names and symbols"""
+    rng = random.Random(seed)
+    queries = []
+    while len(queries) < count:
+        stock = rng.choice(stocks)
+        text = rng.choice([stock["company_name"], stock["symbol"]]).lower()
+        typed = text[:rng.randint(min(len(text), 3), min(len(text), 12))]
+        queries.extend(typed[:n] for n in range(1, len(typed) + 1))
+    return queries[:count]
+
+
+def batches(queries, size):
+    for i in range(0, len(queries), size):
+        yield queries[i:i + size]
+
+
+def run_in_process(app, queries, batch):
+    client = app.test_client()
+    latency = LatencyRecorder(size=len(queries))
+    start = time.perf_counter()
+    for chunk in batches(queries, batch):
+        sent = time.perf_counter()
+        if batch == 1:
+            response = client.get(f"/search?q={quote(chunk[0])}")
+        else:
+            response = client.post("/search", json={"queries": chunk})
+        assert response.status_code == 200, response.get_data(as_text=True)
+        latency.record(time.perf_counter() - sent)
+    return time.perf_counter() - start, latency, client.get("/metrics").get_json()
+
+
+def run_http(url, queries, batch):
+    parts = urlsplit(url)
+    connection = HTTPConnection(parts.hostname, parts.port or 80)
+    latency = LatencyRecorder(size=len(queries))
+
+    def call(method, path, body=None):
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        data = response.read()
+        assert response.status == 200, data
+        return data
+
+    start = time.perf_counter()
+    for chunk in batches(queries, batch):
+        sent = time.perf_counter()
+        if batch == 1:
+            call("GET", f"/search?q={quote(chunk[0])}")
+        else:
+            call("POST", "/search", json.dumps({"queries": chunk}))
+        latency.record(time.perf_counter() - sent)
+    elapsed = time.perf_counter() - start
+    return elapsed, latency, json.loads(call("GET", "/metrics"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the symbol search service")
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=1, help="queries per request, 1 uses GET /search")
+    parser.add_argument("--url", help="running server, e.g. http://127.0.0.1:5001")
+    parser.add_argument("--no-cache", action="store_true", help="disable the response cache")
+    args = parser.parse_args()
+
+    service = SearchService(cache_size=0 if args.no_cache else 4096)
+    queries = keystroke_queries(service.finder.nse_stocks, args.queries)
+
+    if args.url:
+        elapsed, latency, metrics = run_http(args.url, queries, args.batch)
+    else:
+        elapsed, latency, metrics = run_in_process(create_app(service), queries, args.batch)
+
+    requests_sent = latency.count
+    client = latency.percentiles()
+    print(f"{len(queries)} queries in {requests_sent} requests of {args.batch}, {elapsed:.2f} s")
+    print(f"  {len(queries) / elapsed:10.0f} queries/s")
+    print(f"  {requests_sent / elapsed:10.0f} requests/s")
+    print(f"  client latency   p50 {client['p50_ms']} ms  p90 {client['p90_ms']} ms  p99 {client['p99_ms']} ms")
+    server = metrics["query_latency"]
+    print(f"  service latency  p50 {server['p50_ms']} ms  p90 {server['p90_ms']} ms  p99 {server['p99_ms']} ms")
+    print(f"  cache hit rate   {metrics['cache']['hit_rate']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from price_store import _period_offset
+
+_REFERENCE = pd.Timestamp('2000-01-01')
+
+
+def _period_span(period):
+    """Length of a period as a Timedelta so periods can be compared"""
+    return (_REFERENCE + _period_offset(period)) - _REFERENCE
+
+
+class PeerFetcher:
+    """Shared, deduplicated price fetch layer for peer lookups
+
+    Requests go through a bounded thread pool, at most max_concurrency of them
+    hit the provider at the same time, concurrent requests for the same ticker
+    share one download and results are kept in a TTL cache keyed by ticker and
+    period. A cached longer window (e.g. the 3y bars of a batch) also serves
+    shorter periods, so peers already downloaded for other symbols are reused.
+    Call close(), or use it as a context manager, to stop the pool's threads.
+    """
+
+    def __init__(self, provider, store=None, max_workers=8, max_concurrency=4, ttl=3600):
+        self.provider = provider
+        self.store = store
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='peer-fetch')
+        self._limit = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._in_flight = {}
+        self.errors = {}
+        # Tickers served from the cache versus tickers that needed a fetch
+        self.hits = 0
+        self.misses = 0
+
+    def seed(self, ticker, df, period="3y"):
+        """Put bars that were downloaded elsewhere into the cache"""
+        with self._lock:
+            self._cache[(ticker, period)] = (time.monotonic() + self.ttl, df)
+
+    def _lookup(self, ticker, period):
+        """Return cached bars for ticker covering period, or None (caller holds the lock)"""
+        now = time.monotonic()
+        wanted = _period_span(period)
+        for (cached_ticker, cached_period), (expires_at, df) in list(self._cache.items()):
+            if cached_ticker != ticker:
+                continue
+            if expires_at < now:
+                del self._cache[(cached_ticker, cached_period)]
+                continue
+            if cached_period == period:
+                return df
+            if _period_span(cached_period) > wanted and len(df) > 0:
+                return df[df.index > df.index[-1] - _period_offset(period)]
+        return None
+
+    def _fetch(self, ticker, period):
+        key = (ticker, period)
+        try:
+            with self._limit:
+                if self.store is not None and self.store.is_fresh(ticker):
+                    df = self.store.load(ticker)
+                    df = df[df.index > df.index[-1] - _period_offset(period)]
+                else:
+                    df = self.provider.history(ticker, period=period)
+            with self._lock:
+                self._cache[key] = (time.monotonic() + self.ttl, df)
+            return df
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def get_many(self, tickers, period="1y"):
+        """Return {ticker: DataFrame} for every ticker that could be fetched"""
+        results = {}
+        futures = {}
+        with self._lock:
+            for ticker in dict.fromkeys(tickers):
+                cached = self._lookup(ticker, period)
+                if cached is not None:
+                    results[ticker] = cached
+                    self.hits += 1
+                    continue
+                self.misses += 1
+                key = (ticker, period)
+                future = self._in_flight.get(key)
+                if future is None:
+                    future = self._executor.submit(self._fetch, ticker, period)
+                    self._in_flight[key] = future
+                futures[ticker] = future
+
+        for ticker, future in futures.items():
+            try:
+                results[ticker] = future.result()
+            except Exception as e:
+                self.errors[ticker] = str(e)
+
+        # Keep the requested order
+        return {ticker: results[ticker] for ticker in tickers if ticker in results}
+
+    def get(self, ticker, period="1y"):
+        return self.get_many([ticker], period=period).get(ticker)
+
+    def close(self):
+        """Shut the thread pool down after the fetches already submitted"""
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,180 @@
+import argparse
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from indicator_kernels import price_matrix
+
+# Offline peer index. Peers are the stocks whose daily returns moved most like
+# the symbol's own over the trailing window (Pearson correlation on the cached
+# price matrix), optionally only among stocks of the same sector in the symbol
+# master. The result is a fixed size nearest-neighbour table, so looking up a
+# symbol's peers at report time is a dictionary read plus k rows, no downloads.
+
+
+def _symbol(ticker):
+    return ticker.upper().replace('.NS', '')
+
+
+def return_correlations(close, window=252, min_overlap=120):
+    """Correlation matrix of daily log returns over the last window bars
+
+    Symbols that did not trade on some dates are compared over the days both
+    traded; pairs with fewer than min_overlap common days get NaN.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.diff(np.log(close), axis=0)[-window:]
+    present = ~np.isnan(returns)
+    counts = present.sum(axis=0)
+
+    # Standardize each column over its own days, missing days then add nothing
+    with np.errstate(invalid='ignore'):
+        mean = np.nanmean(returns, axis=0)
+        std = np.nanstd(returns, axis=0)
+        z = np.where(present, (returns - mean) / std, 0.0)
+    z[:, ~(std > 0)] = 0.0
+
+    overlap = present.T.astype(float) @ present.astype(float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = (z.T @ z) / overlap
+    corr[overlap < min_overlap] = np.nan
+    corr[:, counts < min_overlap] = np.nan
+    np.fill_diagonal(corr, np.nan)
+    return corr
+
+
+def performance_1y(dates, close):
+    """Percent change of every column over the last year, as get_similar_companies reports it"""
+    start = np.searchsorted(dates, dates[-1] - pd.DateOffset(years=1), side='right')
+    window = close[start:]
+    valid = ~np.isnan(window)
+    first = np.argmax(valid, axis=0)
+    last = len(window) - 1 - np.argmax(valid[::-1], axis=0)
+    columns = np.arange(close.shape[1])
+    start_price = window[first, columns]
+    end_price = window[last, columns]
+    perf = (end_price - start_price) / start_price * 100
+    perf[~valid.any(axis=0)] = np.nan
+    return perf
+
+
+class PeerIndex:
+    """Nearest-neighbour table: for every symbol its k most correlated peers
+
+    neighbours[i] holds row numbers into symbols (-1 pads rows with fewer than
+    k peers) and scores[i] the matching correlations, best first.
+    """
+
+    def __init__(self, symbols, neighbours, scores, performance, metadata=None):
+        self.symbols = np.asarray(symbols)
+        self.neighbours = np.asarray(neighbours, dtype=np.int32)
+        self.scores = np.asarray(scores, dtype=np.float32)
+        self.performance = np.asarray(performance, dtype=np.float32)
+        self.metadata = metadata or {}
+        self._rows = {symbol: row for row, symbol in enumerate(self.symbols.tolist())}
+
+    @classmethod
+    def build(cls, histories, master=None, k=10, window=252, min_overlap=120, within_sector=True):
+        """Build from {ticker: OHLCV DataFrame}, e.g. the bars of a PriceStore
+
+        With a master and within_sector, peers are taken from the symbol's own
+        sector whenever it has any; symbols without a sector (or alone in it)
+        get the most correlated stocks overall.
+        """
+        dates, tickers, close = price_matrix(histories, 'Close')
+        symbols = [_symbol(ticker) for ticker in tickers]
+        corr = return_correlations(close, window=window, min_overlap=min_overlap)
+
+        if master is not None and within_sector:
+            sectors = np.array([master.sector(symbol) or '' for symbol in symbols], dtype=object)
+            same = (sectors[:, None] == sectors[None, :]) & (sectors[:, None] != '')
+            has_peers = (same & ~np.isnan(corr)).any(axis=1)
+            # Outside the sector only counts for rows with no sector peer at all
+            corr = np.where(same | ~has_peers[:, None], corr, np.nan)
+
+        # Missing correlations rank last, then np.argpartition keeps the top k
+        keys = np.where(np.isnan(corr), np.inf, -corr)
+        k = min(k, max(len(symbols) - 1, 0))
+        if k == 0:
+            top = np.empty((len(symbols), 0), dtype=np.int64)
+        else:
+            top = np.argpartition(keys, k - 1, axis=1)[:, :k]
+            top = np.take_along_axis(top, np.argsort(np.take_along_axis(keys, top, axis=1), axis=1), axis=1)
+        scores = np.take_along_axis(corr, top, axis=1)
+        neighbours = np.where(np.isnan(scores), -1, top)
+
+        metadata = {
+            "built_at": datetime.now().isoformat(timespec='seconds'),
+            "last_bar": str(pd.Timestamp(dates[-1]).date()) if len(dates) else None,
+            "window": window,
+            "within_sector": bool(master is not None and within_sector),
+        }
+        return cls(symbols, neighbours, scores, performance_1y(dates, close), metadata)
+
+    @classmethod
+    def from_store(cls, store, symbols=None, **kwargs):
+        """Build from the bars cached in a PriceStore, without any download"""
+        histories = {}
+        for symbol in symbols if symbols is not None else list(store.manifest):
+            df = store.load(symbol)
+            if df is not None and len(df) > 0:
+                histories[symbol] = df
+        return cls.build(histories, **kwargs)
+
+    def save(self, path):
+        """Write the table as one compressed .npz file"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, symbols=self.symbols.astype(str), neighbours=self.neighbours,
+                                scores=self.scores, performance=self.performance,
+                                metadata=np.array(json.dumps(self.metadata)))
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['symbols'], data['neighbours'], data['scores'], data['performance'],
+                       json.loads(str(data['metadata'])))
+
+    def __contains__(self, ticker):
+        return _symbol(ticker) in self._rows
+
+    def peers(self, ticker, k=3):
+        """Return [{"symbol", "correlation", "performance_1y"}] for the k closest peers of ticker"""
+        row = self._rows.get(_symbol(ticker))
+        if row is None:
+            return []
+        peers = []
+        for column, score in zip(self.neighbours[row, :k], self.scores[row, :k]):
+            if column < 0:
+                break
+            perf = self.performance[column]
+            peers.append({
+                "symbol": str(self.symbols[column]),
+                "correlation": round(float(score), 3),
+                "performance_1y": "N/A" if np.isnan(perf) else f"{perf:.2f}%"
+            })
+        return peers
+
+
+if __name__ == "__main__":
+    from price_store import PriceStore
+    from symbol_master import default_master
+
+    parser = argparse.ArgumentParser(description="Build the peer index from the cached price history")
+    parser.add_argument("--store", default="price_cache", help="PriceStore directory")
+    parser.add_argument("--out", default="peer_index.npz")
+    parser.add_argument("-k", type=int, default=10, help="peers kept per symbol")
+    parser.add_argument("--window", type=int, default=252, help="trading days of returns to correlate")
+    parser.add_argument("--no-sectors", action="store_true", help="ignore the symbol master's sectors")
+    args = parser.parse_args()
+
+    index = PeerIndex.from_store(PriceStore(args.store), master=default_master(), k=args.k,
+                                 window=args.window, within_sector=not args.no_sectors)
+    index.save(args.out)
+    print(f"Peer index of {len(index.symbols)} symbols written to {args.out}")
@@ -0,0 +1,101 @@
+import cProfile
+import os
+import re
+import time
+from contextlib import contextmanager
+
+# Lightweight instrumentation for the analysis pipeline: wall time and call
+# count per stage plus plain counters (cache hits and misses, bytes fetched,
+# rows processed). A Metrics object turns into a JSON friendly dict for the
+# report and into Prometheus text exposition format for scraping.
+
+
+class Metrics:
+    """Per-stage timers and named counters, those named in counters start at 0"""
+
+    def __init__(self, counters=()):
+        self.stages = {}
+        self.counters = dict.fromkeys(counters, 0)
+
+    @contextmanager
+    def stage(self, name):
+        """Time the body of a with block as stage name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = self.stages.setdefault(name, {"count": 0, "seconds": 0.0})
+            entry["count"] += 1
+            entry["seconds"] += time.perf_counter() - start
+
+    def incr(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def as_dict(self):
+        return {
+            "stages": {name: {"count": entry["count"], "seconds": round(entry["seconds"], 6)}
+                       for name, entry in self.stages.items()},
+            "counters": dict(self.counters)
+        }
+
+    def merge(self, metrics):
+        """Add another Metrics (or its as_dict()) into this one, e.g. every report of a batch"""
+        if isinstance(metrics, Metrics):
+            metrics = metrics.as_dict()
+        for name, entry in metrics.get("stages", {}).items():
+            total = self.stages.setdefault(name, {"count": 0, "seconds": 0.0})
+            total["count"] += entry["count"]
+            total["seconds"] += entry["seconds"]
+        for name, value in metrics.get("counters", {}).items():
+            self.incr(name, value)
+        return self
+
+    def to_prometheus(self, prefix="nse_analysis", labels=None):
+        """Prometheus text format, stages become <prefix>_stage_seconds_total{stage=...}"""
+        base = ''.join(f',{key}="{value}"' for key, value in (labels or {}).items())
+        lines = [
+            f"# HELP {prefix}_stage_seconds_total Wall time spent in each pipeline stage.",
+            f"# TYPE {prefix}_stage_seconds_total counter",
+        ]
+        lines += [f'{prefix}_stage_seconds_total{{stage="{name}"{base}}} {entry["seconds"]:.6f}'
+                  for name, entry in sorted(self.stages.items())]
+        lines += [
+            f"# HELP {prefix}_stage_calls_total Times each pipeline stage ran.",
+            f"# TYPE {prefix}_stage_calls_total counter",
+        ]
+        lines += [f'{prefix}_stage_calls_total{{stage="{name}"{base}}} {entry["count"]}'
+                  for name, entry in sorted(self.stages.items())]
+        for name, value in sorted(self.counters.items()):
+            metric = f"{prefix}_{re.sub(r'[^a-zA-Z0-9_]', '_', name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{{{base[1:]}}} {value}" if base else f"{metric} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path, **kwargs):
+        """Write to_prometheus() to path, e.g. for the node exporter's textfile collector"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.to_prometheus(**kwargs))
+        os.replace(tmp_path, path)
+        return path
+
+
+@contextmanager
+def profiled(path):
+    """cProfile the body of a with block and dump the stats to path (no-op when path is None)
+
+    Read the dump with pstats or snakeviz, e.g. python -m pstats path.
+    """
+    if path is None:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        profiler.dump_stats(path)
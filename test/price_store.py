@@ -0,0 +1,275 @@
+import json
+import os
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import numpy as np
+import pandas as pd
+
+
+def _period_offset(period):
+    """Convert a yfinance style period ('3y', '6mo', '30d') to a DateOffset"""
+    if period.endswith('mo'):
+        return pd.DateOffset(months=int(period[:-2]))
+    if period.endswith('y'):
+        return pd.DateOffset(years=int(period[:-1]))
+    if period.endswith('d'):
+        return pd.DateOffset(days=int(period[:-1]))
+    raise ValueError(f"Unsupported period: {period}")
+
+
+@contextmanager
+def _file_lock(path):
+    """Hold an exclusive lock on path (created if needed) across processes and threads"""
+    with open(path, 'a+') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+OHLCV = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def normalize_bars(df):
+    """OHLCV columns only, on a tz-naive index, whichever yfinance call returned the bars
+
+    Ticker.history returns tz-aware bars with Dividends and Stock Splits while
+    yf.download returns tz-naive bars without them, and a cache mixing the two
+    cannot be sorted or compared.
+    """
+    if df is None:
+        return df
+    df = df.reindex(columns=OHLCV)
+    if getattr(df.index, 'tz', None) is not None:
+        df.index = df.index.tz_localize(None)
+    df.index.name = 'Date'
+    return df
+
+
+class PriceProvider:
+    """Interface for anything that can serve daily OHLCV bars and company info"""
+
+    def history(self, symbol, period="3y", start=None):
+        """Return an OHLCV DataFrame indexed by date, from start if given else for period"""
+        raise NotImplementedError
+
+    def info(self, symbol):
+        """Return the fundamentals dictionary for a symbol"""
+        raise NotImplementedError
+
+    def history_many(self, symbols, period="3y", start=None):
+        """Return {symbol: DataFrame}, providers with a bulk endpoint should override this"""
+        return {symbol: self.history(symbol, period=period, start=start) for symbol in symbols}
+
+
+class YFinanceProvider(PriceProvider):
+    """Serve data from Yahoo Finance"""
+
+    def history(self, symbol, period="3y", start=None):
+        import yfinance as yf
+
+        ticker = yf.Ticker(symbol)
+        if start is not None:
+            return normalize_bars(ticker.history(start=start))
+        return normalize_bars(ticker.history(period=period))
+
+    def info(self, symbol):
+        import yfinance as yf
+
+        return yf.Ticker(symbol).info
+
+    def history_many(self, symbols, period="3y", start=None):
+        import yfinance as yf
+
+        # One bulk request instead of one round trip per symbol
+        data = yf.download(list(symbols), period=None if start else period, start=start,
+                           group_by='ticker', auto_adjust=True, threads=True, progress=False)
+        frames = {}
+        downloaded = set(data.columns.get_level_values(0)) if len(data.columns) else set()
+        for symbol in symbols:
+            if symbol in downloaded:
+                frames[symbol] = normalize_bars(data[symbol].dropna(how='all'))
+        return frames
+
+
+class FakeProvider(PriceProvider):
+    """Serve synthetic bars so the store and the analyzer can run fully offline"""
+
+    def __init__(self, bars=750, end=None, info=None, symbols=None, delay=0.0):
+        self.bars = bars
+        self.end = pd.Timestamp(end or datetime.now().date())
+        self.default_info = info or {}
+        # With a symbol list, every other ticker is unknown like a delisted one
+        self.symbols = set(symbols) if symbols is not None else None
+        # Seconds every request takes, to stand in for network latency
+        self.delay = delay
+        # Every request is recorded so callers can check what was fetched
+        self.calls = []
+
+    def _frame(self, symbol):
+        # Seed from the symbol so the same ticker always gets the same series
+        rng = np.random.default_rng(zlib.crc32(symbol.encode()))
+        index = pd.bdate_range(end=self.end, periods=self.bars, name='Date')
+        close = 100 * np.exp(np.cumsum(rng.normal(0.0005, 0.015, self.bars)))
+        spread = close * rng.uniform(0.002, 0.02, self.bars)
+        return pd.DataFrame({
+            'Open': close + rng.normal(0, 0.5, self.bars) * spread,
+            'High': close + spread,
+            'Low': close - spread,
+            'Close': close,
+            'Volume': rng.integers(100_000, 5_000_000, self.bars).astype(float),
+        }, index=index)
+
+    def _known(self, symbol):
+        if self.delay:
+            time.sleep(self.delay)
+        return self.symbols is None or symbol in self.symbols
+
+    def history(self, symbol, period="3y", start=None):
+        self.calls.append(('history', symbol, period, start))
+        if not self._known(symbol):
+            return self._frame(symbol).iloc[:0]
+        df = self._frame(symbol)
+        if start is not None:
+            return df[df.index >= pd.Timestamp(start)]
+        return df[df.index > df.index[-1] - _period_offset(period)]
+
+    def info(self, symbol):
+        self.calls.append(('info', symbol))
+        if not self._known(symbol):
+            return {}
+        return dict(self.default_info, shortName=symbol.replace('.NS', ''))
+
+
+class PriceStore:
+    """Persistent per-symbol Parquet store of daily bars with incremental refresh.
+
+    Each symbol lives in its own Parquet file under root, and manifest.json keeps
+    the last bar timestamp and the date of the last refresh so that a read only
+    fetches the missing tail from the provider. Several processes (the workers
+    of analyze_many) may share a root, each save merges into the manifest on disk.
+    """
+
+    def __init__(self, root="price_cache", provider=None, period="3y"):
+        self.root = root
+        self.provider = provider or YFinanceProvider()
+        self.period = period
+        os.makedirs(root, exist_ok=True)
+        self.manifest_path = os.path.join(root, "manifest.json")
+        self.manifest = self._load_manifest()
+        # get_history calls answered from disk alone versus calls that downloaded bars
+        self.hits = 0
+        self.misses = 0
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def _save_manifest(self, entries):
+        """Merge entries into the manifest on disk, keeping what other processes saved meanwhile"""
+        with _file_lock(f"{self.manifest_path}.lock"):
+            manifest = self._load_manifest()
+            manifest.update(entries)
+            # Write to a temp file of our own first so a crash never leaves a half written manifest
+            tmp_path = f"{self.manifest_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(manifest, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.manifest_path)
+            self.manifest = manifest
+
+    def _path(self, symbol):
+        return os.path.join(self.root, f"{symbol}.parquet")
+
+    def load(self, symbol):
+        """Return the cached bars for a symbol, or None when nothing is stored"""
+        if symbol not in self.manifest or not os.path.exists(self._path(symbol)):
+            return None
+        return pd.read_parquet(self._path(symbol))
+
+    def save(self, symbol, df):
+        """Write bars for a symbol and record its last bar in the manifest"""
+        df.to_parquet(self._path(symbol))
+        self._save_manifest({symbol: {
+            "last_bar": df.index[-1].isoformat(),
+            "rows": len(df),
+            "refreshed_on": datetime.now().date().isoformat()
+        }})
+
+    def is_fresh(self, symbol):
+        """True when the symbol was already refreshed today"""
+        return self.manifest.get(symbol, {}).get("refreshed_on") == datetime.now().date().isoformat()
+
+    def _merge(self, symbol, cached, new):
+        """Append new bars to the cached ones, trim to the period and persist"""
+        # Stores written before normalize_bars may hold tz-aware bars
+        cached, new = normalize_bars(cached), normalize_bars(new)
+        if cached is None or len(cached) == 0:
+            df = new
+        else:
+            df = pd.concat([cached, new])
+            df = df[~df.index.duplicated(keep='last')].sort_index()
+
+        if df is None or len(df) == 0:
+            return df
+
+        # Keep the same window a fresh download would have returned
+        df = df[df.index > df.index[-1] - _period_offset(self.period)]
+        self.save(symbol, df)
+        return df
+
+    def get_history(self, symbol):
+        """Return bars for symbol, fetching only the bars missing from the cache"""
+        cached = self.load(symbol)
+
+        if cached is None or len(cached) == 0:
+            new = self.provider.history(symbol, period=self.period)
+        elif self.is_fresh(symbol):
+            self.hits += 1
+            return cached
+        else:
+            # Refetch from the last stored bar, it may have been a partial session
+            new = self.provider.history(symbol, start=cached.index[-1].date())
+
+        self.misses += 1
+        return self._merge(symbol, cached, new)
+
+    def refresh_many(self, symbols):
+        """Bring many symbols up to date, grouping the downloads into bulk requests"""
+        missing = []
+        stale = {}
+        for symbol in symbols:
+            if symbol not in self.manifest or not os.path.exists(self._path(symbol)):
+                missing.append(symbol)
+            elif not self.is_fresh(symbol):
+                # Symbols whose tails start on the same day share one request
+                last_bar = pd.Timestamp(self.manifest[symbol]["last_bar"]).date()
+                stale.setdefault(last_bar, []).append(symbol)
+
+        if missing:
+            for symbol, new in self.provider.history_many(missing, period=self.period).items():
+                self._merge(symbol, None, new)
+
+        for start, group in stale.items():
+            for symbol, new in self.provider.history_many(group, start=start).items():
+                self._merge(symbol, self.load(symbol), new)
@@ -0,0 +1,185 @@
+import json
+import os
+import warnings
+
+# Output layer for analysis reports. JSONReportWriter keeps the original one
+# indented file per symbol; NDJSONReportWriter and ParquetReportWriter stream a
+# whole run into a single file so a day's results are one read away.
+
+
+def flatten_report(report, prefix=''):
+    """Flatten nested report sections into one row with dotted column names
+
+    Lists (observations, targets, peers) are kept as JSON strings and integers
+    become floats so every row of a run shares the same column types.
+    """
+    row = {}
+    for key, value in report.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            row.update(flatten_report(value, prefix=f"{name}."))
+        elif isinstance(value, (list, tuple)):
+            row[name] = json.dumps(value, default=str)
+        elif isinstance(value, bool) or value is None or isinstance(value, str):
+            row[name] = value
+        elif isinstance(value, (int, float)):
+            row[name] = float(value)
+        else:
+            row[name] = str(value)
+    return row
+
+
+class ReportWriter:
+    """Base class, use as a context manager so the output is always closed"""
+
+    path = None
+
+    def write(self, report):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class JSONReportWriter(ReportWriter):
+    """One indented {symbol}_analysis_report.json per report"""
+
+    def __init__(self, output_dir='.', indent=2):
+        self.output_dir = output_dir
+        self.indent = indent
+        os.makedirs(output_dir, exist_ok=True)
+
+    def write(self, report):
+        json_path = os.path.join(self.output_dir, f"{report['symbol']}_analysis_report.json")
+        with open(json_path, 'w') as f:
+            json.dump(report, f, indent=self.indent)
+        return json_path
+
+
+class NDJSONReportWriter(ReportWriter):
+    """Append every report as one compact line of a single file"""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def write(self, report):
+        self._file.write(json.dumps(report, separators=(',', ':'), default=str))
+        self._file.write('\n')
+        # Flush per line so a crashed run keeps everything written so far
+        self._file.flush()
+        return self.path
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetReportWriter(ReportWriter):
+    """Buffer flattened reports and append them as row groups of one Parquet file"""
+
+    def __init__(self, path, batch_size=500):
+        self.path = path
+        self.batch_size = batch_size
+        self._rows = []
+        self._writer = None
+        self._schema = None
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def write(self, report):
+        self._rows.append(flatten_report(report))
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+        return self.path
+
+    @staticmethod
+    def _infer_schema(rows):
+        """Schema over the union of keys in rows, in first-seen order
+
+        A column is bool or double when all its values are, string otherwise,
+        including columns that are None in every row of the batch.
+        """
+        import pyarrow as pa
+
+        kinds = {}
+        for row in rows:
+            for key, value in row.items():
+                kind = kinds.setdefault(key, None)
+                if value is None:
+                    continue
+                value_kind = 'bool' if isinstance(value, bool) else 'double' if isinstance(value, float) else 'string'
+                kinds[key] = value_kind if kind in (None, value_kind) else 'string'
+        types = {'bool': pa.bool_(), 'double': pa.float64()}
+        return pa.schema([(key, types.get(kind, pa.string())) for key, kind in kinds.items()])
+
+    def _conform(self, rows):
+        """Columns of rows in the file's schema; values that do not fit the column type become None"""
+        import pyarrow as pa
+
+        extra = {key for row in rows for key in row} - set(self._schema.names) - self._dropped
+        if extra:
+            # A Parquet file has one schema, columns first seen after the first batch cannot be added
+            warnings.warn(f"{self.path}: dropping columns missing from the first batch: {sorted(extra)}")
+            self._dropped |= extra
+        columns = {}
+        for field in self._schema:
+            values = [row.get(field.name) for row in rows]
+            if pa.types.is_string(field.type):
+                values = [None if value is None else value if isinstance(value, str) else str(value)
+                          for value in values]
+            elif pa.types.is_boolean(field.type):
+                values = [value if isinstance(value, bool) else None for value in values]
+            else:
+                values = [float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+                          for value in values]
+            columns[field.name] = values
+        return pa.Table.from_pydict(columns, schema=self._schema)
+
+    def flush(self):
+        if not self._rows:
+            return
+        import pyarrow.parquet as pq
+
+        if self._writer is None:
+            self._schema = self._infer_schema(self._rows)
+            self._dropped = set()
+            self._writer = pq.ParquetWriter(self.path, self._schema)
+        self._writer.write_table(self._conform(self._rows))
+        self._rows = []
+
+    def close(self):
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+
+
+def make_writer(output_format='json', output_dir='.', run_name='analysis'):
+    """Create the writer for 'json', 'ndjson' or 'parquet' output"""
+    if output_format == 'json':
+        return JSONReportWriter(output_dir)
+    if output_format == 'ndjson':
+        return NDJSONReportWriter(os.path.join(output_dir, f"{run_name}.ndjson"))
+    if output_format == 'parquet':
+        return ParquetReportWriter(os.path.join(output_dir, f"{run_name}.parquet"))
+    raise ValueError(f"Unknown output format: {output_format}")
+
+
+def load_reports(path):
+    """Load a run written by NDJSONReportWriter or ParquetReportWriter as a DataFrame"""
+    import pandas as pd
+
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    with open(path, encoding='utf-8') as f:
+        reports = [json.loads(line) for line in f if line.strip()]
+    return pd.json_normalize(reports)
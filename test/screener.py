@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+from backtest import actions, signal_counts
+from indicator_kernels import compute_indicators_by_symbol, price_matrix
+
+
+class Screener:
+    """Filter and rank the whole symbol universe on its latest indicator values
+
+    Indicators are computed once for every symbol with the vectorized kernels
+    (the same columns NSEStockAnalyzer computes, each symbol over its own
+    trading days) and the latest row of each is kept in a snapshot table,
+    together with the bullish/bearish signal counts and short term action of
+    get_buy_sell_suggestions. Screens are pandas expressions over that table:
+
+        screener.screen("RSI < 30 and Close > SMA_200", sort_by="RSI", k=20)
+    """
+
+    def __init__(self, histories):
+        dates, symbols, close = price_matrix(histories, 'Close')
+        _, _, volume = price_matrix(histories, 'Volume')
+        self.dates = dates
+        self.symbols = symbols
+        self.indicators = compute_indicators_by_symbol(close, volume)
+        self.snapshot = self._build_snapshot()
+
+    @classmethod
+    def from_store(cls, store, symbols):
+        """Build from the bars cached in a PriceStore, without any download"""
+        histories = {}
+        for symbol in symbols:
+            df = store.load(symbol)
+            if df is not None and len(df) > 0:
+                histories[symbol.replace('.NS', '')] = df
+        return cls(histories)
+
+    def _build_snapshot(self):
+        close = self.indicators['Close']
+        columns = np.arange(close.shape[1])
+        # Last date with a price for every symbol, a symbol that did not trade
+        # on the final date is still screened on its own latest bar
+        last_row = close.shape[0] - 1 - np.argmax(~np.isnan(close[::-1]), axis=0)
+
+        snapshot = {name: values[last_row, columns] for name, values in self.indicators.items()}
+        bullish, bearish = signal_counts(self.indicators)
+        snapshot['bullish'] = bullish[last_row, columns]
+        snapshot['bearish'] = bearish[last_row, columns]
+        snapshot['action'] = actions(bullish, bearish)[last_row, columns]
+        snapshot['date'] = self.dates[last_row]
+        return pd.DataFrame(snapshot, index=pd.Index(self.symbols, name='symbol'))
+
+    def screen(self, expr=None, sort_by=None, k=20, ascending=True, columns=None):
+        """Return the top k rows matching expr, ordered by sort_by
+
+        Only the k best rows are fully sorted (np.argpartition), so ranking the
+        whole universe stays cheap.
+        """
+        df = self.snapshot
+        if expr:
+            df = df[df.eval(expr).to_numpy(dtype=bool)]
+
+        if sort_by is not None and len(df) > 0:
+            values = df[sort_by].to_numpy(dtype=float)
+            # Missing values always rank last
+            keys = np.where(np.isnan(values), np.inf, values if ascending else -values)
+            if k is not None and k < len(keys):
+                top = np.argpartition(keys, k - 1)[:k]
+            else:
+                top = np.arange(len(keys))
+            df = df.iloc[top[np.argsort(keys[top], kind='stable')]]
+        elif k is not None:
+            df = df.iloc[:k]
+
+        if columns is not None:
+            df = df[columns]
+        return df
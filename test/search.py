@@ -1,15 +1,24 @@
-import yfinance as yf
-import pandas as pd
+import atexit
 import json
 import re
-import requests
-from bs4 import BeautifulSoup
-import time
+from symbol_index import SymbolIndex
+from symbol_master import default_master
+from ticker_resolver import TickerResolver
+
+# What an NSE symbol can look like: one token of letters, digits, & and -, e.g. M&M or BAJAJ-AUTO
+_TICKER_SHAPE = re.compile(r"[A-Z0-9][A-Z0-9&-]{0,19}")
 
 class StockSymbolFinder:
-    def __init__(self):
+    def __init__(self, master=None, provider=None):
         # Create a database of common NSE stocks
         self.nse_stocks = self._create_nse_database()
+        # Index once, every search is then a few lookups
+        self.index = SymbolIndex(self.nse_stocks)
+        # The full NSE list comes from the shared symbol master, loaded on first use
+        self._master = master
+        # Live ticker checks go through a provider, Yahoo Finance unless one is passed
+        self.provider = provider
+        self._resolver = None
     
     def _create_nse_database(self):
         """Create a database of NSE stocks"""
@@ -112,103 +121,119 @@ class StockSymbolFinder:
         
         return nse_stocks
     
+    @property
+    def master(self):
+        if self._master is None:
+            self._master = default_master()
+        return self._master
+    
     def _fetch_nse_symbols_from_web(self):
-        """Fetch NSE symbols from web (as a fallback)"""
-        try:
-            # This is a simplified approach - in a real scenario, you'd use a more reliable source
-            url = "https://www1.nseindia.com/content/equities/EQUITY_L.csv"
-            df = pd.read_csv(url)
-            
-            stocks = []
-            for _, row in df.iterrows():
-                stocks.append({
-                    "company_name": row["NAME OF COMPANY"],
-                    "symbol": row["SYMBOL"],
-                    "exchange": "NSE"
-                })
-            
-            return stocks
-        except:
-            print("Failed to fetch NSE symbols from web. Using built-in database.")
-            return []
+        """Fetch NSE symbols from the symbol master, downloaded at most once a day"""
+        return self.master.stocks()
     
-    def search_symbol(self, query):
-        """Search for a company symbol based on a query"""
+    def search_symbol(self, query, fuzzy=True, web_fallback=False, limit=10):
+        """Search for a company symbol based on a query
+
+        The curated list above is searched first, then the full NSE list of the
+        symbol master, which is a local copy refreshed at most once a day. Only
+        web_fallback goes to Yahoo Finance, for a ticker neither list knows.
+        """
         query = query.lower()
-        results = []
+        master_index = self.master.index()
         
-        # Search in the database
-        for stock in self.nse_stocks:
-            company_name = stock["company_name"].lower()
-            symbol = stock["symbol"].lower()
-            
-            # Check if query is in company name or symbol
-            if query in company_name or query in symbol:
-                results.append(stock)
+        # Search the prebuilt indexes, exact matches first, then prefix, token and substring matches
+        results = self.index.search(query, limit=limit)
+        if len(results) < limit:
+            known = {stock["symbol"] for stock in results}
+            more = [stock for stock in master_index.search(query, limit=limit) if stock["symbol"] not in known]
+            results += more[:limit - len(results)]
         
-        # If no results, try to fetch from web
-        if not results:
-            web_stocks = self._fetch_nse_symbols_from_web()
-            for stock in web_stocks:
-                company_name = stock["company_name"].lower()
-                symbol = stock["symbol"].lower()
-                
-                # Check if query is in company name or symbol
-                if query in company_name or query in symbol:
-                    results.append(stock)
+        # If no results, the query probably has a typo: take the closest
+        # matches of both lists, each with its similarity score
+        if not results and fuzzy:
+            scored = {}
+            matches = self.index.fuzzy_search(query, limit=limit) + master_index.fuzzy_search(query, limit=limit)
+            for score, stock in matches:
+                if stock["symbol"] not in scored:
+                    scored[stock["symbol"]] = dict(stock, score=score)
+            results = sorted(scored.values(), key=lambda stock: -stock["score"])[:limit]
         
-        # Sort results by relevance (exact matches first, then partial matches)
-        sorted_results = []
+        # A ticker listed after the master was fetched is only known to Yahoo Finance
+        ticker = query.strip().upper()
+        if not results and web_fallback and _TICKER_SHAPE.fullmatch(ticker):
+            resolved, _ = self.resolver.resolve_many([f"{ticker}.NS"])
+            results = list(resolved.values())
         
-        # First, add exact matches
-        for stock in results:
-            company_name = stock["company_name"].lower()
-            symbol = stock["symbol"].lower()
-            
-            if query == company_name or query == symbol:
-                sorted_results.append(stock)
+        return {
+            "query": query,
+            "results": results
+        }
+
+    @property
+    def resolver(self):
+        if self._resolver is None:
+            if self.provider is None:
+                from price_store import YFinanceProvider
+                self.provider = YFinanceProvider()
+            self._resolver = TickerResolver(self.provider)
+        return self._resolver
+
+    def close(self):
+        """Stop the resolver's threads, if a live lookup started them"""
+        if self._resolver is not None:
+            self._resolver.close()
+            self._resolver = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def search_symbol_with_yfinance(self, query, timeout=None, limit=10):
+        """Search for a company symbol and confirm the candidates are listed, using yfinance
         
-        # Then, add partial matches that haven't been added yet
-        for stock in results:
-            if stock not in sorted_results:
-                sorted_results.append(stock)
+        The query itself and the local matches are checked concurrently; lookups
+        that are still running after timeout seconds are reported as pending
+        instead of failing the whole search.
+        """
+        local = self.search_symbol(query, limit=limit)
+        candidates = [f"{stock['symbol']}.NS" for stock in local["results"]]
+        # The query is tried as a ticker itself only when it could be one, not "tata motors"
+        ticker = query.strip().upper()
+        if _TICKER_SHAPE.fullmatch(ticker):
+            candidates.insert(0, f"{ticker}.NS")
+        candidates = list(dict.fromkeys(candidates))
         
-        # Limit to top 10 results
-        sorted_results = sorted_results[:10]
+        resolved, pending = self.resolver.resolve_many(candidates, timeout=timeout)
         
         return {
-            "query": query,
-            "results": sorted_results
+            "query": local["query"],
+            "results": list(resolved.values())[:limit],
+            "pending": [ticker.replace(".NS", "") for ticker in pending]
         }
 
-    def search_symbol_with_yfinance(self, query):
-        """Search for a company symbol using yfinance (experimental)"""
-        try:
-            # This is experimental and may not work reliably
-            tickers = yf.Tickers(f"{query}*")
-            results = []
-            
-            for ticker in tickers.tickers:
-                if ticker.endswith(".NS"):
-                    info = tickers.tickers[ticker].info
-                    results.append({
-                        "company_name": info.get("longName", ticker),
-                        "symbol": ticker.replace(".NS", ""),
-                        "exchange": "NSE"
-                    })
-            
-            return {
-                "query": query,
-                "results": results
-            }
-        except:
-            print("Failed to search with yfinance. Using built-in database.")
-            return self.search_symbol(query)
+_finder = None
+
+def get_finder():
+    """The process wide StockSymbolFinder, built once and kept warm"""
+    global _finder
+    if _finder is None:
+        _finder = StockSymbolFinder()
+    return _finder
+
+def close_finder():
+    """Close the process wide StockSymbolFinder; the next get_finder() builds a new one"""
+    global _finder
+    if _finder is not None:
+        _finder.close()
+        _finder = None
+
+atexit.register(close_finder)
 
 def search_nse_symbol(query):
     """Main function to search for NSE symbols"""
-    finder = StockSymbolFinder()
-    results = finder.search_symbol(query)
+    results = get_finder().search_symbol(query)
     
     # Print results
     print(f"Search results for '{query}':")
@@ -226,30 +251,31 @@ def search_nse_symbol(query):
     return json.dumps(results, indent=2)
 
 # Example usage
-print("NSE Stock Symbol Finder")
-print("======================")
-print("This script helps you find NSE stock symbols based on company names.")
-print("Example searches: 'Tata', 'Reliance', 'HDFC', 'Adani', etc.")
-print()
-
-# Test with 'Tata'
-tata_results = search_nse_symbol("Tata")
-print("\nJSON Output:")
-print(tata_results)
-
-# Test with 'Reliance'
-reliance_results = search_nse_symbol("Reliance")
-print("\nJSON Output:")
-print(reliance_results)
-
-# Test with 'Adani'
-adani_results = search_nse_symbol("Adani")
-print("\nJSON Output:")
-print(adani_results)
-
-print("\nHow to use this function:")
-print("1. Call search_nse_symbol('QUERY') with any company name or partial symbol")
-print("2. The function returns a JSON string with search results")
-print("\nExample usage in Python:")
-print("results_json = search_nse_symbol('HDFC')")
-print("results = json.loads(results_json)")
\ No newline at end of file
+if __name__ == "__main__":
+    print("NSE Stock Symbol Finder")
+    print("======================")
+    print("This script helps you find NSE stock symbols based on company names.")
+    print("Example searches: 'Tata', 'Reliance', 'HDFC', 'Adani', etc.")
+    print()
+
+    # Test with 'Tata'
+    tata_results = search_nse_symbol("Tata")
+    print("\nJSON Output:")
+    print(tata_results)
+
+    # Test with 'Reliance'
+    reliance_results = search_nse_symbol("Reliance")
+    print("\nJSON Output:")
+    print(reliance_results)
+
+    # Test with 'Adani'
+    adani_results = search_nse_symbol("Adani")
+    print("\nJSON Output:")
+    print(adani_results)
+
+    print("\nHow to use this function:")
+    print("1. Call search_nse_symbol('QUERY') with any company name or partial symbol")
+    print("2. The function returns a JSON string with search results")
+    print("\nExample usage in Python:")
+    print("results_json = search_nse_symbol('HDFC')")
+    print("results = json.loads(results_json)")
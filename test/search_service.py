@@ -0,0 +1,197 @@
+import argparse
+import threading
+import time
+from collections import OrderedDict, deque
+
+from search import StockSymbolFinder
+
+# Resident symbol lookup service for autocomplete. The finder and its index are
+# built once when the process starts, answers for repeated queries (the short
+# prefixes every user types first) come from an LRU cache, and the latency of
+# every query and request is kept so percentiles can be read from /metrics.
+#
+#   GET  /search?q=tata&limit=10               one query, limit is 1 to max_limit
+#   POST /search {"queries": ["ta", "tat"]}    many queries in one call
+#   GET  /metrics                              latency percentiles and cache hit rate
+
+
+class LatencyRecorder:
+    """Keep the last `size` latencies and report their percentiles in milliseconds"""
+
+    def __init__(self, size=10000):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+
+    def percentiles(self, points=(50, 90, 99)):
+        with self._lock:
+            samples = sorted(self._samples)
+        result = {"count": self.count}
+        for point in points:
+            if samples:
+                rank = min(len(samples) - 1, int(round(point / 100 * (len(samples) - 1))))
+                result[f"p{point}_ms"] = round(samples[rank] * 1000, 4)
+            else:
+                result[f"p{point}_ms"] = None
+        return result
+
+
+class SearchService:
+    """StockSymbolFinder kept warm in memory, with an LRU cache of responses
+
+    Queries are normalized (lowercased, stripped) before the cache lookup so
+    'Tata ' and 'tata' share an entry. Up to cache_size answers are kept, the
+    least recently used is evicted first. Larger limits than max_limit are
+    clamped, which also bounds the number of cache keys per query.
+    """
+
+    def __init__(self, finder=None, cache_size=4096, max_batch=500, max_limit=50):
+        self.finder = finder or StockSymbolFinder()
+        self.cache_size = cache_size
+        self.max_batch = max_batch
+        self.max_limit = max_limit
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.query_latency = LatencyRecorder()
+        self.request_latency = LatencyRecorder()
+
+    def parse_limit(self, value, default=10):
+        """limit from a request as an int clamped to max_limit, ValueError unless it is a positive integer"""
+        if value is None:
+            return default
+        if isinstance(value, bool) or isinstance(value, float) and not value.is_integer():
+            raise ValueError("limit must be a positive integer")
+        try:
+            limit = int(value)
+        except (TypeError, ValueError):
+            raise ValueError("limit must be a positive integer")
+        if limit < 1:
+            raise ValueError("limit must be a positive integer")
+        return min(limit, self.max_limit)
+
+    def search(self, query, limit=10):
+        """Return {"query", "results"} for one query, served from the cache when possible"""
+        start = time.perf_counter()
+        key = (query.lower().strip(), limit)
+        with self._lock:
+            response = self._cache.get(key)
+            if response is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+        if response is None:
+            response = self.finder.search_symbol(key[0], limit=limit)
+            with self._lock:
+                self.misses += 1
+                self._cache[key] = response
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        self.query_latency.record(time.perf_counter() - start)
+        return response
+
+    def search_many(self, queries, limit=10):
+        """Answer a batch of queries, in order"""
+        if len(queries) > self.max_batch:
+            raise ValueError(f"At most {self.max_batch} queries per request")
+        return [self.search(query, limit) for query in queries]
+
+    def warm(self, length=2):
+        """Fill the cache with every prefix up to length characters of the known symbols and names"""
+        prefixes = set()
+        for stock in self.finder.nse_stocks:
+            for text in (stock["symbol"].lower(), stock["company_name"].lower()):
+                prefixes.update(text[:n] for n in range(1, length + 1))
+        for prefix in sorted(prefixes):
+            self.search(prefix)
+        return len(prefixes)
+
+    def metrics(self):
+        with self._lock:
+            hits, misses, cached = self.hits, self.misses, len(self._cache)
+        lookups = hits + misses
+        return {
+            "cache": {
+                "size": cached,
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else None
+            },
+            "query_latency": self.query_latency.percentiles(),
+            "request_latency": self.request_latency.percentiles()
+        }
+
+
+def create_app(service=None):
+    """Flask app exposing a SearchService"""
+    from flask import Flask, g, jsonify, request
+
+    service = service or SearchService()
+    app = Flask(__name__)
+    app.config["SEARCH_SERVICE"] = service
+
+    @app.before_request
+    def start_timer():
+        g.start = time.perf_counter()
+
+    @app.after_request
+    def record_latency(response):
+        if request.endpoint == 'search':
+            service.request_latency.record(time.perf_counter() - g.start)
+        return response
+
+    @app.route('/search', methods=['GET', 'POST'])
+    def search():
+        if request.method == 'GET':
+            query = request.args.get('q', '')
+            if not query.strip():
+                return jsonify({"message": "Query parameter q is required"}), 400
+            try:
+                limit = service.parse_limit(request.args.get('limit'))
+            except ValueError as e:
+                return jsonify({"message": str(e)}), 400
+            return jsonify(service.search(query, limit))
+
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            data = {}
+        queries = data.get('queries')
+        if not isinstance(queries, list) or not all(isinstance(q, str) for q in queries):
+            return jsonify({"message": "queries must be a list of strings"}), 400
+        try:
+            limit = service.parse_limit(data.get('limit'))
+        except ValueError as e:
+            return jsonify({"message": str(e)}), 400
+        try:
+            return jsonify({"results": service.search_many(queries, limit)})
+        except ValueError as e:
+            return jsonify({"message": str(e)}), 413
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return jsonify(service.metrics())
+
+    @app.route('/health', methods=['GET'])
+    def health():
+        return jsonify({"status": "ok", "symbols": len(service.finder.nse_stocks)})
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve NSE symbol lookups over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--cache-size", type=int, default=4096)
+    parser.add_argument("--no-warm", action="store_true", help="skip precomputing the short prefixes")
+    args = parser.parse_args()
+
+    search_service = SearchService(cache_size=args.cache_size)
+    if not args.no_warm:
+        print(f"Warmed {search_service.warm()} prefixes")
+    create_app(search_service).run(host=args.host, port=args.port, threaded=True)
@@ -0,0 +1,198 @@
+import math
+from collections import deque
+
+
+class RollingWindow:
+    """Fixed size ring buffer with running sum and sum of squares"""
+
+    def __init__(self, size, values=()):
+        self.size = size
+        self.values = deque(maxlen=size)
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.updates = 0
+        for value in values:
+            self.append(value)
+
+    def append(self, value):
+        if len(self.values) == self.size:
+            old = self.values[0]
+            self.total -= old
+            self.total_sq -= old * old
+        self.values.append(value)
+        self.total += value
+        self.total_sq += value * value
+        self._count_update()
+
+    def replace_last(self, value):
+        old = self.values[-1]
+        self.values[-1] = value
+        self.total += value - old
+        self.total_sq += value * value - old * old
+        self._count_update()
+
+    def _count_update(self):
+        # Re-sum every so often so floating point drift never builds up
+        self.updates += 1
+        if self.updates >= 10 * self.size:
+            self.total = math.fsum(self.values)
+            self.total_sq = math.fsum(v * v for v in self.values)
+            self.updates = 0
+
+    @property
+    def full(self):
+        return len(self.values) == self.size
+
+    def mean(self):
+        return self.total / self.size if self.full else math.nan
+
+    def std(self):
+        """Sample standard deviation (ddof=1) as pandas rolling().std()"""
+        if not self.full:
+            return math.nan
+        mean = self.total / self.size
+        var = (self.total_sq - self.size * mean * mean) / (self.size - 1)
+        return math.sqrt(max(var, 0.0))
+
+
+class IncrementalIndicators:
+    """O(1) per bar update of the indicators NSEStockAnalyzer reports
+
+    Seed it from the analyzer's indicator frame, then push each new bar with
+    update(). Intraday ticks that revise the bar in progress are pushed with
+    replace=True. The snapshot has the same 'moving_averages' and 'indicators'
+    sections as the report, plus a 'volume' section.
+    """
+
+    EMA_SPANS = {'EMA_12': 12, 'EMA_20': 20, 'EMA_26': 26}
+
+    def __init__(self, closes, volumes, emas, signal_line, prev_emas=None, prev_signal=None):
+        closes = list(closes)
+        gains = []
+        losses = []
+        # The first bar has no change and counts as 0, as in the batch calculation
+        for i, close in enumerate(closes):
+            delta = close - closes[i - 1] if i > 0 else 0.0
+            gains.append(max(delta, 0.0))
+            losses.append(max(-delta, 0.0))
+
+        self.sma_50 = RollingWindow(50, closes[-50:])
+        self.sma_200 = RollingWindow(200, closes[-200:])
+        self.bb = RollingWindow(20, closes[-20:])
+        self.volume = RollingWindow(10, list(volumes)[-10:])
+        self.gains = RollingWindow(14, gains[-14:])
+        self.losses = RollingWindow(14, losses[-14:])
+        self.emas = dict(emas)
+        self.signal_line = signal_line
+        self.close = closes[-1]
+        self.last_volume = list(volumes)[-1]
+
+        # State before the bar in progress, so it can be revised
+        self._prev_close = closes[-2] if len(closes) > 1 else None
+        self._prev_emas = dict(prev_emas) if prev_emas else None
+        self._prev_signal = prev_signal
+
+    @classmethod
+    def from_frame(cls, df):
+        """Seed from the frame returned by calculate_technical_indicators"""
+        latest = df.iloc[-1]
+        previous = df.iloc[-2] if len(df) > 1 else None
+        return cls(
+            closes=df['Close'].iloc[-200:].tolist(),
+            volumes=df['Volume'].iloc[-10:].tolist(),
+            emas={name: float(latest[name]) for name in cls.EMA_SPANS},
+            signal_line=float(latest['Signal_Line']),
+            prev_emas={name: float(previous[name]) for name in cls.EMA_SPANS} if previous is not None else None,
+            prev_signal=float(previous['Signal_Line']) if previous is not None else None
+        )
+
+    @staticmethod
+    def _ema_step(prev, value, span):
+        alpha = 2.0 / (span + 1.0)
+        return alpha * value + (1 - alpha) * prev
+
+    def update(self, close, volume, replace=False):
+        """Push a new bar (or revise the current one with replace=True) and return a snapshot"""
+        if replace:
+            if self._prev_emas is None:
+                raise ValueError("There is no earlier bar to revise the current one against")
+            prev_close = self._prev_close
+            prev_emas = self._prev_emas
+            prev_signal = self._prev_signal
+        else:
+            prev_close = self.close
+            prev_emas = self.emas
+            prev_signal = self.signal_line
+
+        delta = close - prev_close if prev_close is not None else 0.0
+        gain, loss = max(delta, 0.0), max(-delta, 0.0)
+
+        if replace:
+            for window in (self.sma_50, self.sma_200, self.bb):
+                window.replace_last(close)
+            self.volume.replace_last(volume)
+            self.gains.replace_last(gain)
+            self.losses.replace_last(loss)
+        else:
+            for window in (self.sma_50, self.sma_200, self.bb):
+                window.append(close)
+            self.volume.append(volume)
+            self.gains.append(gain)
+            self.losses.append(loss)
+
+        self.emas = {name: self._ema_step(prev_emas[name], close, span)
+                     for name, span in self.EMA_SPANS.items()}
+        macd = self.emas['EMA_12'] - self.emas['EMA_26']
+        self.signal_line = self._ema_step(prev_signal, macd, 9)
+
+        self._prev_close = prev_close
+        self._prev_emas = prev_emas
+        self._prev_signal = prev_signal
+        self.close = close
+        self.last_volume = volume
+
+        return self.snapshot()
+
+    def rsi(self):
+        avg_gain = self.gains.mean()
+        avg_loss = self.losses.mean()
+        if math.isnan(avg_gain) or math.isnan(avg_loss):
+            return math.nan
+        if avg_loss == 0:
+            return 100.0 if avg_gain > 0 else math.nan
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+    def _bb_position(self, middle, upper, lower):
+        """Same rules as NSEStockAnalyzer._get_bb_position"""
+        if self.close > upper:
+            return "Above Upper"
+        elif self.close < lower:
+            return "Below Lower"
+        elif self.close > middle:
+            return "Upper Half"
+        else:
+            return "Lower Half"
+
+    def snapshot(self):
+        """Return the current values in the report's technical_analysis shape"""
+        middle = self.bb.mean()
+        std = self.bb.std()
+        macd = self.emas['EMA_12'] - self.emas['EMA_26']
+        volume_avg = self.volume.mean()
+
+        return {
+            'moving_averages': {
+                'sma_50': round(self.sma_50.mean(), 2),
+                'sma_200': round(self.sma_200.mean(), 2),
+                'ema_20': round(self.emas['EMA_20'], 2)
+            },
+            'indicators': {
+                'rsi': round(self.rsi(), 2),
+                'macd': 'Bullish' if macd > self.signal_line else 'Bearish',
+                'bollinger_bands': self._bb_position(middle, middle + 2 * std, middle - 2 * std)
+            },
+            'volume': {
+                'volume_10d_avg': round(volume_avg, 2),
+                'volume_ratio': round(self.last_volume / volume_avg, 2) if volume_avg else math.nan
+            }
+        }
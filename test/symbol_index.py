@@ -0,0 +1,290 @@
+import heapq
+import re
+import threading
+from bisect import bisect_left
+
+_TOKEN_RE = re.compile(r"[a-z0-9&]+")
+
+# Relevance tiers, lower is better
+EXACT, PREFIX, TOKEN, SUBSTRING = range(4)
+
+# Serializes the lazy fuzzy index builds, module level so indexes stay picklable
+_FUZZY_BUILD_LOCK = threading.Lock()
+
+
+def tokenize(text):
+    """Lowercase word tokens of a company name or query"""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def trigrams(text):
+    """Set of 3-character substrings of text"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def padded_trigrams(word):
+    """Trigrams of a single word padded so its start and end count too"""
+    return trigrams(f"  {word} ")
+
+
+def bounded_levenshtein(a, b, max_distance):
+    """Edit distance between a and b, or max_distance + 1 once it is certain to be larger
+
+    Adjacent transpositions ("relaince") count as one edit. Rows stop as soon as
+    every cell is over the bound, so a hopeless pair costs only a few steps.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous_row = None
+    row = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, char_b in enumerate(b, 1):
+            cost = char_a != char_b
+            current[j] = min(row[j] + 1, current[j - 1] + 1, row[j - 1] + cost)
+            if (previous_row is not None and i > 1 and j > 1
+                    and char_a == b[j - 2] and a[i - 2] == char_b):
+                current[j] = min(current[j], previous_row[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous_row, row = row, current
+    return row[-1] if row[-1] <= max_distance else max_distance + 1
+
+
+class _TrieNode:
+    __slots__ = ('children', 'ids')
+
+    def __init__(self):
+        self.children = {}
+        self.ids = []
+
+
+class PrefixTrie:
+    """Trie where every node keeps the ids of all keys below it, so a prefix
+    lookup costs O(len(prefix)) plus the size of the answer"""
+
+    def __init__(self):
+        self.root = _TrieNode()
+
+    def insert(self, key, item_id):
+        node = self.root
+        for char in key:
+            node = node.children.setdefault(char, _TrieNode())
+            if not node.ids or node.ids[-1] != item_id:
+                node.ids.append(item_id)
+
+    def lookup(self, prefix):
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.ids
+
+
+class SymbolIndex:
+    """Prebuilt search index over a list of {"company_name", "symbol", "exchange"} dicts
+
+    Built once, then every query is a handful of dictionary and trie lookups.
+    Results are ranked exact match, then prefix, then token, then substring
+    matches. Substring candidates come from a trigram index and are verified,
+    so no query ever scans the whole list.
+    """
+
+    def __init__(self, stocks):
+        self.stocks = list(stocks)
+        self.symbols = [stock["symbol"].lower() for stock in self.stocks]
+        self.names = [stock["company_name"].lower() for stock in self.stocks]
+
+        self.exact = {}
+        self.symbol_trie = PrefixTrie()
+        self.tokens = {}
+        self.first_tokens = {}
+        self.grams = {}
+
+        for item_id, (symbol, name) in enumerate(zip(self.symbols, self.names)):
+            self.exact.setdefault(symbol, []).append(item_id)
+            if name != symbol:
+                self.exact.setdefault(name, []).append(item_id)
+            self.symbol_trie.insert(symbol, item_id)
+            name_tokens = tokenize(name)
+            if name_tokens:
+                self.first_tokens.setdefault(name_tokens[0], []).append(item_id)
+            for token in set(name_tokens):
+                self.tokens.setdefault(token, []).append(item_id)
+            for gram in trigrams(symbol) | trigrams(name):
+                self.grams.setdefault(gram, []).append(item_id)
+
+        # Sorted vocabularies, tokens sharing a prefix are one contiguous slice
+        self.vocabulary = sorted(self.tokens)
+        self.first_vocabulary = sorted(self.first_tokens)
+
+        # Built on the first fuzzy_search, most lookups never need it
+        self.words = None
+
+    def _build_fuzzy(self):
+        # Fuzzy matching works on words: every name token and every symbol,
+        # each with its padded trigrams
+        words = sorted(set(self.tokens) | set(self.symbols))
+        word_items = {word: set(self.tokens.get(word, ())) for word in words}
+        for item_id, symbol in enumerate(self.symbols):
+            word_items[symbol].add(item_id)
+        word_grams = []
+        fuzzy_grams = {}
+        for word_id, word in enumerate(words):
+            grams = padded_trigrams(word)
+            word_grams.append(len(grams))
+            for gram in grams:
+                fuzzy_grams.setdefault(gram, []).append(word_id)
+        self.word_items, self.word_grams, self.fuzzy_grams = word_items, word_grams, fuzzy_grams
+        # Published last, other threads take a non-None words as "fully built"
+        self.words = words
+
+    def _rank_key(self, item_id):
+        # Inside a tier, shorter symbols are the closer match
+        return (len(self.symbols[item_id]), item_id)
+
+    @staticmethod
+    def _token_prefix(prefix, tokens, vocabulary):
+        """Ids filed under any token of vocabulary starting with prefix"""
+        start = bisect_left(vocabulary, prefix)
+        end = bisect_left(vocabulary, prefix + '\uffff', start)
+        if end - start == 1:
+            return tokens[vocabulary[start]]
+        ids = set()
+        for token in vocabulary[start:end]:
+            ids.update(tokens[token])
+        return ids
+
+    def _substring_matches(self, query):
+        """Ids whose name or symbol contains query, narrowed down with the trigram index"""
+        grams = trigrams(query)
+        if not grams:
+            return ()
+        postings = sorted((self.grams.get(gram, ()) for gram in grams), key=len)
+        candidates = set(postings[0])
+        for ids in postings[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(ids)
+        return [i for i in candidates if query in self.names[i] or query in self.symbols[i]]
+
+    def _token_matches(self, query_tokens):
+        """Ids whose name has every query token, the last one may be a prefix"""
+        *complete, last = query_tokens
+        candidates = None
+        for token in complete:
+            ids = self.tokens.get(token, ())
+            candidates = set(ids) if candidates is None else candidates & set(ids)
+            if not candidates:
+                return set()
+        last_ids = self._token_prefix(last, self.tokens, self.vocabulary)
+        return set(last_ids) if candidates is None else candidates & set(last_ids)
+
+    def search_ranked(self, query, limit=10):
+        """Return [(tier, stock)] for the best matches of query"""
+        query = query.lower().strip()
+        if not query:
+            return []
+
+        seen = set()
+        ranked = []
+
+        def add(tier, ids):
+            # Only the best few of a large tier can still make it into the results
+            wanted = limit - len(ranked)
+            if wanted <= 0:
+                return
+            for item_id in heapq.nsmallest(wanted, set(ids) - seen, key=self._rank_key):
+                seen.add(item_id)
+                ranked.append((tier, item_id))
+
+        add(EXACT, self.exact.get(query, ()))
+
+        prefix_ids = list(self.symbol_trie.lookup(query))
+        query_tokens = tokenize(query)
+        if query_tokens:
+            # A name starting with the query has the query's first token as its first
+            # token, or only starting with it when the query is a single word
+            first = query_tokens[0]
+            if len(query_tokens) == 1:
+                candidates = self._token_prefix(first, self.first_tokens, self.first_vocabulary)
+            else:
+                candidates = self.first_tokens.get(first, ())
+            prefix_ids += [i for i in candidates if self.names[i].startswith(query)]
+        add(PREFIX, prefix_ids)
+
+        if query_tokens and len(ranked) < limit:
+            add(TOKEN, self._token_matches(query_tokens))
+
+        if len(ranked) < limit:
+            add(SUBSTRING, self._substring_matches(query))
+
+        return [(tier, self.stocks[item_id]) for tier, item_id in ranked]
+
+    def search(self, query, limit=10):
+        """Return the best matching stocks for query, most relevant first"""
+        return [stock for _, stock in self.search_ranked(query, limit)]
+
+    def _similar_words(self, word, max_candidates, max_postings):
+        """Return {word_id: similarity} for the words closest to word
+
+        Trigram overlap picks at most max_candidates words, reading the rarest
+        trigrams first and at most max_postings entries, then each candidate is
+        re-scored with a bounded edit distance.
+        """
+        grams = padded_trigrams(word)
+        postings = sorted((self.fuzzy_grams.get(gram, ()) for gram in grams), key=len)
+        shared = {}
+        budget = max_postings
+        for ids in postings:
+            if budget <= 0:
+                break
+            for word_id in ids[:budget]:
+                shared[word_id] = shared.get(word_id, 0) + 1
+            budget -= len(ids)
+
+        def jaccard(word_id):
+            common = shared[word_id]
+            return common / (len(grams) + self.word_grams[word_id] - common)
+
+        candidates = heapq.nlargest(max_candidates, shared, key=jaccard)
+        max_distance = max(1, len(word) // 3)
+        scores = {}
+        for word_id in candidates:
+            candidate = self.words[word_id]
+            distance = bounded_levenshtein(word, candidate, max_distance)
+            edit_score = 1 - distance / max(len(word), len(candidate)) if distance <= max_distance else 0.0
+            scores[word_id] = max(edit_score, jaccard(word_id))
+        return scores
+
+    def fuzzy_search(self, query, limit=10, min_score=0.5, max_candidates=50, max_postings=5000):
+        """Typo tolerant search, returns [(score, stock)] with scores between 0 and 1
+
+        Every query word is matched against name words and symbols; a stock's
+        score is the average over the query words of its best matching word.
+        The work per query is bounded by max_candidates and max_postings, so it
+        stays fast however large the symbol list is.
+        """
+        query_words = tokenize(query)
+        if not query_words:
+            return []
+        if self.words is None:
+            with _FUZZY_BUILD_LOCK:
+                if self.words is None:
+                    self._build_fuzzy()
+
+        totals = {}
+        for word in query_words:
+            best = {}
+            for word_id, score in self._similar_words(word, max_candidates, max_postings).items():
+                for item_id in self.word_items[self.words[word_id]]:
+                    if score > best.get(item_id, 0.0):
+                        best[item_id] = score
+            for item_id, score in best.items():
+                totals[item_id] = totals.get(item_id, 0.0) + score
+
+        scored = ((total / len(query_words), item_id) for item_id, total in totals.items())
+        top = heapq.nlargest(limit, (pair for pair in scored if pair[0] >= min_score),
+                             key=lambda pair: (pair[0], -self._rank_key(pair[1])[0], -pair[1]))
+        return [(round(score, 3), self.stocks[item_id]) for score, item_id in top]
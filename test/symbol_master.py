@@ -0,0 +1,252 @@
+import hashlib
+import io
+import json
+import os
+import time
+import warnings
+from datetime import datetime
+
+# Local, versioned copy of the NSE equity list (EQUITY_L.csv). It is downloaded
+# at most once per ttl, parsed with vectorized pandas operations and kept as a
+# Parquet file next to a manifest holding its version and fetch date. Symbol
+# search, the analyzer and the peer lookup all read the same copy.
+
+EQUITY_L_URL = "https://archives.nseindia.com/content/equities/EQUITY_L.csv"
+
+# Bundled excerpt of EQUITY_L.csv, used offline and when a download fails
+SAMPLE_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "EQUITY_L_sample.csv")
+
+# NSE top companies by sector (simplified), EQUITY_L.csv has no sector column
+SECTOR_MEMBERS = {
+    'Technology': ['TCS', 'INFY', 'WIPRO', 'HCLTECH', 'TECHM'],
+    'Financial Services': ['HDFCBANK', 'ICICIBANK', 'SBIN', 'AXISBANK', 'KOTAKBANK'],
+    'Energy': ['RELIANCE', 'ONGC', 'NTPC', 'POWERGRID', 'BPCL'],
+    'Consumer Goods': ['HINDUNILVR', 'ITC', 'NESTLEIND', 'BRITANNIA', 'DABUR'],
+    'Automobile': ['MARUTI', 'TATAMOTORS', 'M&M', 'HEROMOTOCO', 'BAJAJ-AUTO'],
+    'Pharmaceutical': ['SUNPHARMA', 'DRREDDY', 'CIPLA', 'DIVISLAB', 'BIOCON'],
+    'Metals': ['TATASTEEL', 'HINDALCO', 'JSWSTEEL', 'VEDL', 'COALINDIA'],
+    'Cement': ['ULTRACEMCO', 'SHREECEM', 'ACC', 'AMBUJACEM', 'RAMCOCEM'],
+    'Telecom': ['BHARTIARTL', 'IDEA'],
+    'Infrastructure': ['LT', 'ADANIPORTS', 'DLF', 'GODREJPROP', 'OBEROIRLTY']
+}
+
+_COLUMNS = {
+    "SYMBOL": "symbol",
+    "NAME OF COMPANY": "company_name",
+    "SERIES": "series",
+    "ISIN NUMBER": "isin",
+    "SECTOR": "sector",
+}
+
+
+def parse_equity_list(data):
+    """Parse EQUITY_L.csv (a path, URL or bytes) into a frame with one row per symbol"""
+    import pandas as pd
+
+    if isinstance(data, bytes):
+        data = io.BytesIO(data)
+    df = pd.read_csv(data, dtype=str, skipinitialspace=True)
+    # The NSE file pads some header names with spaces
+    df.columns = df.columns.str.strip().str.upper()
+    missing = {"SYMBOL", "NAME OF COMPANY"} - set(df.columns)
+    if missing:
+        raise ValueError(f"Not an equity list, missing columns: {', '.join(sorted(missing))}")
+
+    df = df[[column for column in _COLUMNS if column in df.columns]].rename(columns=_COLUMNS)
+    df = df.apply(lambda column: column.str.strip())
+    df = df.dropna(subset=["symbol"]).drop_duplicates("symbol").reset_index(drop=True)
+    df["symbol"] = df["symbol"].str.upper()
+    df["company_name"] = df["company_name"].fillna(df["symbol"])
+    df["exchange"] = "NSE"
+
+    sectors = pd.Series({symbol: sector for sector, members in SECTOR_MEMBERS.items() for symbol in members})
+    known = df["symbol"].map(sectors)
+    df["sector"] = df["sector"].fillna(known) if "sector" in df.columns else known
+    return df
+
+
+def _download(url, timeout=30):
+    """Raw bytes of url, NSE refuses requests without a browser user agent"""
+    from urllib.request import Request, urlopen
+
+    request = Request(url, headers={"User-Agent": "Mozilla/5.0"})
+    with urlopen(request, timeout=timeout) as response:
+        return response.read()
+
+
+class SymbolMaster:
+    """Persistent, versioned NSE symbol master
+
+    The list lives in root as equity_list.parquet, and manifest.json records its
+    version, fetch date, source and checksum. The version only goes up when a
+    download actually changed the list. A copy older than ttl seconds is
+    refreshed on first use; if the refresh fails the old copy (or the bundled
+    sample) is kept and a warning says why.
+
+    source may be a URL or a local CSV, pass SAMPLE_CSV to work fully offline.
+    An offline master never refreshes, it reads the local copy or the sample;
+    that is what a pickled copy (in a worker process) becomes.
+    """
+
+    def __init__(self, root="symbol_master", source=EQUITY_L_URL, ttl=24 * 60 * 60, fallback=SAMPLE_CSV,
+                 retry_after=15 * 60, offline=False):
+        self.root = root
+        self.source = source
+        self.ttl = ttl
+        self.fallback = fallback
+        # After a failed refresh, wait this long before trying the source again
+        self.retry_after = retry_after
+        self.offline = offline
+        self._failed_at = 0.0
+        self.path = os.path.join(root, "equity_list.parquet")
+        self.manifest_path = os.path.join(root, "manifest.json")
+        self.manifest = self._load_manifest()
+        self._frame = None
+        self._by_symbol = None
+        self._index = None
+
+    def __getstate__(self):
+        # Worker processes reload the Parquet file instead of receiving the frame,
+        # and never download: the parent refreshed (or failed to) already
+        state = self.__dict__.copy()
+        state.update(_frame=None, _by_symbol=None, _index=None, offline=True)
+        return state
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def _save(self, df, checksum):
+        os.makedirs(self.root, exist_ok=True)
+        version = self.manifest.get("version", 0)
+        if checksum != self.manifest.get("checksum"):
+            version += 1
+        df.to_parquet(f"{self.path}.tmp", index=False)
+        os.replace(f"{self.path}.tmp", self.path)
+        self.manifest = {
+            "version": version,
+            "fetched_on": datetime.now().date().isoformat(),
+            "fetched_at": time.time(),
+            "source": self.source,
+            "rows": len(df),
+            "checksum": checksum,
+        }
+        # Write to a temp file first so a crash never leaves a half written manifest
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    @property
+    def version(self):
+        return self.manifest.get("version", 0)
+
+    def is_fresh(self):
+        """True when the local copy exists and is younger than ttl"""
+        return (os.path.exists(self.path)
+                and time.time() - self.manifest.get("fetched_at", 0) < self.ttl)
+
+    def refresh(self, force=False):
+        """Download the list again when stale (or always with force), return True if it was updated"""
+        if not force and self.is_fresh():
+            return False
+        if os.path.exists(self.source):
+            with open(self.source, "rb") as f:
+                data = f.read()
+        else:
+            data = _download(self.source)
+        df = parse_equity_list(data)
+        self._save(df, hashlib.sha1(data).hexdigest())
+        self._set_frame(df)
+        return True
+
+    def _set_frame(self, df):
+        self._frame = df
+        self._by_symbol = None
+        self._index = None
+
+    def _load(self):
+        import pandas as pd
+
+        if self.offline:
+            if os.path.exists(self.path):
+                self._set_frame(pd.read_parquet(self.path))
+            elif self.fallback:
+                self._set_frame(parse_equity_list(self.fallback))
+            else:
+                raise FileNotFoundError(f"No symbol master in {self.root} and no fallback")
+            return
+        try:
+            if not self.refresh():
+                self._set_frame(pd.read_parquet(self.path))
+        except Exception as e:
+            self._failed_at = time.time()
+            if os.path.exists(self.path):
+                warnings.warn(f"Could not refresh symbol master from {self.source} ({e}), "
+                              f"using version {self.version} of {self.manifest.get('fetched_on')}")
+                self._set_frame(pd.read_parquet(self.path))
+            elif self.fallback:
+                warnings.warn(f"Could not fetch symbol master from {self.source} ({e}), "
+                              f"using the bundled sample")
+                self._set_frame(parse_equity_list(self.fallback))
+            else:
+                raise
+
+    @property
+    def frame(self):
+        """The symbol list as a DataFrame, refreshed when the local copy is out of date"""
+        if self._frame is None or (not self.offline and not self.is_fresh()
+                                   and time.time() - self._failed_at >= self.retry_after):
+            self._load()
+        return self._frame
+
+    def stocks(self):
+        """All entries as {"company_name", "symbol", "exchange"} dicts, the format of StockSymbolFinder"""
+        return self.frame[["company_name", "symbol", "exchange"]].to_dict("records")
+
+    def index(self):
+        """SymbolIndex over the list, rebuilt only when the list changes"""
+        frame = self.frame
+        if self._index is None:
+            from symbol_index import SymbolIndex
+            self._index = SymbolIndex(frame[["company_name", "symbol", "exchange"]].to_dict("records"))
+        return self._index
+
+    def lookup(self, symbol):
+        """The entry of symbol (with or without .NS) as a dict, or None"""
+        frame = self.frame
+        if self._by_symbol is None:
+            self._by_symbol = dict(zip(frame["symbol"], range(len(frame))))
+        row = self._by_symbol.get(symbol.upper().replace('.NS', ''))
+        if row is None:
+            return None
+        return {key: (None if value != value else value) for key, value in frame.iloc[row].items()}
+
+    def sector(self, symbol):
+        entry = self.lookup(symbol)
+        return entry["sector"] if entry else None
+
+    def sector_members(self, sector):
+        """Symbols of the sector whose name matches sector (e.g. a yfinance sector name)"""
+        sector = sector.lower()
+        frame = self.frame
+        for name in frame["sector"].dropna().unique():
+            if sector in name.lower() or name.lower() in sector:
+                members = frame.loc[frame["sector"] == name, "symbol"].tolist()
+                # Leaders listed in SECTOR_MEMBERS come first, in that order
+                order = {symbol: i for i, symbol in enumerate(SECTOR_MEMBERS.get(name, []))}
+                return sorted(members, key=lambda symbol: order.get(symbol, len(order)))
+        return []
+
+
+_default = None
+
+
+def default_master():
+    """The process wide SymbolMaster shared by search and analysis"""
+    global _default
+    if _default is None:
+        _default = SymbolMaster()
+    return _default
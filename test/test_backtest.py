@@ -0,0 +1,19 @@
+from types import SimpleNamespace
+
+from analysis import NSEStockAnalyzer
+from backtest import actions, signal_counts
+from indicator_kernels import compute_indicators
+from price_store import FakeProvider
+
+
+def test_recommendation_actions_use_the_analyzers_labels():
+    hist = FakeProvider(bars=500, end="2024-12-31").history("INFY.NS")
+    ind = compute_indicators(hist['Close'].to_numpy()[:, None], hist['Volume'].to_numpy()[:, None])
+    labels = actions(*signal_counts(ind, 'recommendations'), rules='recommendations')[:, 0]
+    expected = NSEStockAnalyzer._compute_indicators(hist)
+    analyzer = SimpleNamespace(info={})
+    bars = range(250, len(hist), 5)
+    recommended = [NSEStockAnalyzer.get_recommendations(analyzer, expected.iloc[:i + 1])['short_term_6m']
+                   for i in bars]
+    assert list(labels[list(bars)]) == recommended
+    assert "Hold with potential to accumulate on dips" in recommended
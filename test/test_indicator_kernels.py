@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicator_kernels import ema, ewm_mean, rsi
+from price_store import FakeProvider
+
+
+def closes(gaps=True):
+    """Two symbols' closes, the second listed 50 days later; with gaps both miss some sessions"""
+    close = FakeProvider(bars=500, end="2024-12-31")._frame("INFY.NS")["Close"].to_numpy().copy()
+    x = np.column_stack([close, close[::-1]])
+    x[:50, 1] = np.nan
+    if gaps:
+        x[100:103, 0] = np.nan
+        x[[200, 320], 1] = np.nan
+    return x
+
+
+@pytest.mark.parametrize("gaps", [False, True])
+@pytest.mark.parametrize("span", [12, 20, 26])
+def test_ema_matches_pandas(span, gaps):
+    x = closes(gaps)
+    expected = pd.DataFrame(x).ewm(span=span, adjust=False).mean().to_numpy()
+    np.testing.assert_allclose(ema(x, span), expected, rtol=1e-12, equal_nan=True)
+
+
+@pytest.mark.parametrize("alpha", [0.2, 0.5, 0.9])
+def test_ewm_mean_ages_the_average_over_a_gap(alpha):
+    x = np.array([[1.0], [np.nan], [np.nan], [2.0], [np.nan], [3.0]])
+    expected = pd.Series(x[:, 0]).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    np.testing.assert_allclose(ewm_mean(x, alpha)[:, 0], expected)
+    if alpha != 0.5:
+        # After two missing values the next one weighs alpha / ((1 - alpha) ** 3 + alpha)
+        assert ewm_mean(x, alpha)[3, 0] == pytest.approx(1 + alpha / ((1 - alpha) ** 3 + alpha))
+
+
+def test_wilder_rsi_matches_pandas():
+    x = closes(gaps=False)
+    close = pd.DataFrame(x)
+    delta = close.diff()
+    gain = delta.where(delta > 0, 0).where(close.notna())
+    loss = (-delta.where(delta < 0, 0)).where(close.notna())
+    rs = gain.ewm(alpha=1 / 14, adjust=False).mean() / loss.ewm(alpha=1 / 14, adjust=False).mean()
+    np.testing.assert_allclose(rsi(x, method='wilder'), (100 - 100 / (1 + rs)).to_numpy(), rtol=1e-10,
+                               equal_nan=True)
@@ -0,0 +1,251 @@
+import json
+import os
+import pickle
+import threading
+
+import pandas as pd
+import pytest
+
+from price_store import OHLCV, FakeProvider, PriceStore
+from symbol_index import EXACT, PREFIX, SUBSTRING, TOKEN, SymbolIndex
+import symbol_master
+from symbol_master import SAMPLE_CSV, SymbolMaster, parse_equity_list
+
+# Offline tests of the data layer: the symbol master on the bundled sample,
+# SymbolIndex lookups over it and PriceStore refreshes served by FakeProvider.
+#
+#   python -m pytest -q test
+
+
+@pytest.fixture(scope="module")
+def index():
+    return SymbolIndex(parse_equity_list(SAMPLE_CSV)[["company_name", "symbol", "exchange"]].to_dict("records"))
+
+
+def test_master_reads_the_sample_source(tmp_path):
+    master = SymbolMaster(root=str(tmp_path), source=SAMPLE_CSV)
+    assert "INFY" in set(master.frame["symbol"])
+    assert master.version == 1
+    assert master.manifest["rows"] == len(master.frame)
+
+    # A fresh copy on disk is read back without going to the source again
+    again = SymbolMaster(root=str(tmp_path), source=os.path.join(str(tmp_path), "missing.csv"))
+    assert again.is_fresh()
+    assert len(again.frame) == len(master.frame)
+
+
+def test_master_falls_back_to_the_sample_when_the_source_fails(tmp_path):
+    master = SymbolMaster(root=str(tmp_path), source=os.path.join(str(tmp_path), "missing.csv"))
+    with pytest.warns(UserWarning, match="bundled sample"):
+        frame = master.frame
+    assert "RELIANCE" in set(frame["symbol"])
+    assert master.version == 0
+
+
+def test_master_keeps_its_copy_when_a_refresh_fails(tmp_path):
+    SymbolMaster(root=str(tmp_path), source=SAMPLE_CSV).frame
+    stale = SymbolMaster(root=str(tmp_path), source=os.path.join(str(tmp_path), "missing.csv"), ttl=0)
+    with pytest.warns(UserWarning, match="using version 1"):
+        frame = stale.frame
+    assert "TCS" in set(frame["symbol"])
+
+
+def test_pickled_master_does_not_retry_a_failed_download(tmp_path, monkeypatch):
+    downloads = []
+
+    def unreachable(url, timeout=30):
+        downloads.append(url)
+        raise OSError("network unreachable")
+
+    monkeypatch.setattr(symbol_master, "_download", unreachable)
+    master = SymbolMaster(root=str(tmp_path), source="https://example.invalid/EQUITY_L.csv")
+    with pytest.warns(UserWarning, match="bundled sample"):
+        master.frame
+    assert len(downloads) == 1
+
+    # What an analyze_many worker receives
+    worker = pickle.loads(pickle.dumps(master))
+    assert worker.offline
+    assert "INFY" in set(worker.frame["symbol"])
+    assert worker.lookup("INFY.NS")["company_name"] == "Infosys Limited"
+    assert len(downloads) == 1
+
+
+def test_index_ranks_exact_prefix_token_and_substring(index):
+    assert index.search_ranked("infy")[0] == (EXACT, {"company_name": "Infosys Limited", "symbol": "INFY",
+                                                      "exchange": "NSE"})
+    prefix = [stock["symbol"] for tier, stock in index.search_ranked("hdfc") if tier == PREFIX]
+    assert {"HDFCBANK", "HDFCLIFE", "HDFCAMC"} <= set(prefix)
+    assert (TOKEN, "TATASTEEL") in [(tier, stock["symbol"]) for tier, stock in index.search_ranked("steel")]
+    assert SUBSTRING in [tier for tier, _ in index.search_ranked("ance")]
+    assert index.search("") == []
+    assert len(index.search("limited", limit=3)) == 3
+
+
+def test_index_fuzzy_search_tolerates_typos(index):
+    results = index.fuzzy_search("relaince", limit=3)
+    assert {stock["symbol"] for _, stock in results} == {"RELIANCE", "RELINFRA", "RPOWER"}
+    assert all(0.5 <= score <= 1 for score, _ in results)
+
+
+def test_index_fuzzy_search_first_queries_from_many_threads():
+    from bench_suite import synthetic_stocks
+
+    index = SymbolIndex(synthetic_stocks(20_000))
+    start = threading.Barrier(16)
+    results, errors = [], []
+
+    def first_query():
+        start.wait()
+        try:
+            results.append(index.fuzzy_search("technlogies"))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=first_query) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert all(result == results[0] for result in results)
+
+
+def test_finder_searches_the_master_by_default(tmp_path):
+    from search import StockSymbolFinder
+
+    provider = FakeProvider(symbols={"ZOMATO.NS"})
+    master = SymbolMaster(root=str(tmp_path), source=SAMPLE_CSV)
+    with StockSymbolFinder(master=master, provider=provider) as finder:
+        # DABUR and BIOCON are only in the symbol master, not in the curated list
+        assert [stock["symbol"] for stock in finder.search_symbol("dabur")["results"]] == ["DABUR"]
+        assert finder.search_symbol("biocn")["results"][0]["symbol"] == "BIOCON"
+        assert provider.calls == []
+
+        # Yahoo Finance is only asked with web_fallback, for a ticker no list knows
+        assert finder.search_symbol("zomato")["results"] == []
+        found = finder.search_symbol("zomato", web_fallback=True)["results"]
+        assert [stock["symbol"] for stock in found] == ["ZOMATO"]
+        assert provider.calls == [("info", "ZOMATO.NS")]
+        resolver = finder.resolver
+    # Leaving the block stops the resolver's thread pool
+    assert resolver._executor._shutdown
+
+
+def test_fundamentals_cache_writes_from_many_threads(tmp_path):
+    from fundamentals_cache import FundamentalsCache
+
+    # ttl=0: every get fetches and rewrites the same entry
+    cache = FundamentalsCache(FakeProvider(), root=str(tmp_path), ttl=0)
+    start = threading.Barrier(8)
+    errors = []
+
+    def fetch():
+        start.wait()
+        try:
+            for _ in range(20):
+                cache.get("INFY.NS")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=fetch) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert os.listdir(str(tmp_path)) == ["INFY.NS.json"]
+
+
+def test_store_fetches_only_the_missing_tail(tmp_path):
+    provider = FakeProvider(end="2024-12-20")
+    store = PriceStore(str(tmp_path), provider=provider)
+    first = store.get_history("INFY.NS")
+    assert list(first.columns) == OHLCV
+    assert provider.calls == [("history", "INFY.NS", "3y", None)]
+
+    # Served from disk while the refresh is from today
+    assert store.get_history("INFY.NS") is not None
+    assert (store.hits, store.misses) == (1, 1)
+
+    # A day later the provider has new bars, only the tail is requested
+    provider.end = pd.Timestamp("2024-12-31")
+    store.manifest["INFY.NS"]["refreshed_on"] = "2000-01-01"
+    updated = store.get_history("INFY.NS")
+    assert provider.calls[-1] == ("history", "INFY.NS", "3y", first.index[-1].date())
+    assert updated.index[-1] == pd.Timestamp("2024-12-31")
+    assert updated.index.is_unique and updated.index.is_monotonic_increasing
+    assert updated.index[0] > updated.index[-1] - pd.DateOffset(years=3)
+    pd.testing.assert_frame_equal(updated.loc[first.index[-2]:first.index[-2]],
+                                  first.loc[first.index[-2]:first.index[-2]], check_freq=False)
+
+    with open(os.path.join(str(tmp_path), "manifest.json")) as f:
+        assert json.load(f)["INFY.NS"]["last_bar"].startswith("2024-12-31")
+
+
+def test_refresh_many_groups_stale_symbols_by_last_bar(tmp_path):
+    provider = FakeProvider(end="2024-12-20")
+    store = PriceStore(str(tmp_path), provider=provider)
+    store.refresh_many(["INFY.NS", "TCS.NS"])
+    assert {call[1] for call in provider.calls} == {"INFY.NS", "TCS.NS"}
+
+    provider.calls.clear()
+    store.refresh_many(["INFY.NS", "TCS.NS"])
+    assert provider.calls == []
+
+    provider.end = pd.Timestamp("2024-12-31")
+    for symbol in ("INFY.NS", "TCS.NS"):
+        store.manifest[symbol]["refreshed_on"] = "2000-01-01"
+    store.refresh_many(["INFY.NS", "TCS.NS", "WIPRO.NS"])
+    starts = {symbol: start for _, symbol, _, start in provider.calls}
+    assert starts == {"WIPRO.NS": None, "INFY.NS": pd.Timestamp("2024-12-20").date(),
+                      "TCS.NS": pd.Timestamp("2024-12-20").date()}
+    assert all(store.load(symbol).index[-1] == pd.Timestamp("2024-12-31") for symbol in starts)
+
+
+def test_similar_companies_have_one_shape_with_or_without_the_peer_index(tmp_path):
+    from analysis import NSEStockAnalyzer
+    from peer_index import PeerIndex
+
+    provider = FakeProvider(end="2024-12-31")
+    master = SymbolMaster(root=str(tmp_path), source=SAMPLE_CSV)
+    histories = {f"{s}.NS": provider.history(f"{s}.NS") for s in master.sector_members("Technology")}
+    shapes = []
+    for peer_index in (PeerIndex.build(histories, master=master, k=3), None):
+        analyzer = NSEStockAnalyzer("INFY", provider=provider, master=master, peer_index=peer_index)
+        try:
+            similar = analyzer.get_similar_companies()
+        finally:
+            analyzer.close()
+        assert len(similar) == 3
+        shapes.append({tuple(company) for company in similar})
+    assert shapes == [{("symbol", "performance_1y")}] * 2
+
+
+@pytest.mark.parametrize("fails", [False, True])
+def test_analyze_nse_stock_closes_the_writer(tmp_path, monkeypatch, fails):
+    import analysis
+    from report_writer import ReportWriter
+
+    class RecordingWriter(ReportWriter):
+        closed = False
+
+        def write(self, report):
+            return "report.json"
+
+        def close(self):
+            self.closed = True
+
+    analyzer = analysis.NSEStockAnalyzer
+
+    def offline(symbol):
+        if fails:
+            raise OSError("network unreachable")
+        return analyzer(symbol, provider=FakeProvider(end="2024-12-31"),
+                        master=SymbolMaster(root=str(tmp_path), source=SAMPLE_CSV))
+
+    monkeypatch.setattr(analysis, "NSEStockAnalyzer", offline)
+    writer = RecordingWriter()
+    report = analysis.analyze_nse_stock("INFY", verbose=False, writer=writer, chart=False)
+    assert (report is None) == fails
+    assert writer.closed
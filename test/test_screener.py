@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from analysis import NSEStockAnalyzer
+from price_store import FakeProvider
+from screener import Screener
+
+COLUMNS = ['Close', 'SMA_50', 'SMA_200', 'EMA_20', 'RSI', 'MACD', 'Signal_Line', 'BB_Upper', 'BB_Lower',
+           'Volume_Ratio']
+FUNDAMENTALS = {'pe_ratio': 0, 'sector_pe': 0, 'dividend_yield': '0.00%'}
+
+
+@pytest.fixture(scope="module")
+def histories():
+    provider = FakeProvider(bars=400, end="2024-12-31")
+    histories = {symbol: provider.history(f"{symbol}.NS") for symbol in ("INFY", "TCS", "WIPRO")}
+    # TCS missed one session the others traded, inside its SMA_50 and SMA_200 windows
+    histories["TCS"] = histories["TCS"].drop(histories["TCS"].index[-30])
+    return histories
+
+
+def test_snapshot_matches_the_analyzer_on_each_symbols_own_bars(histories):
+    snapshot = Screener(histories).snapshot
+    for symbol, hist in histories.items():
+        expected = NSEStockAnalyzer._compute_indicators(hist)
+        row = snapshot.loc[symbol]
+        np.testing.assert_allclose(row[COLUMNS].to_numpy(dtype=float),
+                                   expected[COLUMNS].iloc[-1].to_numpy(dtype=float), rtol=1e-9)
+        action = NSEStockAnalyzer.get_buy_sell_suggestions(None, expected, FUNDAMENTALS)["short_term"]["action"]
+        assert row['action'] == action
+
+
+def test_missed_session_stays_missing(histories):
+    screener = Screener(histories)
+    column = screener.symbols.index("TCS")
+    row = np.flatnonzero(screener.dates == histories["INFY"].index[-30])[0]
+    assert np.isnan(screener.indicators['SMA_50'][row, column])
+    assert not np.isnan(screener.indicators['SMA_50'][row + 1, column])
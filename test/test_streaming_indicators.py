@@ -0,0 +1,48 @@
+import pytest
+
+from analysis import NSEStockAnalyzer
+from price_store import FakeProvider
+from streaming_indicators import IncrementalIndicators
+
+SEED = 300
+
+
+@pytest.fixture(scope="module")
+def hist():
+    return FakeProvider(bars=400, end="2024-12-31").history("INFY.NS")
+
+
+def assert_matches_batch(live, hist):
+    expected = NSEStockAnalyzer._compute_indicators(hist).iloc[-1]
+    assert live.sma_50.mean() == pytest.approx(expected['SMA_50'], rel=1e-9)
+    assert live.sma_200.mean() == pytest.approx(expected['SMA_200'], rel=1e-9)
+    assert live.rsi() == pytest.approx(expected['RSI'], rel=1e-9)
+    assert live.signal_line == pytest.approx(expected['Signal_Line'], rel=1e-9)
+    assert live.volume.mean() == pytest.approx(expected['Volume_10d_Avg'], rel=1e-9)
+    for name in IncrementalIndicators.EMA_SPANS:
+        assert live.emas[name] == pytest.approx(expected[name], rel=1e-9)
+
+    snapshot = live.snapshot()
+    assert snapshot['moving_averages']['ema_20'] == pytest.approx(expected['EMA_20'], abs=0.005)
+    assert snapshot['indicators']['macd'] == ('Bullish' if expected['MACD'] > expected['Signal_Line']
+                                              else 'Bearish')
+    assert snapshot['indicators']['bollinger_bands'] == NSEStockAnalyzer._get_bb_position(None, expected)
+    assert snapshot['volume']['volume_ratio'] == pytest.approx(expected['Volume_Ratio'], abs=0.005)
+
+
+def test_bars_pushed_one_at_a_time_match_the_batch(hist):
+    live = IncrementalIndicators.from_frame(NSEStockAnalyzer._compute_indicators(hist.iloc[:SEED]))
+    for i in range(SEED, len(hist)):
+        live.update(hist['Close'].iloc[i], hist['Volume'].iloc[i])
+        assert_matches_batch(live, hist.iloc[:i + 1])
+
+
+def test_replacement_ticks_revise_the_bar_in_progress(hist):
+    live = IncrementalIndicators.from_frame(NSEStockAnalyzer._compute_indicators(hist.iloc[:SEED]))
+    for i in range(SEED, len(hist)):
+        close, volume = hist['Close'].iloc[i], hist['Volume'].iloc[i]
+        # Intraday ticks of bar i before its final close and volume
+        live.update(close * 1.03, volume * 0.2)
+        live.update(close * 0.97, volume * 0.6, replace=True)
+        live.update(close, volume, replace=True)
+        assert_matches_batch(live, hist.iloc[:i + 1])
@@ -0,0 +1,104 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+def _company_name(info):
+    """Name of a listed company from a provider's info dict, None for an unknown ticker"""
+    if not info:
+        return None
+    return info.get("longName") or info.get("shortName")
+
+
+class TickerResolver:
+    """Validate many candidate tickers concurrently, caching hits and misses
+
+    Every candidate is checked with provider.info() in a bounded thread pool.
+    Known tickers are cached for ttl seconds and unknown ones (empty info or a
+    failed request) for negative_ttl seconds, so a bad guess is not retried on
+    every keystroke. resolve_many() waits at most timeout seconds and returns
+    whatever resolved by then; the remaining lookups finish in the background
+    and fill the cache for the next call. Call close(), or use it as a context
+    manager, to stop the pool's threads.
+    """
+
+    def __init__(self, provider, max_workers=8, ttl=24 * 60 * 60, negative_ttl=60 * 60, timeout=5.0):
+        self.provider = provider
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ticker-resolve')
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._in_flight = {}
+        self.errors = {}
+
+    def _cached(self, ticker):
+        """(found, entry) for ticker, entry is None for a cached miss (caller holds the lock)"""
+        cached = self._cache.get(ticker)
+        if cached is None:
+            return False, None
+        expires_at, entry = cached
+        if expires_at < time.monotonic():
+            del self._cache[ticker]
+            return False, None
+        return True, entry
+
+    def _resolve(self, ticker):
+        try:
+            name = _company_name(self.provider.info(ticker))
+        except Exception as e:
+            self.errors[ticker] = str(e)
+            name = None
+        entry = None
+        if name:
+            entry = {"company_name": name, "symbol": ticker.replace(".NS", ""), "exchange": "NSE"}
+        with self._lock:
+            ttl = self.ttl if entry else self.negative_ttl
+            self._cache[ticker] = (time.monotonic() + ttl, entry)
+            self._in_flight.pop(ticker, None)
+        return entry
+
+    def resolve_many(self, tickers, timeout=None):
+        """Return (resolved, pending) for tickers
+
+        resolved is {ticker: {"company_name", "symbol", "exchange"}} for every
+        ticker known to the provider, in the order given; pending lists the
+        tickers still being looked up when the timeout expired.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        resolved = {}
+        futures = {}
+        with self._lock:
+            for ticker in dict.fromkeys(tickers):
+                found, entry = self._cached(ticker)
+                if found:
+                    if entry is not None:
+                        resolved[ticker] = entry
+                    continue
+                future = self._in_flight.get(ticker)
+                if future is None:
+                    future = self._executor.submit(self._resolve, ticker)
+                    self._in_flight[ticker] = future
+                futures[future] = ticker
+
+        done, not_done = wait(futures, timeout=timeout)
+        for future in done:
+            entry = future.result()
+            if entry is not None:
+                resolved[futures[future]] = entry
+
+        # Both keep the order the tickers were given in
+        still_running = {futures[future] for future in not_done}
+        pending = [ticker for ticker in dict.fromkeys(tickers) if ticker in still_running]
+        return {ticker: resolved[ticker] for ticker in tickers if ticker in resolved}, pending
+
+    def close(self):
+        """Shut the thread pool down, dropping lookups that have not started"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()